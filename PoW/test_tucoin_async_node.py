@@ -0,0 +1,55 @@
+import socket
+import threading
+import unittest
+
+from tucoin_async_node import AsyncNode
+from tucoin_blockchain import Blockchain
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+class AsyncNodeTest(unittest.TestCase):
+    """Node asyncio: kết nối trên event loop, đồng bộ trong nhóm thread riêng."""
+
+    def setUp(self):
+        self.nodes = []
+
+    def tearDown(self):
+        for node in self.nodes:
+            node.stop()
+
+    def start_node(self, **kwargs):
+        node = AsyncNode(port=free_port(), blockchain=Blockchain(difficulty=1), **kwargs)
+        self.nodes.append(node)
+        self.assertTrue(node.start())
+        return node
+
+    def test_no_threaded_transport(self):
+        node = self.start_node()
+        self.assertFalse(hasattr(node, "_pool"))
+        self.assertFalse(hasattr(node, "_broadcaster"))
+
+    def test_busy_sync_does_not_block_messages(self):
+        source = self.start_node(workers=1, sync_workers=1)
+        source.blockchain.mine_block("miner")
+        source.blockchain.mine_block("miner")
+
+        # Giữ thread đồng bộ duy nhất của node nguồn như một lượt đồng bộ
+        # đang chờ một peer không trả lời
+        release = threading.Event()
+        source._sync_executor.submit(release.wait)
+        try:
+            node = self.start_node()
+            self.assertTrue(node.connect_to_peer(source.host, source.port))
+            self.assertEqual(len(node.blockchain.chain), 3)
+            self.assertIn(node.address, source.peers)
+        finally:
+            release.set()
+
+
+if __name__ == "__main__":
+    unittest.main()
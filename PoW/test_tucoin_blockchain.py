@@ -0,0 +1,156 @@
+import os
+import tempfile
+import unittest
+from time import time
+
+from tucoin_blockchain import Block, Blockchain
+from tucoin_transaction import BLOCK_REWARD, REWARD_SENDER
+from tucoin_wallet import Wallet
+
+
+def reward(receiver):
+    return {"sender": REWARD_SENDER, "receiver": receiver, "amount": BLOCK_REWARD, "timestamp": time()}
+
+
+def transfer(sender, receiver, amount):
+    return {"sender": sender, "receiver": receiver, "amount": amount, "timestamp": time()}
+
+
+def next_block(blockchain, transactions):
+    """Khối hợp lệ về header nối tiếp khối cuối của chuỗi (như do một peer đào)."""
+    tip = blockchain.last_block
+    target = blockchain.current_target
+    proof = blockchain.proof_of_work(tip.proof, None, target)
+    return Block(tip.index + 1, max(time(), tip.timestamp + 0.001), transactions,
+                 proof, tip.hash, target=target)
+
+
+def copy_chain(blockchain):
+    return [Block.from_dict(block.to_dict()) for block in blockchain.chain]
+
+
+class BlockTransactionsTest(unittest.TestCase):
+    """Giao dịch trong khối nhận từ peer được kiểm tra như khối tự đào."""
+
+    def setUp(self):
+        self.blockchain = Blockchain(difficulty=1)
+        self.blockchain.mine_block("victim")
+
+    def test_add_block_rejects_invalid_transactions(self):
+        blocks = {
+            "negative": [transfer("thief", "victim", -100.0), reward("thief")],
+            "overdraft": [transfer("victim", "thief", BLOCK_REWARD + 1), reward("thief")],
+            "malformed": [{"sender": "victim"}, reward("thief")],
+            "not a list": {"sender": "victim"},
+        }
+        for name, transactions in blocks.items():
+            with self.subTest(name):
+                self.assertFalse(self.blockchain.add_block(next_block(self.blockchain, transactions)))
+        self.assertEqual(self.blockchain.get_balance("victim"), BLOCK_REWARD)
+        self.assertEqual(self.blockchain.get_balance("thief"), 0.0)
+
+        block = next_block(self.blockchain, [transfer("victim", "thief", 30.0), reward("thief")])
+        self.assertTrue(self.blockchain.add_block(block))
+        self.assertEqual(self.blockchain.get_balance("thief"), BLOCK_REWARD + 30.0)
+
+    def test_replace_chain_rejects_invalid_transactions(self):
+        peer = Blockchain(difficulty=1)
+        peer.chain = copy_chain(self.blockchain)
+        peer._rebuild_balances()
+        peer._append_block(next_block(peer, [transfer("thief", "victim", -100.0), reward("thief")]))
+        peer._append_block(next_block(peer, [reward("thief")]))
+        self.assertFalse(peer.is_chain_valid())
+
+        self.assertFalse(self.blockchain.replace_chain(copy_chain(peer)))
+        self.assertEqual(len(self.blockchain.chain), 2)
+
+    def test_replace_chain_from_fork_point(self):
+        peer = Blockchain(difficulty=1)
+        peer.chain = copy_chain(self.blockchain)
+        peer._rebuild_balances()
+        self.blockchain.mine_block("other")
+
+        # Nhánh tiêu số dư có tại khối chung, không phụ thuộc khối bị bỏ
+        peer.add_block(next_block(peer, [transfer("victim", "thief", 60.0), reward("thief")]))
+        peer.add_block(next_block(peer, [transfer("thief", "victim", 160.0), reward("thief")]))
+        peer.add_block(next_block(peer, [reward("thief")]))
+        self.assertTrue(peer.is_chain_valid())
+
+        self.assertTrue(self.blockchain.replace_chain(copy_chain(peer)))
+        self.assertEqual(self.blockchain.get_balance("other"), 0.0)
+        self.assertEqual(self.blockchain.get_balance("victim"), 200.0)
+        self.assertTrue(self.blockchain.is_chain_valid())
+
+
+class ReplayTest(unittest.TestCase):
+    """Một giao dịch đã ký chỉ được xác nhận một lần."""
+
+    def setUp(self):
+        self.wallet = Wallet()
+        self.blockchain = Blockchain(difficulty=1, require_signatures=True)
+        self.blockchain.mine_block(self.wallet.address)
+        self.blockchain.mine_block(self.wallet.address)
+
+        self.payment = self.wallet.sign_transaction(transfer(self.wallet.address, "shop", 30.0))
+        self.assertTrue(self.blockchain.submit_transaction(self.payment))
+        self.blockchain.mine_block("miner")
+        self.assertEqual(self.blockchain.get_balance("shop"), 30.0)
+
+    def assert_replay_rejected(self, blockchain):
+        self.assertFalse(blockchain.submit_transaction(self.payment))
+        self.assertFalse(blockchain.add_block(next_block(blockchain, [self.payment, reward("miner")])))
+        self.assertEqual(blockchain.get_balance("shop"), 30.0)
+
+    def test_replay_confirmed_transaction(self):
+        self.assert_replay_rejected(self.blockchain)
+
+    def test_duplicate_in_block(self):
+        payment = self.wallet.sign_transaction(transfer(self.wallet.address, "shop", 10.0))
+        block = next_block(self.blockchain, [payment, payment, reward("miner")])
+        self.assertFalse(self.blockchain.add_block(block))
+
+    def test_replay_in_branch(self):
+        peer = Blockchain(difficulty=1, require_signatures=True)
+        peer.chain = copy_chain(self.blockchain)
+        peer._rebuild_balances()
+        peer._append_block(next_block(peer, [self.payment, reward("miner")]))
+        peer._append_block(next_block(peer, [reward("miner")]))
+        self.assertFalse(peer.is_chain_valid())
+
+        self.assertFalse(self.blockchain.replace_chain(copy_chain(peer)))
+        self.assertEqual(self.blockchain.get_balance("shop"), 30.0)
+
+    def test_reorg_releases_transaction(self):
+        # Nhánh không chứa giao dịch: giao dịch quay lại danh sách chờ và
+        # có thể được xác nhận lại trong chuỗi mới
+        peer = Blockchain(difficulty=1, require_signatures=True)
+        peer.chain = copy_chain(self.blockchain)[:-1]
+        peer._rebuild_balances()
+        for _ in range(2):
+            peer.add_block(next_block(peer, [reward("other")]))
+
+        self.assertTrue(self.blockchain.replace_chain(copy_chain(peer)))
+        self.assertEqual(self.blockchain.get_balance("shop"), 0.0)
+        self.assertEqual(self.blockchain.pending_transactions, [self.payment])
+        self.blockchain.mine_block("miner")
+        self.assertEqual(self.blockchain.get_balance("shop"), 30.0)
+        self.assert_replay_rejected(self.blockchain)
+
+    def test_replay_after_prune_and_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ledger_path = os.path.join(directory, "ledger.json")
+            self.blockchain.ledger_path = ledger_path
+            self.blockchain.prune(len(self.blockchain.chain))
+            self.assert_replay_rejected(self.blockchain)
+            self.assertTrue(self.blockchain.is_chain_valid())
+
+            self.blockchain.close()
+            restarted = Blockchain(difficulty=1, require_signatures=True,
+                                   ledger_path=ledger_path)
+            restarted.chain = self.blockchain.chain
+            restarted._load_ledger()
+            self.assert_replay_rejected(restarted)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import random
+import unittest
+import zlib
+
+from tucoin_blockchain import Block
+from tucoin_codec import (_DICT, _HEADER_SIZE, _STR, MAGIC, VERSION, CodecError, decode_binary,
+                          decode_payload, encode_binary)
+from tucoin_transaction import BLOCK_REWARD, REWARD_SENDER
+
+HOOKS = {"blocks": Block.from_dict}
+
+
+def sample_message():
+    transactions = [{"sender": "a" * 64, "receiver": "b" * 64, "amount": 1.5 + index,
+                     "timestamp": 1700000000.25 + index, "signature": "c0" * 64}
+                    for index in range(5)]
+    transactions[2]["note"] = "không phải hex"
+    transactions.append({"sender": REWARD_SENDER, "receiver": "miner", "amount": BLOCK_REWARD,
+                         "timestamp": 1700000010.0})
+    block = Block(1, 1700000011.0, transactions, 12345, "0" * 64, target=2 ** 240)
+    return {"type": "BLOCKS", "data": {
+        "blocks": [block.to_dict(), dict(block.to_dict(), index=2, pruned=True, transactions=None)],
+        "values": [None, True, False, 0, -1, 2 ** 70, -2 ** 70, 0.1, "", "é", [], {}, [[1, "x"]]],
+        "peers": ["127.0.0.1:5000", "127.0.0.1:5000"],
+    }}
+
+
+def frame(body: bytes, flags: int = 0) -> bytes:
+    return bytes((MAGIC, VERSION, flags)) + body
+
+
+class RoundTripTest(unittest.TestCase):
+    """Thông điệp giải mã lại đúng như trước khi mã hóa."""
+
+    def test_round_trip(self):
+        message = sample_message()
+        for threshold in (0, 1 << 30):
+            with self.subTest(threshold=threshold):
+                payload = encode_binary(message, threshold)
+                self.assertEqual(decode_binary(payload), message)
+
+                # Số nguyên và số thực được phân biệt
+                values = decode_binary(payload)["data"]["values"]
+                self.assertIs(type(values[3]), int)
+                self.assertIs(type(values[7]), float)
+
+    def test_hooks(self):
+        message = sample_message()
+        decoded = decode_payload(encode_binary(message), HOOKS)
+        block = decoded["data"]["blocks"][0]
+        self.assertIsInstance(block, Block)
+        self.assertEqual(block.hash, message["data"]["blocks"][0]["hash"])
+        self.assertEqual(block.hash, block.calculate_hash())
+
+
+class HostileInputTest(unittest.TestCase):
+    """Thông điệp hỏng hoặc cố ý sai chỉ gây CodecError."""
+
+    def assert_rejected_or_decoded(self, payload):
+        try:
+            decode_payload(payload, HOOKS, 1 << 20)
+        except CodecError:
+            pass
+
+    def test_truncated(self):
+        for threshold in (0, 1 << 30):
+            payload = encode_binary(sample_message(), threshold)
+            for size in range(len(payload)):
+                with self.subTest(threshold=threshold, size=size):
+                    with self.assertRaises(CodecError):
+                        decode_binary(payload[:size], HOOKS)
+
+    def test_fuzz(self):
+        rng = random.Random(2024)
+        payloads = [encode_binary(sample_message(), threshold) for threshold in (0, 1 << 30)]
+        for _ in range(3000):
+            data = bytearray(rng.choice(payloads))
+            for _ in range(rng.randint(1, 4)):
+                position = rng.randrange(_HEADER_SIZE, len(data))
+                data[position] = rng.randrange(256)
+            self.assert_rejected_or_decoded(bytes(data))
+
+        for _ in range(3000):
+            body = bytes(rng.randrange(256) for _ in range(rng.randint(0, 64)))
+            self.assert_rejected_or_decoded(frame(body))
+
+    def test_hostile(self):
+        nested_keys = bytes([_DICT, 1]) * 10000 + bytes([_STR, 0, 0])
+        cases = {
+            "huge count": frame(bytes([_DICT, 0xFF, 0xFF, 0xFF, 0xFF, 0x0F])),
+            "huge string": frame(bytes([_STR, 0xFF, 0xFF, 0xFF, 0xFF, 0x0F])),
+            "long varint": frame(bytes([_STR]) + b"\xff" * 20 + b"\x01"),
+            "deep nesting": frame(bytes([_DICT, 1, _STR, 1]) + b"a" + bytes([_DICT, 1, _STR, 0]) * 200),
+            "dict as key": frame(bytes([_DICT, 1]) + nested_keys),
+            "not a dict": frame(bytes([_STR, 0])),
+            "trailing data": frame(bytes([_DICT, 0, 0])),
+            "bad block": encode_binary({"blocks": [{"index": 1}]}),
+            "bad version": bytes((MAGIC, VERSION + 1, 0, _DICT, 0)),
+            "bad zlib": frame(b"not zlib", 1),
+        }
+        for name, payload in cases.items():
+            with self.subTest(name):
+                with self.assertRaises(CodecError):
+                    decode_binary(payload, HOOKS)
+
+    def test_decompression_capped(self):
+        bomb = frame(zlib.compress(bytes([_DICT, 1, _STR, 1, 0x61, _STR, 0x80, 0x80, 0x40])
+                                   + b"\0" * (1 << 20)), 1)
+        with self.assertRaises(CodecError):
+            decode_binary(bomb, max_size=1 << 16)
+
+        # Không truyền giới hạn: vẫn bị chặn ở giới hạn mặc định
+        huge = frame(zlib.compress(b"\0" * (80 << 20), 9), 1)
+        with self.assertRaises(CodecError):
+            decode_binary(huge)
+
+
+if __name__ == "__main__":
+    unittest.main()
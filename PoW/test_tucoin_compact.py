@@ -0,0 +1,54 @@
+import gc
+import unittest
+import weakref
+
+from tucoin_blockchain import Blockchain
+from tucoin_compact import AddressTable, TransactionColumns
+
+
+def transfer(sender, receiver, amount, timestamp=1.0):
+    return {"sender": sender, "receiver": receiver, "amount": amount, "timestamp": timestamp}
+
+
+class TransactionColumnsTest(unittest.TestCase):
+    """Giao dịch dạng cột khôi phục đúng giao dịch ban đầu."""
+
+    def test_round_trip(self):
+        transactions = [transfer("alice", "bob", 1.5), transfer("bob", "alice", 2, 3),
+                        dict(transfer("alice", "carol", 0.1), public_key="ab" * 32,
+                             signature="cd" * 64)]
+        addresses = AddressTable()
+        columns = TransactionColumns.from_transactions(transactions, addresses)
+        self.assertEqual(columns.to_list(), transactions)
+        self.assertEqual(len(addresses), 3)
+
+    def test_not_compactable(self):
+        addresses = AddressTable()
+        for transactions in ([transfer("alice", "bob", 1e-9)], [dict(transfer("a", "b", 1), note="x")],
+                             [dict(transfer("a", "b", 1), public_key="AB" * 32, signature="cd" * 64)]):
+            with self.subTest(transactions=transactions):
+                self.assertIsNone(TransactionColumns.from_transactions(transactions, addresses))
+
+
+class AddressTableScopeTest(unittest.TestCase):
+    """Mỗi blockchain có bảng địa chỉ riêng, giải phóng cùng blockchain."""
+
+    def test_table_per_blockchain(self):
+        first = Blockchain(difficulty=1, compact=True)
+        second = Blockchain(difficulty=1, compact=True)
+        first.mine_block("first-miner")
+        second.mine_block("second-miner")
+
+        self.assertTrue(first.last_block.is_compact)
+        self.assertEqual(first.last_block.transactions[0]["receiver"], "first-miner")
+        self.assertEqual(second.last_block.transactions[0]["receiver"], "second-miner")
+        self.assertEqual(len(first._addresses), 2)
+
+        table = weakref.ref(first._addresses)
+        del first
+        gc.collect()
+        self.assertIsNone(table())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,258 @@
+import secrets
+import unittest
+
+from tucoin_crypto import N, P, _ladder, _multiply_generator, _to_affine, public_key, sign, verify, verify_batch
+
+# Bộ test của BIP-340 (test-vectors.csv, index 0-14):
+# (khóa riêng tư, khóa công khai, aux_rand, thông điệp, chữ ký, kết quả kiểm tra)
+BIP340_VECTORS = [
+    ("0000000000000000000000000000000000000000000000000000000000000003",
+     "F9308A019258C31049344F85F89D5229B531C845836F99B08601F113BCE036F9",
+     "0000000000000000000000000000000000000000000000000000000000000000",
+     "0000000000000000000000000000000000000000000000000000000000000000",
+     "E907831F80848D1069A5371B402410364BDF1C5F8307B0084C55F1CE2DCA8215"
+     "25F66A4A85EA8B71E482A74F382D2CE5EBEEE8FDB2172F477DF4900D310536C0",
+     True),
+    ("B7E151628AED2A6ABF7158809CF4F3C762E7160F38B4DA56A784D9045190CFEF",
+     "DFF1D77F2A671C5F36183726DB2341BE58FEAE1DA2DECED843240F7B502BA659",
+     "0000000000000000000000000000000000000000000000000000000000000001",
+     "243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89",
+     "6896BD60EEAE296DB48A229FF71DFE071BDE413E6D43F917DC8DCF8C78DE3341"
+     "8906D11AC976ABCCB20B091292BFF4EA897EFCB639EA871CFA95F6DE339E4B0A",
+     True),
+    ("C90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B14E5C9",
+     "DD308AFEC5777E13121FA72B9CC1B7CC0139715309B086C960E18FD969774EB8",
+     "C87AA53824B4D7AE2EB035A2B5BBBCCC080E76CDC6D1692C4B0B62D798E6D906",
+     "7E2D58D8B3BCDF1ABADEC7829054F90DDA9805AAB56C77333024B9D0A508B75C",
+     "5831AAEED7B44BB74E5EAB94BA9D4294C49BCF2A60728D8B4C200F50DD313C1B"
+     "AB745879A5AD954A72C45A91C3A51D3C7ADEA98D82F8481E0E1E03674A6F3FB7",
+     True),
+    ("0B432B2677937381AEF05BB02A66ECD012773062CF3FA2549E44F58ED2401710",
+     "25D1DFF95105F5253C4022F628A996AD3A0D95FBF21D468A1B33F8C160D8F517",
+     "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF",
+     "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF",
+     "7EB0509757E246F19449885651611CB965ECC1A187DD51B64FDA1EDC9637D5EC"
+     "97582B9CB13DB3933705B32BA982AF5AF25FD78881EBB32771FC5922EFC66EA3",
+     True),
+    (None,
+     "D69C3509BB99E412E68B0FE8544E72837DFA30746D8BE2AA65975F29D22DC7B9",
+     None,
+     "4DF3C3F68FCC83B27E9D42C90431A72499F17875C81A599B566C9889B9696703",
+     "00000000000000000000003B78CE563F89A0ED9414F5AA28AD0D96D6795F9C63"
+     "76AFB1548AF603B3EB45C9F8207DEE1060CB71C04E80F593060B07D28308D7F4",
+     True),
+    # Khóa công khai không nằm trên đường cong
+    (None,
+     "EEFDEA4CDB677750A420FEE807EACF21EB9898AE79B9768766E4FAA04A2D4A34",
+     None,
+     "243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89",
+     "6CFF5C3BA86C69EA4B7376F31A9BCB4F74C1976089B2D9963DA2E5543E177769"
+     "69E89B4C5564D00349106B8497785DD7D1D713A8AE82B32FA79D5F7FC407D39B",
+     False),
+    # R có tung độ lẻ
+    (None,
+     "DFF1D77F2A671C5F36183726DB2341BE58FEAE1DA2DECED843240F7B502BA659",
+     None,
+     "243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89",
+     "FFF97BD5755EEEA420453A14355235D382F6472F8568A18B2F057A1460297556"
+     "3CC27944640AC607CD107AE10923D9EF7A73C643E166BE5EBEAFA34B1AC553E2",
+     False),
+    # Thông điệp bị đổi dấu
+    (None,
+     "DFF1D77F2A671C5F36183726DB2341BE58FEAE1DA2DECED843240F7B502BA659",
+     None,
+     "243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89",
+     "1FA62E331EDBC21C394792D2AB1100A7B432B013DF3F6FF4F99FCB33E0E1515F"
+     "28890B3EDB6E7189B630448B515CE4F8622A954CFE545735AAEA5134FCCDB2BD",
+     False),
+    # s bị đổi dấu
+    (None,
+     "DFF1D77F2A671C5F36183726DB2341BE58FEAE1DA2DECED843240F7B502BA659",
+     None,
+     "243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89",
+     "6CFF5C3BA86C69EA4B7376F31A9BCB4F74C1976089B2D9963DA2E5543E177769"
+     "961764B3AA9B2FFCB6EF947B6887A226E8D7C93E00C5ED0C1834FF0D0C2E6DA6",
+     False),
+    # s * G - e * P là điểm vô cực
+    (None,
+     "DFF1D77F2A671C5F36183726DB2341BE58FEAE1DA2DECED843240F7B502BA659",
+     None,
+     "243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89",
+     "0000000000000000000000000000000000000000000000000000000000000000"
+     "123DDA8328AF9C23A94C1FEECFD123BA4FB73476F0D594DCB65C6425BD186051",
+     False),
+    (None,
+     "DFF1D77F2A671C5F36183726DB2341BE58FEAE1DA2DECED843240F7B502BA659",
+     None,
+     "243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89",
+     "0000000000000000000000000000000000000000000000000000000000000001"
+     "7615FBAF5AE28864013C099742DEADB4DBA87F11AC6754F93780D5A1837CF197",
+     False),
+    # r không phải hoành độ của điểm nào trên đường cong
+    (None,
+     "DFF1D77F2A671C5F36183726DB2341BE58FEAE1DA2DECED843240F7B502BA659",
+     None,
+     "243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89",
+     "4A298DACAE57395A15D0795DDBFD1DCB564DA82B0F269BC70A74F8220429BA1D"
+     "69E89B4C5564D00349106B8497785DD7D1D713A8AE82B32FA79D5F7FC407D39B",
+     False),
+    # r bằng p
+    (None,
+     "DFF1D77F2A671C5F36183726DB2341BE58FEAE1DA2DECED843240F7B502BA659",
+     None,
+     "243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89",
+     "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F"
+     "69E89B4C5564D00349106B8497785DD7D1D713A8AE82B32FA79D5F7FC407D39B",
+     False),
+    # s bằng n
+    (None,
+     "DFF1D77F2A671C5F36183726DB2341BE58FEAE1DA2DECED843240F7B502BA659",
+     None,
+     "243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89",
+     "6CFF5C3BA86C69EA4B7376F31A9BCB4F74C1976089B2D9963DA2E5543E177769"
+     "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141",
+     False),
+    # Khóa công khai lớn hơn kích thước trường
+    (None,
+     "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC30",
+     None,
+     "243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89",
+     "6CFF5C3BA86C69EA4B7376F31A9BCB4F74C1976089B2D9963DA2E5543E177769"
+     "69E89B4C5564D00349106B8497785DD7D1D713A8AE82B32FA79D5F7FC407D39B",
+     False),
+]
+
+
+class Bip340VectorTest(unittest.TestCase):
+    """Kiểm tra ký và xác minh với bộ test của BIP-340."""
+
+    def test_public_key(self):
+        for private_key, expected_key, _, _, _, _ in BIP340_VECTORS:
+            if private_key is not None:
+                self.assertEqual(public_key(private_key), expected_key.lower())
+
+    def test_sign(self):
+        for private_key, _, aux_rand, message, signature, _ in BIP340_VECTORS:
+            if private_key is not None:
+                self.assertEqual(sign(private_key, bytes.fromhex(message), bytes.fromhex(aux_rand)),
+                                 signature.lower())
+
+    def test_verify(self):
+        for index, (_, key, _, message, signature, expected) in enumerate(BIP340_VECTORS):
+            with self.subTest(index=index):
+                self.assertEqual(verify(key, bytes.fromhex(message), signature), expected)
+
+    def test_verify_batch(self):
+        valid = [(key, bytes.fromhex(message), signature)
+                 for _, key, _, message, signature, expected in BIP340_VECTORS if expected]
+        self.assertTrue(verify_batch(valid))
+
+        for _, key, _, message, signature, expected in BIP340_VECTORS:
+            if not expected:
+                self.assertFalse(verify_batch(valid + [(key, bytes.fromhex(message), signature)]))
+
+
+class LadderTest(unittest.TestCase):
+    """Thang Montgomery cho kết quả giống phép nhân bằng bảng nhân sẵn."""
+
+    def test_matches_table(self):
+        scalars = [1, 2, 3, N - 1, N - 2, 1 << 128, (1 << 256) - N - 1, (1 << 256) - N]
+        scalars += [secrets.randbelow(N - 1) + 1 for _ in range(32)]
+        for scalar in scalars:
+            with self.subTest(scalar=scalar):
+                self.assertEqual(_to_affine(_ladder(scalar)), _to_affine(_multiply_generator(scalar)))
+
+
+def _signed_items(count):
+    """Các bộ (khóa công khai, thông điệp, chữ ký) hợp lệ với khóa ngẫu nhiên."""
+    items = []
+    for _ in range(count):
+        private_key = (secrets.randbelow(N - 1) + 1).to_bytes(32, "big").hex()
+        message = secrets.token_bytes(32)
+        items.append((public_key(private_key), message, sign(private_key, message)))
+    return items
+
+
+def _with_s(signature, delta):
+    """Chữ ký với thành phần s được cộng thêm delta (mod N)."""
+    s = (int(signature[64:], 16) + delta) % N
+    return signature[:64] + s.to_bytes(32, "big").hex()
+
+
+class BatchForgeryTest(unittest.TestCase):
+    """Một chữ ký giả trong lô làm cả lô bị từ chối."""
+
+    def setUp(self):
+        self.items = _signed_items(8)
+
+    def test_valid_batch(self):
+        self.assertTrue(verify_batch(self.items))
+
+    def test_one_forged_signature(self):
+        for position in (0, 3, len(self.items) - 1):
+            with self.subTest(position=position):
+                items = list(self.items)
+                key, message, signature = items[position]
+                items[position] = (key, message, _with_s(signature, 1))
+                self.assertFalse(verify_batch(items))
+
+                # Chữ ký đúng nhưng cho thông điệp hoặc khóa khác
+                items[position] = (key, secrets.token_bytes(32), signature)
+                self.assertFalse(verify_batch(items))
+                items[position] = (self.items[position - 1][0], message, signature)
+                self.assertFalse(verify_batch(items))
+
+    def test_cancelling_forgeries(self):
+        # Hai sai lệch bù trừ nhau bị phát hiện nhờ hệ số ngẫu nhiên
+        items = list(self.items)
+        for position, delta in ((1, 1), (2, -1)):
+            key, message, signature = items[position]
+            items[position] = (key, message, _with_s(signature, delta))
+        self.assertFalse(verify_batch(items))
+
+
+class MalformedKeyTest(unittest.TestCase):
+    """Khóa và chữ ký sai định dạng bị từ chối, không gây lỗi."""
+
+    def setUp(self):
+        self.key, self.message, self.signature = _signed_items(1)[0]
+
+    def test_malformed_public_keys(self):
+        # Hoành độ không thuộc đường cong: x^3 + 7 không là số chính phương mod P
+        off_curve = next(x for x in range(1, 100) if pow(x ** 3 + 7, (P - 1) // 2, P) != 1)
+        keys = {
+            "off curve": off_curve.to_bytes(32, "big").hex(),
+            "x >= P": P.to_bytes(32, "big").hex(),
+            "short": self.key[:62],
+            "long": self.key + "00",
+            "not hex": "zz" + self.key[2:],
+            "empty": "",
+            "none": None,
+            "bytes": bytes.fromhex(self.key),
+        }
+        for name, key in keys.items():
+            with self.subTest(name):
+                self.assertFalse(verify(key, self.message, self.signature))
+                self.assertFalse(verify_batch([(self.key, self.message, self.signature),
+                                               (key, self.message, self.signature)]))
+
+    def test_malformed_signatures(self):
+        r_too_large = P.to_bytes(32, "big").hex() + self.signature[64:]
+        s_too_large = self.signature[:64] + N.to_bytes(32, "big").hex()
+        for signature in (r_too_large, s_too_large, self.signature[:126], self.signature + "00",
+                          "", None):
+            with self.subTest(signature=signature):
+                self.assertFalse(verify(self.key, self.message, signature))
+
+    def test_malformed_private_keys(self):
+        for private_key in ("00" * 32, N.to_bytes(32, "big").hex(), "ff" * 32, "01" * 31,
+                            "01" * 33, "zz" * 32, "", None):
+            with self.subTest(private_key=private_key):
+                with self.assertRaises(ValueError):
+                    public_key(private_key)
+                with self.assertRaises(ValueError):
+                    sign(private_key, self.message)
+
+
+if __name__ == "__main__":
+    unittest.main()
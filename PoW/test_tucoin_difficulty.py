@@ -0,0 +1,67 @@
+import unittest
+from types import SimpleNamespace
+
+from tucoin_difficulty import MAX_TARGET, Retargeter
+
+INITIAL_TARGET = 1 << 240
+
+
+def make_chain(spacings, target=INITIAL_TARGET):
+    """Chuỗi khối giả: khối thứ i cách khối trước spacings[i - 1] giây, cùng target."""
+    chain = [SimpleNamespace(index=0, timestamp=1000.0, target=None)]
+    for spacing in spacings:
+        chain.append(SimpleNamespace(index=len(chain), timestamp=chain[-1].timestamp + spacing,
+                                     target=target))
+    return chain
+
+
+class ExpectedTargetTest(unittest.TestCase):
+    """Target chỉ đổi ở các độ cao là bội của interval."""
+
+    def setUp(self):
+        self.retargeter = Retargeter(INITIAL_TARGET, interval=10, block_time=30.0, max_adjustment=4)
+
+    def test_between_boundaries(self):
+        chain = make_chain([1.0] * 25)
+        chain[10].target = INITIAL_TARGET // 4
+        self.assertEqual(self.retargeter.expected_target(chain, 0), INITIAL_TARGET)
+        for height in (1, 9, 11, 19):
+            with self.subTest(height=height):
+                self.assertEqual(self.retargeter.expected_target(chain, height),
+                                 self.retargeter._block_target(chain[height - 1]))
+
+    def test_on_time_keeps_target(self):
+        chain = make_chain([30.0] * 20)
+        self.assertEqual(self.retargeter.expected_target(chain, 10), INITIAL_TARGET)
+        self.assertEqual(self.retargeter.expected_target(chain, 20), INITIAL_TARGET)
+
+    def test_boundary_uses_previous_interval(self):
+        # Chỉ 9 khoảng giữa khối 0..9 được tính, khoảng 9 -> 10 thì không
+        chain = make_chain([15.0] * 9 + [1000.0] * 11)
+        self.assertEqual(self.retargeter.expected_target(chain, 10), INITIAL_TARGET // 2)
+
+        # Interval sau dùng các khối 10..19 và target của khối 19
+        chain[19].target = INITIAL_TARGET // 2
+        self.assertEqual(self.retargeter.expected_target(chain, 20), INITIAL_TARGET // 2 * 4)
+
+    def test_adjustment_clamped(self):
+        fast = make_chain([0.1] * 10)
+        self.assertEqual(self.retargeter.expected_target(fast, 10), INITIAL_TARGET // 4)
+
+        slow = make_chain([1000.0] * 10)
+        self.assertEqual(self.retargeter.expected_target(slow, 10), INITIAL_TARGET * 4)
+
+        easiest = make_chain([1000.0] * 10, target=MAX_TARGET)
+        retargeter = Retargeter(MAX_TARGET, interval=10)
+        self.assertEqual(retargeter.expected_target(easiest, 10), MAX_TARGET)
+
+    def test_genesis_uses_initial_target(self):
+        chain = make_chain([30.0] * 10)
+        chain[0].target = 12345
+        retargeter = Retargeter(INITIAL_TARGET, interval=2)
+        self.assertEqual(retargeter.expected_target(chain, 1), INITIAL_TARGET)
+        self.assertEqual(retargeter.next_target(chain[:1]), INITIAL_TARGET)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import socket
+import struct
+import threading
+import unittest
+from unittest import mock
+
+from tucoin_framing import FramingError, MessageReader, write_frame
+
+
+def frame(payload):
+    return struct.pack(">I", len(payload)) + payload
+
+
+class MessageReaderTest(unittest.TestCase):
+    """Giới hạn kích thước thông điệp và số bytes một peer được gửi."""
+
+    def setUp(self):
+        self.sender, self.receiver = socket.socketpair()
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.close()
+
+    def send(self, data):
+        # Gửi trong thread riêng để thông điệp lớn không chặn khi bộ đệm socket đầy
+        thread = threading.Thread(target=self.sender.sendall, args=(data,))
+        thread.start()
+        self.addCleanup(thread.join)
+
+    def test_messages(self):
+        reader = MessageReader(max_message_size=2 * MessageReader.RETAIN_SIZE)
+        big = b"x" * (MessageReader.RETAIN_SIZE + 1)
+        for payload in (b"", b"hello", big, b"after"):
+            self.send(frame(payload))
+            with self.subTest(size=len(payload)):
+                self.assertEqual(bytes(reader.read(self.receiver)), payload)
+
+        # Bộ đệm của thông điệp lớn không được giữ lại
+        self.assertLessEqual(len(reader._buffer), MessageReader.RETAIN_SIZE)
+
+    def test_message_limit(self):
+        reader = MessageReader(max_message_size=100)
+        write_frame(self.sender, b"x" * 100)
+        self.assertEqual(len(reader.read(self.receiver)), 100)
+
+        # Chỉ tiền tố độ dài được đọc: nội dung quá lớn không được cấp phát
+        self.sender.sendall(struct.pack(">I", 101))
+        with self.assertRaises(FramingError):
+            reader.read(self.receiver)
+        self.sender.sendall(struct.pack(">I", 0xFFFFFFFF))
+        with self.assertRaises(FramingError):
+            reader.read(self.receiver)
+        self.assertLessEqual(len(reader._buffer), 100)
+
+    def test_peer_limit(self):
+        reader = MessageReader(max_message_size=100, max_peer_bytes=250, window=60.0)
+        with mock.patch("tucoin_framing.time.monotonic", return_value=reader._window_start):
+            for _ in range(2):
+                write_frame(self.sender, b"x" * 100)
+                reader.read(self.receiver)
+            write_frame(self.sender, b"x" * 100)
+            with self.assertRaises(FramingError):
+                reader.read(self.receiver)
+
+        # Khoảng thời gian mới: giới hạn được tính lại từ đầu
+        self.receiver.recv(100)
+        with mock.patch("tucoin_framing.time.monotonic", return_value=reader._window_start + 60.0):
+            write_frame(self.sender, b"y" * 100)
+            self.assertEqual(bytes(reader.read(self.receiver)), b"y" * 100)
+
+    def test_closed_mid_message(self):
+        reader = MessageReader(max_message_size=100)
+        self.sender.sendall(frame(b"x" * 10)[:8])
+        self.sender.close()
+        self.assertIsNone(reader.read(self.receiver))
+
+    def test_read_async_limits(self):
+        async def read_all(data, reader):
+            stream = asyncio.StreamReader()
+            stream.feed_data(data)
+            stream.feed_eof()
+            messages = []
+            while True:
+                message = await reader.read_async(stream)
+                if message is None:
+                    return messages
+                messages.append(message)
+
+        reader = MessageReader(max_message_size=100)
+        self.assertEqual(asyncio.run(read_all(frame(b"a") + frame(b"bc"), reader)), [b"a", b"bc"])
+        self.assertEqual(asyncio.run(read_all(frame(b"a") + frame(b"bc")[:4], reader)), [b"a"])
+        with self.assertRaises(FramingError):
+            asyncio.run(read_all(frame(b"x" * 101), reader))
+
+        reader = MessageReader(max_message_size=100, max_peer_bytes=150)
+        with self.assertRaises(FramingError):
+            asyncio.run(read_all(frame(b"x" * 100) * 2, reader))
+
+
+if __name__ == "__main__":
+    unittest.main()
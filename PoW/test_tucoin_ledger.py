@@ -0,0 +1,81 @@
+import unittest
+
+from tucoin_ledger import LedgerOverlay
+from tucoin_template import BlockTemplateBuilder
+from tucoin_transaction import BLOCK_REWARD, REWARD_SENDER
+
+
+def transfer(sender, receiver, amount, timestamp=1.0):
+    return {"sender": sender, "receiver": receiver, "amount": amount, "timestamp": timestamp}
+
+
+class LedgerOverlayTest(unittest.TestCase):
+    """Quy tắc giao dịch dùng chung cho khối tự đào và khối nhận từ peer."""
+
+    def setUp(self):
+        self.ledger = LedgerOverlay.from_balances({"alice": 10.0})
+
+    def test_rejects_invalid_transfers(self):
+        cases = {
+            "negative": transfer("thief", "alice", -100.0),
+            "zero": transfer("alice", "bob", 0),
+            "self": transfer("alice", "alice", 1.0),
+            "reward sender": transfer(REWARD_SENDER, "bob", 1.0),
+            "overdraft": transfer("alice", "bob", 10.5),
+            "bool amount": transfer("alice", "bob", True),
+        }
+        for name, transaction in cases.items():
+            with self.subTest(name):
+                self.assertFalse(self.ledger.check(transaction))
+        self.assertEqual(self.ledger.balance("alice"), 10.0)
+
+    def test_running_balance(self):
+        self.assertTrue(self.ledger.add(transfer("alice", "bob", 6.0)))
+        self.assertFalse(self.ledger.add(transfer("alice", "carol", 6.0)))
+        self.assertTrue(self.ledger.add(transfer("bob", "carol", 6.0)))
+        self.assertEqual((self.ledger.balance("alice"), self.ledger.balance("bob"),
+                          self.ledger.balance("carol")), (4.0, 0.0, 6.0))
+
+    def test_malformed_block(self):
+        reward = transfer(REWARD_SENDER, "miner", BLOCK_REWARD)
+        for transactions in ({}, "tx", [None], [{"sender": "alice"}], [{}, reward],
+                             [{"amount": 1}, reward], [reward, reward],
+                             [transfer(REWARD_SENDER, "miner", BLOCK_REWARD * 2)]):
+            with self.subTest(transactions=transactions):
+                self.assertFalse(LedgerOverlay.from_balances({}).apply_block(transactions))
+
+    def test_reward_not_spendable_in_same_block(self):
+        reward = transfer(REWARD_SENDER, "miner", BLOCK_REWARD)
+        self.assertFalse(self.ledger.apply_block([transfer("miner", "bob", 1.0), reward]))
+
+        ledger = LedgerOverlay.from_balances({})
+        self.assertTrue(ledger.apply_block([reward]))
+        self.assertTrue(ledger.apply_block([transfer("miner", "bob", 1.0), reward]))
+        self.assertEqual(ledger.balance("miner"), 2 * BLOCK_REWARD - 1.0)
+
+
+class TemplateTest(unittest.TestCase):
+    """Bộ chọn giao dịch dùng cùng quy tắc với sổ cái tạm."""
+
+    def test_select_skips_invalid(self):
+        candidates = [transfer("alice", "bob", 8.0), transfer("alice", "bob", 8.0, 2.0),
+                      transfer("thief", "alice", -5.0), transfer("bob", "carol", 3.0),
+                      {"sender": "alice"}]
+        selected = BlockTemplateBuilder().select(candidates, LedgerOverlay.from_balances({"alice": 10.0}))
+        self.assertEqual(selected, [candidates[0], candidates[3]])
+
+    def test_select_limits(self):
+        candidates = [transfer("alice", "bob", 1.0, float(timestamp)) for timestamp in range(5)]
+        builder = BlockTemplateBuilder(max_transactions=3)
+        selected = builder.select(candidates, LedgerOverlay.from_balances({"alice": 10.0}),
+                                  [transfer(REWARD_SENDER, "miner", BLOCK_REWARD)])
+        self.assertEqual(selected, candidates[:2])
+
+        size = BlockTemplateBuilder.transaction_size(candidates[0])
+        builder = BlockTemplateBuilder(max_bytes=2 * size)
+        selected = builder.select(candidates, LedgerOverlay.from_balances({"alice": 10.0}))
+        self.assertEqual(selected, candidates[:2])
+
+
+if __name__ == "__main__":
+    unittest.main()
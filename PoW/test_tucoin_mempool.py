@@ -0,0 +1,84 @@
+import unittest
+from unittest import mock
+
+from tucoin_mempool import Mempool
+
+
+def transfer(sender, amount, timestamp=1.0):
+    return {"sender": sender, "receiver": "shop", "amount": amount, "timestamp": timestamp}
+
+
+class MempoolEvictionTest(unittest.TestCase):
+    """Mempool đầy: loại giao dịch ưu tiên thấp nhất, cũ nhất nếu bằng nhau."""
+
+    def setUp(self):
+        self.mempool = Mempool(max_size=3, max_age=None)
+        self.transactions = [transfer("alice", 5.0), transfer("bob", 1.0), transfer("carol", 3.0)]
+        self.txids = [self.mempool.add(transaction) for transaction in self.transactions]
+
+    def test_evicts_lowest_priority(self):
+        txid = self.mempool.add(transfer("dave", 4.0))
+        self.assertIsNotNone(txid)
+        self.assertEqual(len(self.mempool), 3)
+        self.assertNotIn(self.txids[1], self.mempool)
+        self.assertIn(txid, self.mempool)
+        self.assertEqual(self.mempool.pending_spend("bob"), 0.0)
+
+    def test_rejects_lower_or_equal_priority(self):
+        self.assertIsNone(self.mempool.add(transfer("dave", 0.5)))
+        self.assertIsNone(self.mempool.add(transfer("dave", 1.0)))
+        self.assertEqual(self.mempool.transactions(), self.transactions)
+        self.assertEqual(self.mempool.pending_spend("dave"), 0.0)
+
+    def test_oldest_evicted_on_tie(self):
+        mempool = Mempool(max_size=2, max_age=None)
+        with mock.patch("tucoin_mempool.time", side_effect=[1.0, 2.0, 3.0]):
+            first = mempool.add(transfer("alice", 1.0))
+            second = mempool.add(transfer("bob", 1.0))
+            third = mempool.add(transfer("carol", 2.0))
+        self.assertEqual((first in mempool, second in mempool, third in mempool), (False, True, True))
+
+    def test_removed_entries_not_evicted_again(self):
+        self.mempool.remove(self.txids[1])
+        self.assertIsNotNone(self.mempool.add(transfer("dave", 2.0)))
+        # Phần tử heap của giao dịch đã xóa bị bỏ qua: giao dịch thấp nhất còn lại bị loại
+        self.assertIsNotNone(self.mempool.add(transfer("erin", 2.5)))
+        self.assertEqual([transaction["sender"] for transaction in self.mempool.transactions()],
+                         ["alice", "carol", "erin"])
+
+
+class MempoolExpiryTest(unittest.TestCase):
+    """Giao dịch quá `max_age` giây bị loại khi có giao dịch mới."""
+
+    def test_expiry(self):
+        mempool = Mempool(max_age=10)
+        with mock.patch("tucoin_mempool.time", return_value=100.0):
+            old = mempool.add(transfer("alice", 5.0))
+        with mock.patch("tucoin_mempool.time", return_value=105.0):
+            recent = mempool.add(transfer("alice", 2.0))
+
+        # Đúng max_age giây: chưa hết hạn
+        with mock.patch("tucoin_mempool.time", return_value=110.0):
+            mempool.add(transfer("bob", 1.0))
+        self.assertIn(old, mempool)
+
+        with mock.patch("tucoin_mempool.time", return_value=110.5):
+            mempool.add(transfer("carol", 1.0))
+        self.assertNotIn(old, mempool)
+        self.assertIn(recent, mempool)
+        self.assertEqual(mempool.pending_spend("alice"), 2.0)
+
+        # Giao dịch đã hết hạn có thể được gửi lại
+        with mock.patch("tucoin_mempool.time", return_value=111.0):
+            self.assertEqual(mempool.add(transfer("alice", 5.0)), old)
+
+    def test_balance_limit(self):
+        mempool = Mempool()
+        self.assertIsNotNone(mempool.add(transfer("alice", 6.0), balance=10.0))
+        self.assertIsNone(mempool.add(transfer("alice", 5.0), balance=10.0))
+        self.assertIsNotNone(mempool.add(transfer("alice", 4.0), balance=10.0))
+        self.assertEqual(mempool.pending_spend("alice"), 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
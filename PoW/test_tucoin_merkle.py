@@ -0,0 +1,45 @@
+import hashlib
+import unittest
+
+from tucoin_merkle import (EMPTY_ROOT, _leaves, _next_level, merkle_proof, merkle_root,
+                           verify_merkle_proof)
+
+
+def txids(count):
+    return [hashlib.sha256(str(index).encode()).hexdigest() for index in range(count)]
+
+
+class MerkleTest(unittest.TestCase):
+    """Gốc Merkle và bằng chứng giao dịch."""
+
+    def test_proofs(self):
+        self.assertEqual(merkle_root([]), EMPTY_ROOT)
+        for count in range(1, 10):
+            ids = txids(count)
+            root = merkle_root(ids)
+            for position, txid in enumerate(ids):
+                with self.subTest(count=count, position=position):
+                    proof = merkle_proof(ids, position)
+                    self.assertTrue(verify_merkle_proof(txid, proof, root))
+                    self.assertFalse(verify_merkle_proof(txids(10)[-1], proof, root))
+
+    def test_inner_node_is_not_a_leaf(self):
+        # Các nút trong của [a, b, c] đưa vào như id giao dịch không cho cùng gốc
+        ids = txids(3)
+        inner = [node.hex() for node in _next_level(_leaves(ids))]
+        self.assertNotEqual(merkle_root(inner), merkle_root(ids))
+
+        # Gốc của một giao dịch không phải chính id của nó
+        self.assertNotEqual(merkle_root(ids[:1]), ids[0])
+
+        # Trong bằng chứng, nút trong không thay được cho lá
+        proof = merkle_proof(ids, 0)
+        self.assertFalse(verify_merkle_proof(inner[0], proof[1:], merkle_root(ids)))
+
+    def test_odd_node_not_duplicated(self):
+        ids = txids(3)
+        self.assertNotEqual(merkle_root(ids), merkle_root(ids + ids[-1:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+from tucoin_blockchain import Blockchain
+from tucoin_storage import BlockStore
+
+
+class TruncateTest(unittest.TestCase):
+    """Cắt kho khối rồi mở lại: chỉ còn các khối được giữ, nối tiếp được."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = BlockStore(self.directory.name)
+        blockchain = Blockchain(difficulty=1, store=self.store)
+        for index in range(6):
+            blockchain.add_transaction("0", f"user{index}", 1.0)
+            blockchain.mine_block("miner")
+        self.hashes = [block.hash for block in self.store]
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def reopen(self):
+        self.store.close()
+        self.store = BlockStore(self.directory.name)
+        return self.store
+
+    def test_truncate_survives_restart(self):
+        data_path = os.path.join(self.directory.name, BlockStore.DATA_FILE)
+        self.store.truncate(3)
+        size = os.path.getsize(data_path)
+
+        store = self.reopen()
+        self.assertEqual(len(store), 3)
+        self.assertEqual([block.hash for block in store], self.hashes[:3])
+        self.assertEqual(os.path.getsize(data_path), size)
+        for height, block_hash in enumerate(self.hashes):
+            with self.subTest(height=height):
+                self.assertEqual(store.get_height(block_hash), height if height < 3 else None)
+        self.assertIsNone(store.get_block(3))
+
+    def test_append_after_truncate_and_restart(self):
+        del self.store[2:]
+        store = self.reopen()
+
+        # Nối một nhánh mới sau khối giữ lại cuối cùng
+        blockchain = Blockchain(difficulty=1, store=store)
+        self.assertEqual(len(blockchain.chain), 2)
+        blockchain.mine_block("other")
+        new_hash = store[2].hash
+        self.assertNotEqual(new_hash, self.hashes[2])
+
+        store = self.reopen()
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.get_height(new_hash), 2)
+        self.assertIsNone(store.get_height(self.hashes[2]))
+        self.assertEqual(store[2].transactions[-1]["receiver"], "other")
+        self.assertTrue(Blockchain(difficulty=1, store=store).is_chain_valid())
+
+    def test_truncate_beyond_end(self):
+        self.store.truncate(10)
+        self.assertEqual(len(self.reopen()), len(self.hashes))
+
+
+if __name__ == "__main__":
+    unittest.main()
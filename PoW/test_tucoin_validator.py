@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+
+from tucoin_blockchain import Block, Blockchain
+from tucoin_compact import AddressTable
+from tucoin_storage import BlockStore
+from tucoin_validator import ChainValidator
+
+
+def tampered(block, **fields):
+    """Bản sao khối với một số trường bị sửa (hash giữ nguyên như khi nhận từ peer)."""
+    values = dict(index=block.index, timestamp=block.timestamp, transactions=block.transactions,
+                  proof=block.proof, previous_hash=block.previous_hash,
+                  merkle_root=block.merkle_root, target=block.target)
+    values.update(fields)
+    copy = Block(**values)
+    copy.hash = block.hash
+    return copy
+
+
+class OwnedChain(list):
+    """Chuỗi chỉ được đọc trong tiến trình đã tạo nó."""
+
+    def __init__(self, blocks):
+        super().__init__(blocks)
+        self.pid = os.getpid()
+
+    def __getitem__(self, item):
+        if os.getpid() != self.pid:
+            raise RuntimeError("tiến trình con đọc chuỗi")
+        return super().__getitem__(item)
+
+
+class ParallelValidatorTest(unittest.TestCase):
+    """Kiểm tra song song cho cùng kết quả với kiểm tra tuần tự."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.store = BlockStore(cls.directory.name)
+        cls.blockchain = Blockchain(difficulty=1, compact=True, store=cls.store)
+        for index in range(40):
+            cls.blockchain.add_transaction("0", f"user{index % 3}", 1.0)
+            cls.blockchain.mine_block(f"miner{index % 2}")
+        cls.chain = [Block.from_dict(block.to_dict()) for block in cls.store]
+        cls.chain[5].prune()
+        cls.chain[6].compact(AddressTable())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.store.close()
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.validator = ChainValidator(workers=2, chunk_size=4)
+
+    def tearDown(self):
+        self.validator.close()
+
+    def find_invalid(self, chain):
+        retargeter = self.blockchain._retargeter
+        parallel = self.validator.find_invalid_block(chain, retargeter)
+        self.assertEqual(parallel, ChainValidator().find_invalid_block(chain, retargeter))
+        return parallel
+
+    def test_valid(self):
+        self.assertIsNone(self.find_invalid(self.chain))
+
+    def test_pool_reused_until_closed(self):
+        self.assertIsNone(self.find_invalid(self.chain))
+        pool = self.validator._pool
+        self.assertIsNotNone(pool)
+
+        chain = list(self.chain)
+        chain[9] = tampered(chain[9], timestamp=chain[9].timestamp + 1)
+        self.assertEqual(self.find_invalid(chain), 9)
+        self.assertIsNone(self.find_invalid(self.chain))
+        self.assertIs(self.validator._pool, pool)
+
+        self.validator.close()
+        self.assertIsNone(self.validator._pool)
+
+    def test_first_invalid_block(self):
+        chain = list(self.chain)
+        chain[30] = tampered(chain[30], proof=chain[30].proof + 1)
+        chain[17] = tampered(chain[17], transactions=[])
+        self.assertEqual(self.find_invalid(chain), 17)
+
+    def test_workers_do_not_read_chain(self):
+        # Tiến trình con chỉ nhận các trường của khối, không đọc chuỗi (có
+        # thể là BlockStore với khóa do thread khác đang giữ)
+        self.assertIsNone(self.find_invalid(OwnedChain(self.chain)))
+
+
+if __name__ == "__main__":
+    unittest.main()
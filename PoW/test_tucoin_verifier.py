@@ -0,0 +1,51 @@
+import unittest
+
+from tucoin_transaction import sign_transaction
+from tucoin_verifier import SignatureVerifier
+from tucoin_wallet import Wallet
+
+
+def _payments(count):
+    wallet = Wallet()
+    return [wallet.sign_transaction({"sender": wallet.address, "receiver": "shop",
+                                     "amount": 1.0, "timestamp": float(index)})
+            for index in range(count)]
+
+
+class SignatureVerifierTest(unittest.TestCase):
+    """Kiểm tra chữ ký theo lô, trong tiến trình hiện tại hoặc trên nhóm tiến trình."""
+
+    def setUp(self):
+        self.transactions = _payments(40)
+
+        # Giao dịch ký bằng khóa của người khác và giao dịch bị sửa sau khi ký
+        stolen = sign_transaction(dict(self.transactions[0], timestamp=-1.0), Wallet().private_key)
+        tampered = dict(self.transactions[1], amount=1000.0)
+        self.transactions[5] = stolen
+        self.transactions[30] = tampered
+        self.expected = [index not in (5, 30) for index in range(len(self.transactions))]
+
+    def test_inline(self):
+        verifier = SignatureVerifier(workers=2, batch_size=8)
+        self.assertEqual(verifier.verify_transactions(self.transactions), self.expected)
+        self.assertIsNone(verifier._pool)
+
+    def test_pool_reused_until_closed(self):
+        verifier = SignatureVerifier(workers=2, batch_size=8, parallel_threshold=16)
+        try:
+            self.assertEqual(verifier.verify_transactions(self.transactions), self.expected)
+            pool = verifier._pool
+            self.assertIsNotNone(pool)
+
+            # Giao dịch hợp lệ đã được ghi nhớ; chỉ hai giao dịch sai được kiểm tra lại
+            self.assertEqual(verifier.verify_transactions(self.transactions), self.expected)
+            more = _payments(20)
+            self.assertEqual(verifier.verify_transactions(more), [True] * 20)
+            self.assertIs(verifier._pool, pool)
+        finally:
+            verifier.close()
+        self.assertIsNone(verifier._pool)
+
+
+if __name__ == "__main__":
+    unittest.main()
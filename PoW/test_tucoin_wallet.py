@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+import tempfile
+import unittest
+
+from tucoin_wallet import Wallet, WalletManager
+
+PRIVATE_KEY = "11" * 32
+
+# Địa chỉ của phiên bản trước: tạo từ khóa riêng tư
+LEGACY_ADDRESS = "TU" + hashlib.sha256(PRIVATE_KEY.encode()).hexdigest()[:40]
+
+
+class MigrationTest(unittest.TestCase):
+    """Chuyển file ví đặt theo địa chỉ cũ chỉ khi được yêu cầu, không xóa file."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.wallet_dir = self.directory.name
+        self.legacy_path = os.path.join(self.wallet_dir, LEGACY_ADDRESS + ".json")
+        with open(self.legacy_path, "w") as file:
+            json.dump({"private_key": PRIVATE_KEY, "address": LEGACY_ADDRESS}, file)
+        self.address = Wallet(PRIVATE_KEY).address
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_constructor_leaves_files(self):
+        manager = WalletManager(self.wallet_dir)
+        self.assertEqual(os.listdir(self.wallet_dir), [LEGACY_ADDRESS + ".json"])
+
+        wallet = manager.load_wallet(LEGACY_ADDRESS)
+        self.assertEqual((wallet.address, wallet.legacy_address), (self.address, LEGACY_ADDRESS))
+
+    def test_migrate_keeps_backup(self):
+        manager = WalletManager(self.wallet_dir)
+        self.assertEqual(manager.migrate_wallet_files(), [self.address])
+        self.assertEqual(sorted(os.listdir(self.wallet_dir)),
+                         sorted([self.address + ".json", LEGACY_ADDRESS + ".json.bak"]))
+
+        with open(self.legacy_path + ".bak") as file:
+            self.assertEqual(json.load(file)["private_key"], PRIVATE_KEY)
+
+        wallet = manager.load_wallet(LEGACY_ADDRESS)
+        self.assertEqual((wallet.address, wallet.private_key), (self.address, PRIVATE_KEY))
+        self.assertEqual(manager.list_wallets(), [self.address])
+
+        # Lần chạy sau không còn gì để chuyển
+        self.assertEqual(manager.migrate_wallet_files(), [])
+
+    def test_existing_backup_not_overwritten(self):
+        with open(self.legacy_path + ".bak", "w") as file:
+            file.write("old backup")
+
+        self.assertEqual(WalletManager(self.wallet_dir).migrate_wallet_files(), [])
+        self.assertTrue(os.path.exists(self.legacy_path))
+        with open(self.legacy_path + ".bak") as file:
+            self.assertEqual(file.read(), "old backup")
+
+
+if __name__ == "__main__":
+    unittest.main()
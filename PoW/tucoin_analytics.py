@@ -0,0 +1,222 @@
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy là phụ thuộc tùy chọn, chỉ cần cho module này
+    np = None
+
+from tucoin_transaction import REWARD_SENDER
+
+if TYPE_CHECKING:
+    from tucoin_blockchain import Blockchain
+
+
+class _GrowableArray:
+    """Mảng NumPy có thể nối thêm phần tử (dung lượng tăng gấp đôi khi đầy)."""
+
+    def __init__(self, dtype):
+        self._data = np.empty(1024, dtype=dtype)
+        self._size = 0
+
+    def extend(self, values) -> None:
+        values = np.asarray(values, dtype=self._data.dtype)
+        needed = self._size + len(values)
+        if needed > len(self._data):
+            data = np.empty(max(needed, 2 * len(self._data)), dtype=self._data.dtype)
+            data[:self._size] = self._data[:self._size]
+            self._data = data
+        self._data[self._size:needed] = values
+        self._size = needed
+
+    def truncate(self, size: int) -> None:
+        self._size = min(size, self._size)
+
+    @property
+    def values(self):
+        """Phần dữ liệu đang dùng (view, không sao chép)."""
+        return self._data[:self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class LedgerAnalytics:
+    """
+    Thống kê toàn bộ sổ cái bằng các phép toán vector của NumPy.
+
+    Giao dịch của chuỗi được xuất một lần sang các mảng cột (người gửi,
+    người nhận, số tiền); `refresh()` chỉ xuất thêm các khối mới và tự hoàn
+    tác phần đã xuất của những khối bị loại bỏ khi chuỗi đổi nhánh.
+    """
+
+    def __init__(self, blockchain: 'Blockchain'):
+        """
+        Args:
+            blockchain: Blockchain cần thống kê
+
+        Raises:
+            ImportError: Nếu chưa cài NumPy
+        """
+        if np is None:
+            raise ImportError("LedgerAnalytics cần NumPy (pip install numpy)")
+
+        self.blockchain = blockchain
+
+        # Bảng địa chỉ: id số nguyên <-> chuỗi địa chỉ
+        self._address_ids: Dict[str, int] = {}
+        self._addresses: List[str] = []
+
+        # Các cột giao dịch
+        self._senders = _GrowableArray(np.int64)
+        self._receivers = _GrowableArray(np.int64)
+        self._amounts = _GrowableArray(np.float64)
+
+        # Vị trí giao dịch đầu tiên của mỗi khối đã xuất và hash của khối
+        self._block_offsets: List[int] = []
+        self._block_hashes: List[str] = []
+
+        # Số dư của mọi địa chỉ (theo id), cập nhật dần khi có khối mới
+        self._balances = np.zeros(0, dtype=np.float64)
+
+        self.refresh()
+
+    def _address_id(self, address: str) -> int:
+        """Id của một địa chỉ, thêm mới nếu chưa có."""
+        address_id = self._address_ids.get(address)
+        if address_id is None:
+            address_id = self._address_ids[address] = len(self._addresses)
+            self._addresses.append(address)
+        return address_id
+
+    def _fork_height(self, chain) -> int:
+        """Số khối đã xuất vẫn còn nằm trong chuỗi hiện tại."""
+        height = min(len(self._block_hashes), len(chain))
+        while height > 0 and chain[height - 1].hash != self._block_hashes[height - 1]:
+            height -= 1
+        return height
+
+    def _truncate(self, height: int) -> None:
+        """Bỏ phần đã xuất của các khối từ độ cao `height` trở lên."""
+        if height >= len(self._block_offsets):
+            return
+
+        size = self._block_offsets[height]
+        del self._block_offsets[height:]
+        del self._block_hashes[height:]
+        self._senders.truncate(size)
+        self._receivers.truncate(size)
+        self._amounts.truncate(size)
+
+        # Tính lại toàn bộ số dư từ các cột (một phép group-by)
+        self._balances = self._group_balances(0, size)
+
+    def _group_balances(self, start: int, stop: int):
+        """Thay đổi số dư của mọi địa chỉ do các giao dịch trong [start, stop)."""
+        count = len(self._addresses)
+        amounts = self._amounts.values[start:stop]
+        return (np.bincount(self._receivers.values[start:stop], weights=amounts, minlength=count) -
+                np.bincount(self._senders.values[start:stop], weights=amounts, minlength=count))
+
+    def refresh(self) -> int:
+        """
+        Xuất các khối mới của chuỗi sang mảng.
+
+        Returns:
+            Số khối mới được xuất
+        """
+        with self.blockchain.lock:
+            chain = self.blockchain.chain
+            self._truncate(self._fork_height(chain))
+
+            start_height = len(self._block_hashes)
+            start = len(self._amounts)
+            senders: List[int] = []
+            receivers: List[int] = []
+            amounts: List[float] = []
+
+            for block in chain[start_height:]:
+                self._block_offsets.append(start + len(amounts))
+                self._block_hashes.append(block.hash)
+                for transaction in block.transactions:
+                    senders.append(self._address_id(transaction["sender"]))
+                    receivers.append(self._address_id(transaction["receiver"]))
+                    amounts.append(transaction["amount"])
+
+        self._senders.extend(senders)
+        self._receivers.extend(receivers)
+        self._amounts.extend(amounts)
+
+        # Cộng thay đổi số dư của các giao dịch mới
+        balances = np.zeros(len(self._addresses), dtype=np.float64)
+        balances[:len(self._balances)] = self._balances
+        self._balances = balances + self._group_balances(start, len(self._amounts))
+
+        return len(self._block_hashes) - start_height
+
+    @property
+    def addresses(self) -> List[str]:
+        """Các địa chỉ đã xuất hiện, theo id."""
+        return self._addresses
+
+    def balance_array(self):
+        """Số dư của mọi địa chỉ dạng mảng, cùng thứ tự với `addresses`."""
+        return self._balances
+
+    def balances(self) -> Dict[str, float]:
+        """Số dư của mọi địa chỉ (trừ địa chỉ hệ thống)."""
+        return {address: float(balance)
+                for address, balance in zip(self._addresses, self._balances.tolist())
+                if address != REWARD_SENDER}
+
+    def top_holders(self, count: int = 10) -> List[Tuple[str, float]]:
+        """
+        Danh sách các địa chỉ có số dư lớn nhất.
+
+        Args:
+            count: Số địa chỉ cần lấy
+
+        Returns:
+            Các cặp (địa chỉ, số dư), số dư giảm dần
+        """
+        balances = self._balances
+        available = len(balances)
+
+        # Loại địa chỉ hệ thống trước khi chọn, để vẫn trả về đủ count địa chỉ
+        reward_id = self._address_ids.get(REWARD_SENDER)
+        if reward_id is not None and reward_id < available:
+            balances = balances.copy()
+            balances[reward_id] = -np.inf
+            available -= 1
+
+        count = min(count, available)
+        if count <= 0:
+            return []
+
+        # Chọn count phần tử lớn nhất trong O(n), rồi chỉ sắp xếp các phần tử đó
+        candidates = np.argpartition(-balances, count - 1)[:count]
+        candidates = candidates[np.argsort(-balances[candidates], kind="stable")]
+        return [(self._addresses[index], float(balances[index])) for index in candidates]
+
+    def _reward_mask(self):
+        """Mặt nạ các giao dịch phần thưởng."""
+        reward_id = self._address_ids.get(REWARD_SENDER)
+        if reward_id is None:
+            return np.zeros(len(self._amounts), dtype=bool)
+        return self._senders.values == reward_id
+
+    def supply(self) -> float:
+        """Tổng lượng TuCoin đang lưu hành (tổng phần thưởng đào)."""
+        return float(self._amounts.values[self._reward_mask()].sum())
+
+    def miner_rewards(self) -> Dict[str, float]:
+        """Tổng phần thưởng đào của từng địa chỉ."""
+        mask = self._reward_mask()
+        totals = np.bincount(self._receivers.values[mask], weights=self._amounts.values[mask],
+                             minlength=len(self._addresses))
+        miners = np.flatnonzero(totals)
+        return {self._addresses[index]: float(totals[index]) for index in miners}
+
+    def transactions_per_block(self):
+        """Số giao dịch trong mỗi khối, theo độ cao."""
+        offsets = np.array(self._block_offsets + [len(self._amounts)], dtype=np.int64)
+        return np.diff(offsets)
@@ -0,0 +1,358 @@
+import asyncio
+import logging
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Coroutine, Dict, List, Optional, Set, Tuple, TypeVar
+
+from tucoin_blockchain import Blockchain
+from tucoin_connection import (DELIVERED, FAILED, QUARANTINED, TIMED_OUT,
+                               AsyncPeerConnection, PeerQuarantine)
+from tucoin_framing import FramingError, write_frame_async
+from tucoin_node import _BLOCK_HOOKS, Node
+
+logger = logging.getLogger('TuCoin-Node')
+
+T = TypeVar("T")
+
+
+class _BlockingConnection:
+    """Dùng một `AsyncPeerConnection` từ thread khác, như một `PeerConnection`."""
+
+    def __init__(self, connection: AsyncPeerConnection, loop: asyncio.AbstractEventLoop):
+        self.address = connection.address
+        self._connection = connection
+        self._loop = loop
+
+    def request(self, payload: bytes) -> Dict[str, Any]:
+        return asyncio.run_coroutine_threadsafe(self._connection.request(payload),
+                                                self._loop).result()
+
+
+class AsyncNode(Node):
+    """
+    Node dùng một event loop asyncio cho mọi kết nối mạng.
+
+    Cùng giao thức và cùng API công khai với `Node`, nhưng kết nối đến,
+    kết nối đến peer và phát sóng đều chạy trên một event loop duy nhất
+    (trong một thread nền) thay vì mỗi kết nối một thread, nên node giữ
+    được hàng nghìn kết nối cùng lúc. Việc tốn CPU (giải mã thông điệp,
+    kiểm tra và thêm khối) chạy trong một nhóm thread nhỏ có kích thước cố
+    định; việc phải chờ peer trả lời (đồng bộ chuỗi, tải mục INV) chạy
+    trong một nhóm thread riêng, nên không thể chiếm hết thread xử lý
+    thông điệp. Các phương thức công khai chặn cho đến khi xong và không
+    được gọi từ thread của event loop.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 5000,
+                 blockchain: Optional[Blockchain] = None,
+                 connect_timeout: float = 3.0, send_timeout: float = 10.0,
+                 workers: int = 4, sync_workers: int = 2):
+        """
+        Khởi tạo một node mới.
+
+        Args:
+            host: Địa chỉ IP của node
+            port: Cổng lắng nghe
+            blockchain: Blockchain hiện có (nếu không có, tạo mới)
+            connect_timeout: Thời gian chờ kết nối đến peer (giây)
+            send_timeout: Thời gian chờ gửi (hoặc nhận phản hồi) một thông
+                điệp đến peer (giây)
+            workers: Số thread xử lý thông điệp
+            sync_workers: Số thread chờ peer khi đồng bộ chuỗi hoặc tải mục
+        """
+        super().__init__(host, port, blockchain, connect_timeout, send_timeout)
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tucoin-worker")
+        self._sync_executor = ThreadPoolExecutor(max_workers=sync_workers,
+                                                 thread_name_prefix="tucoin-sync")
+
+        # Các task nền; chỉ dùng trên thread của loop
+        self._tasks: Set[asyncio.Task] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+        # Event loop chạy trong thread nền ngay từ đầu, để có thể kết nối
+        # đến peer và phát sóng cả khi node chưa lắng nghe
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever,
+                                             name="tucoin-loop", daemon=True)
+        self._loop_thread.start()
+
+    def _open_transport(self, broadcast_workers: int) -> None:
+        """
+        Chuẩn bị kết nối đến peer trên event loop.
+
+        Không tạo nhóm kết nối và bộ phát sóng theo thread của `Node`: kết
+        nối được tạo khi cần (xem `_connection`) và phát sóng chạy trên loop.
+        """
+        self._quarantine = PeerQuarantine()
+
+        # Kết nối đến các peer; chỉ dùng trên thread của loop
+        self._connections: Dict[str, AsyncPeerConnection] = {}
+
+    def _close_transport(self) -> None:
+        """Kết nối đến peer đã được đóng cùng event loop (xem `_shutdown`)."""
+
+    def _call(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """Chạy một coroutine trên event loop và chờ kết quả."""
+        if not self._loop.is_running():
+            coroutine.close()
+            raise RuntimeError("node đã dừng")
+        if threading.current_thread() is self._loop_thread:
+            coroutine.close()
+            raise RuntimeError("không thể chờ event loop từ chính thread của nó")
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def _spawn(self, coroutine: Coroutine[Any, Any, Any]) -> None:
+        """Chạy một coroutine nền trên event loop (giữ tham chiếu đến khi xong)."""
+        task = self._loop.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _connection(self, address: str) -> AsyncPeerConnection:
+        """
+        Lấy kết nối lâu dài đến một peer (tạo mới nếu chưa có).
+
+        Phản hồi được giải mã trong executor mặc định của loop, không phải
+        nhóm thread đồng bộ: các lượt đồng bộ chạy trong nhóm đó chờ phản
+        hồi, nên dùng chung nhóm có thể làm mọi thread chờ lẫn nhau.
+        """
+        connection = self._connections.get(address)
+        if connection is None:
+            connection = self._connections[address] = AsyncPeerConnection(
+                address, self.MAX_MESSAGE_SIZE, self.MAX_PEER_BYTES, _BLOCK_HOOKS,
+                connect_timeout=self.connect_timeout, timeout=self.send_timeout)
+        return connection
+
+    def start(self) -> bool:
+        """Khởi động node và bắt đầu lắng nghe kết nối."""
+        try:
+            self.server_socket.bind((self.host, self.port))
+            self.server_socket.setblocking(False)
+            self.running = True
+            self._call(self._start_server())
+
+            logger.info(f"Node đang lắng nghe tại {self.host}:{self.port}")
+            return True
+        except Exception as e:
+            self.running = False
+            logger.error(f"Không thể khởi động node: {e}")
+            return False
+
+    async def _start_server(self) -> None:
+        # Hàng đợi kết nối lớn để nhiều peer kết nối cùng lúc không bị từ chối
+        self._server = await asyncio.start_server(self._serve, sock=self.server_socket,
+                                                  backlog=socket.SOMAXCONN)
+
+    def stop(self) -> None:
+        """Dừng node."""
+        self.running = False
+        if self._loop.is_running():
+            self._call(self._shutdown())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join()
+            self._loop.close()
+        self._executor.shutdown(wait=False)
+        self._sync_executor.shutdown(wait=False)
+        super().stop()
+
+    async def _shutdown(self) -> None:
+        """Đóng server, các kết nối và hủy mọi task còn chạy trên loop."""
+        if self._server is not None:
+            self._server.close()
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def connect_to_peer(self, host: str, port: int) -> bool:
+        """
+        Kết nối đến một node khác.
+
+        Args:
+            host: Địa chỉ IP của node đích
+            port: Cổng của node đích
+
+        Returns:
+            True nếu kết nối thành công, False nếu không
+        """
+        return self._call(self._connect_to_peer(host, port))
+
+    async def _connect_to_peer(self, host: str, port: int) -> bool:
+        peer_address = f"{host}:{port}"
+
+        if peer_address == self.address:
+            logger.warning("Không thể kết nối đến chính mình")
+            return False
+
+        if peer_address in self.peers:
+            # Peer đã biết: chỉ đồng bộ lại phần chuỗi còn thiếu
+            logger.info(f"Đã kết nối đến {peer_address} trước đó, đồng bộ lại chuỗi")
+            return await self._sync_with_peer(peer_address)
+
+        try:
+            connection = self._connection(peer_address)
+            response = await connection.request(self._encode_message(self._connect_message()))
+
+            if response.get("type") != "CONNECT_ACK":
+                return False
+
+            # Thêm peer vào danh sách (bỏ cách ly nếu peer từng bị lỗi)
+            self._register_peer(peer_address, response.get("data", {}))
+            self._quarantine.forget(peer_address)
+
+            # Kết nối đến các peer mới được giới thiệu bằng task nền
+            for peer in response.get("data", {}).get("peers", []):
+                if peer != self.address and peer not in self.peers:
+                    peer_host, peer_port = peer.split(":")
+                    self._spawn(self._connect_to_peer(peer_host, int(peer_port)))
+
+            # Đồng bộ phần chuỗi còn thiếu trên cùng kết nối
+            await self._run_sync(connection)
+
+            logger.info(f"Đã kết nối thành công đến {peer_address}")
+
+            # Cập nhật UI nếu có callback (trong thread xử lý, như ở Node)
+            if self.update_callback:
+                await self._loop.run_in_executor(self._executor, self.update_callback)
+
+            return True
+
+        except Exception as e:
+            logger.error(f"Không thể kết nối đến {peer_address}: {e}")
+            return False
+
+    def sync_with_peer(self, host: str, port: int) -> bool:
+        """
+        Đồng bộ chuỗi với một peer (tải header trước, rồi các khối còn thiếu).
+
+        Args:
+            host: Địa chỉ IP của peer
+            port: Cổng của peer
+
+        Returns:
+            True nếu đồng bộ thành công (kể cả khi không có gì mới)
+        """
+        return self._call(self._sync_with_peer(f"{host}:{port}"))
+
+    async def _sync_with_peer(self, peer_address: str) -> bool:
+        try:
+            return await self._run_sync(self._connection(peer_address))
+        except Exception as e:
+            logger.error(f"Không thể đồng bộ với {peer_address}: {e}")
+            return False
+
+    async def _run_sync(self, connection: AsyncPeerConnection) -> bool:
+        """
+        Chạy `_sync_chain` trong nhóm thread đồng bộ.
+
+        Việc kiểm tra header và thay chuỗi tốn CPU nên không chạy trên event
+        loop; các yêu cầu mạng của nó được gửi lại loop qua kết nối chặn.
+        Lượt đồng bộ giữ thread trong lúc chờ peer nên không dùng nhóm thread
+        xử lý: nhiều lượt cùng lúc chỉ phải chờ nhau, thông điệp đến vẫn
+        được xử lý.
+        """
+        return await self._loop.run_in_executor(
+            self._sync_executor, self._sync_chain, _BlockingConnection(connection, self._loop))
+
+    async def _serve(self, stream: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Xử lý một kết nối đến.
+
+        Args:
+            stream: Luồng đọc của kết nối
+            writer: Luồng ghi của kết nối
+        """
+        reader = self._new_reader()
+        try:
+            # Xử lý lần lượt các thông điệp cho đến khi peer đóng kết nối
+            while self.running:
+                try:
+                    payload = await asyncio.wait_for(reader.read_async(stream),
+                                                     self.CONNECTION_TIMEOUT)
+                except asyncio.TimeoutError:
+                    # Peer không gửi gì trong thời gian chờ: đóng kết nối
+                    break
+                except FramingError as e:
+                    logger.warning(f"Bỏ kết nối do thông điệp quá lớn: {e}")
+                    break
+
+                if payload is None:
+                    break
+
+                reply = await self._loop.run_in_executor(self._executor, self._process_payload, payload)
+                if reply is not None:
+                    await write_frame_async(writer, reply, self.send_timeout)
+
+        except asyncio.CancelledError:
+            # Node đang dừng: kết thúc bình thường, vì asyncio ghi lỗi cho
+            # task xử lý kết nối kết thúc bằng CancelledError
+            return
+        except Exception as e:
+            logger.error(f"Lỗi khi xử lý kết nối: {e}")
+        finally:
+            writer.close()
+
+    def _send_to_peers(self, payloads: Dict[str, bytes]) -> Dict[str, str]:
+        """
+        Gửi đồng thời thông điệp đã mã hóa riêng cho từng peer.
+
+        Mọi peer được gửi đồng thời trên event loop; peer chưa gửi xong sau
+        send_timeout giây bị hủy lượt gửi. Peer thất bại nhiều lần liên tiếp
+        bị cách ly một thời gian thay vì bị xóa khỏi danh sách.
+
+        Args:
+            payloads: Địa chỉ peer -> thông điệp đã mã hóa
+
+        Returns:
+            Kết quả của từng peer: "delivered", "failed", "timed_out" hoặc
+            "quarantined"
+        """
+        if not payloads:
+            return {}
+
+        results = self._call(self._broadcast(payloads))
+
+        for peer, result in results.items():
+            if result not in (DELIVERED, QUARANTINED):
+                logger.warning(f"Không thể phát sóng đến {peer}: {result}")
+        return results
+
+    def _fetch_inventory(self, source: str, items: List[Tuple[str, str]]) -> None:
+        """Tải các mục từ peer trong nhóm thread đồng bộ (không chặn xử lý thông điệp)."""
+        async def fetch() -> None:
+            connection = _BlockingConnection(self._connection(source), self._loop)
+            await self._loop.run_in_executor(self._sync_executor, self._request_inventory,
+                                             connection, items)
+
+        self._loop.call_soon_threadsafe(self._spawn, fetch())
+
+    def _request_sync(self, source: str) -> None:
+        """Đồng bộ chuỗi với peer bằng task nền (không giữ thread xử lý khi chờ)."""
+        self._loop.call_soon_threadsafe(self._spawn, self._sync_with_peer(source))
+
+    async def _broadcast(self, payloads: Dict[str, bytes]) -> Dict[str, str]:
+        results = await asyncio.gather(*(self._deliver(peer, payload)
+                                         for peer, payload in payloads.items()))
+        return dict(zip(payloads, results))
+
+    async def _deliver(self, peer: str, payload: bytes) -> str:
+        """Gửi đến một peer và ghi nhận kết quả để cách ly peer lỗi."""
+        if self._quarantine.is_quarantined(peer):
+            return QUARANTINED
+
+        try:
+            await asyncio.wait_for(self._connection(peer).send(payload), self.send_timeout)
+        except asyncio.TimeoutError:
+            result = TIMED_OUT
+        except Exception:
+            result = FAILED
+        else:
+            result = DELIVERED
+
+        self._quarantine.record(peer, result == DELIVERED)
+        return result
@@ -1,84 +1,443 @@
 import hashlib
 import json
+import threading
+from collections import deque
 from time import time
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Deque, Sequence, Set, Union, TYPE_CHECKING
+
+from tucoin_chaincache import ChainCache
+from tucoin_compact import AddressTable, TransactionColumns
+from tucoin_difficulty import Retargeter, target_to_difficulty
+from tucoin_history import AddressHistory
+from tucoin_ledger import LedgerOverlay
+from tucoin_mempool import Mempool
+from tucoin_merkle import ProofStep, merkle_proof, merkle_root, verify_merkle_proof
+from tucoin_miner import CancelToken, MinerError, ParallelMiner, ProofChecker, difficulty_to_target
+from tucoin_snapshot import LedgerCheckpoint, StateSnapshot
+from tucoin_template import BlockTemplateBuilder
+from tucoin_transaction import (BLOCK_REWARD, REWARD_SENDER, is_signed, is_well_formed_block,
+                                transaction_id, without_reward)
+from tucoin_validator import ChainValidator
+from tucoin_verifier import SignatureVerifier
+
+if TYPE_CHECKING:
+    from tucoin_storage import BlockStore
 
 class Block:
     """Đại diện cho một khối trong blockchain TuCoin."""
     
+    __slots__ = ("index", "timestamp", "proof", "previous_hash", "_merkle_root", "target",
+                 "_transactions", "_hash", "_encoded", "_serialized")
+    
     def __init__(self, index: int, timestamp: float, transactions: List[Dict], 
-                 proof: int, previous_hash: str):
+                 proof: int, previous_hash: str, merkle_root: Optional[str] = None,
+                 target: Optional[int] = None):
         """
         Khởi tạo một khối mới.
         
+        Hash của khối được tính khi cần lần đầu tiên, vì vậy các trường của
+        khối không được thay đổi sau khi tạo.
+        
         Args:
             index: Số thứ tự của khối
             timestamp: Thời gian tạo khối (Unix timestamp)
-            transactions: Danh sách các giao dịch trong khối
+            transactions: Danh sách các giao dịch trong khối (None nếu khối
+                đã bị cắt tỉa, chỉ còn header)
             proof: Giá trị nonce (trong PoW)
             previous_hash: Hash của khối trước đó
+            merkle_root: Gốc Merkle nhận được cùng khối (tính từ giao dịch
+                nếu không có; được kiểm tra lại khi kiểm tra khối)
+            target: Ngưỡng proof of work của khối (số nguyên 256 bit)
         """
         self.index = index
         self.timestamp = timestamp
-        self.transactions = transactions
+        self._transactions = transactions
         self.proof = proof
         self.previous_hash = previous_hash
-        self.hash = self.calculate_hash()
+        self._merkle_root = merkle_root
+        self.target = target
+        
+        # Bộ nhớ đệm: hash, bản mã hóa chuẩn và bản gửi qua mạng
+        self._hash: Optional[str] = None
+        self._encoded: Optional[bytes] = None
+        self._serialized: Optional[bytes] = None
     
-    def calculate_hash(self) -> str:
-        """Tính toán hash SHA-256 của khối."""
-        block_string = json.dumps({
+    @property
+    def transactions(self) -> List[Dict]:
+        """
+        Danh sách giao dịch của khối (khôi phục từ dạng cột nếu đã nén,
+        rỗng nếu khối đã bị cắt tỉa).
+        """
+        transactions = self._transactions
+        if isinstance(transactions, TransactionColumns):
+            return transactions.to_list()
+        if transactions is None:
+            return []
+        return transactions
+    
+    @property
+    def is_compact(self) -> bool:
+        """True nếu giao dịch của khối đang được lưu dạng cột."""
+        return isinstance(self._transactions, TransactionColumns)
+    
+    @property
+    def is_pruned(self) -> bool:
+        """True nếu khối chỉ còn header (giao dịch đã bị cắt tỉa)."""
+        return self._transactions is None
+    
+    def prune(self) -> None:
+        """
+        Bỏ giao dịch của khối, chỉ giữ header.
+        
+        Header vẫn cam kết với các giao dịch qua gốc Merkle nên hash và liên
+        kết của khối vẫn kiểm tra được. Hash và gốc Merkle được tính trước
+        khi bỏ giao dịch.
+        """
+        if self.is_pruned:
+            return
+        
+        self.hash
+        self.merkle_root
+        self._transactions = None
+        self._encoded = None
+        self._serialized = None
+    
+    def compact(self, addresses: AddressTable) -> bool:
+        """
+        Chuyển khối sang dạng lưu trữ gọn để giảm bộ nhớ.
+        
+        Giao dịch được lưu dạng cột và các bản mã hóa đệm được giải phóng
+        (chúng sẽ được tạo lại khi cần). Hash được tính trước khi nén.
+        
+        Args:
+            addresses: Bảng địa chỉ dùng chung cho các khối của cùng chuỗi
+            
+        Returns:
+            True nếu giao dịch đã được lưu dạng cột
+        """
+        if self.is_compact:
+            return True
+        if self.is_pruned:
+            return False
+        
+        columns = TransactionColumns.from_transactions(self._transactions, addresses)
+        if columns is None:
+            return False
+        
+        # Đảm bảo hash và gốc Merkle đã có trước khi bỏ bản mã hóa đệm
+        self.hash
+        self.merkle_root
+        self._transactions = columns
+        self._encoded = None
+        self._serialized = None
+        return True
+    
+    @property
+    def transaction_ids(self) -> List[str]:
+        """Id của các giao dịch trong khối, theo thứ tự."""
+        return [transaction_id(transaction) for transaction in self.transactions]
+    
+    def calculate_merkle_root(self) -> str:
+        """Tính gốc Merkle từ các giao dịch của khối."""
+        return merkle_root(self.transaction_ids)
+    
+    @property
+    def merkle_root(self) -> str:
+        """Gốc Merkle của các giao dịch (tính và lưu lại ở lần truy cập đầu tiên)."""
+        if self._merkle_root is None:
+            self._merkle_root = self.calculate_merkle_root()
+        return self._merkle_root
+    
+    def merkle_proof(self, txid: str) -> Optional[List[ProofStep]]:
+        """
+        Tạo bằng chứng rằng một giao dịch thuộc khối này.
+        
+        Args:
+            txid: Id của giao dịch
+            
+        Returns:
+            Bằng chứng Merkle hoặc None nếu giao dịch không có trong khối
+        """
+        txids = self.transaction_ids
+        if txid not in txids:
+            return None
+        return merkle_proof(txids, txids.index(txid))
+    
+    @property
+    def hash(self) -> str:
+        """Hash của khối (tính và lưu lại ở lần truy cập đầu tiên)."""
+        if self._hash is None:
+            self._hash = self.calculate_hash()
+        return self._hash
+    
+    @hash.setter
+    def hash(self, value: str) -> None:
+        self._hash = value
+        self._serialized = None
+    
+    def header(self) -> Dict[str, Any]:
+        """Các trường header của khối (những trường được hash)."""
+        return {
             "index": self.index,
             "timestamp": self.timestamp,
-            "transactions": self.transactions,
+            "merkle_root": self.merkle_root,
+            "target": self.target,
             "proof": self.proof,
             "previous_hash": self.previous_hash
-        }, sort_keys=True).encode()
+        }
+    
+    def encode(self) -> bytes:
+        """
+        Mã hóa chuẩn (JSON, sắp xếp khóa) toàn bộ khối, không gồm hash.
+        
+        Returns:
+            Chuỗi bytes, được lưu lại cho các lần gọi sau (trừ khi khối
+            đang ở dạng gọn)
+        """
+        if self._encoded is not None:
+            return self._encoded
+        
+        block_dict = self.header()
+        block_dict["transactions"] = self.transactions
+        if self.is_pruned:
+            block_dict["pruned"] = True
+        encoded = json.dumps(block_dict, sort_keys=True).encode()
         
-        return hashlib.sha256(block_string).hexdigest()
+        if not self.is_compact:
+            self._encoded = encoded
+        return encoded
+    
+    def calculate_hash(self) -> str:
+        """
+        Tính toán hash SHA-256 của header khối.
+        
+        Header cam kết với giao dịch qua gốc Merkle, nên chi phí hash không
+        phụ thuộc số giao dịch trong khối.
+        """
+        return hashlib.sha256(json.dumps(self.header(), sort_keys=True).encode()).hexdigest()
+    
+    def serialize(self) -> bytes:
+        """
+        Mã hóa JSON của `to_dict()` để gửi qua mạng.
+        
+        Dùng lại bản mã hóa chuẩn: khóa "hash" đứng đầu theo thứ tự sắp xếp
+        nên chỉ cần chèn nó vào trước các trường còn lại.
+        
+        Returns:
+            Chuỗi bytes, giống `json.dumps(self.to_dict(), sort_keys=True)`
+            (được lưu lại trừ khi khối đang ở dạng gọn)
+        """
+        if self._serialized is not None:
+            return self._serialized
+        
+        serialized = b'{"hash": ' + json.dumps(self.hash).encode() + b', ' + self.encode()[1:]
+        
+        if not self.is_compact:
+            self._serialized = serialized
+        return serialized
     
     def to_dict(self) -> Dict[str, Any]:
         """Chuyển đổi khối thành dictionary để serialize."""
-        return {
+        block_dict = {
             "index": self.index,
             "timestamp": self.timestamp,
             "transactions": self.transactions,
             "proof": self.proof,
             "previous_hash": self.previous_hash,
+            "merkle_root": self.merkle_root,
+            "target": self.target,
             "hash": self.hash
         }
+        if self.is_pruned:
+            block_dict["pruned"] = True
+        return block_dict
     
     @classmethod
     def from_dict(cls, block_dict: Dict[str, Any]) -> 'Block':
-        """Tạo khối từ dictionary."""
+        """Tạo khối từ dictionary (dùng hash nhận được, không tính lại)."""
         block = cls(
             index=block_dict["index"],
             timestamp=block_dict["timestamp"],
-            transactions=block_dict["transactions"],
+            transactions=None if block_dict.get("pruned") else block_dict["transactions"],
             proof=block_dict["proof"],
-            previous_hash=block_dict["previous_hash"]
+            previous_hash=block_dict["previous_hash"],
+            merkle_root=block_dict.get("merkle_root"),
+            target=block_dict.get("target")
         )
         block.hash = block_dict["hash"]
         return block
+    
+    @classmethod
+    def from_header(cls, header: Dict[str, Any]) -> 'Block':
+        """
+        Tạo khối chỉ có header từ `header()` kèm hash (dùng khi đồng bộ
+        header trước, giao dịch được tải sau).
+        """
+        block = cls(
+            index=header["index"],
+            timestamp=header["timestamp"],
+            transactions=None,
+            proof=header["proof"],
+            previous_hash=header["previous_hash"],
+            merkle_root=header["merkle_root"],
+            target=header["target"]
+        )
+        block.hash = header["hash"]
+        return block
+
+
+class ChainView:
+    """
+    Chuỗi ghép từ phần đầu của một chuỗi có sẵn và một dãy khối nối tiếp.
+    
+    Dùng để kiểm tra một nhánh mới dựa trên các khối đã tin cậy của chuỗi
+    hiện tại mà không phải sao chép chúng.
+    """
+    
+    def __init__(self, prefix: Sequence[Block], prefix_length: int, suffix: List[Block]):
+        """
+        Args:
+            prefix: Chuỗi có sẵn
+            prefix_length: Số khối đầu của `prefix` được dùng
+            suffix: Các khối nối tiếp
+        """
+        self._prefix = prefix
+        self._prefix_length = prefix_length
+        self._suffix = suffix
+    
+    def __len__(self) -> int:
+        return self._prefix_length + len(self._suffix)
+    
+    def __getitem__(self, item: Union[int, slice]) -> Union[Block, List[Block]]:
+        if isinstance(item, slice):
+            return [self[height] for height in range(*item.indices(len(self)))]
+        
+        height = item + len(self) if item < 0 else item
+        if not 0 <= height < len(self):
+            raise IndexError("block index out of range")
+        if height < self._prefix_length:
+            return self._prefix[height]
+        return self._suffix[height - self._prefix_length]
 
 
 class Blockchain:
     """Quản lý blockchain TuCoin."""
     
-    def __init__(self, difficulty: int = 4):
+    # Số nonce kiểm tra trong mỗi lô khi đào tuần tự
+    PROOF_BATCH_SIZE = 2000
+    
+    # Số khối gần nhất có thể hoàn tác sổ cái mà không cần tính lại từ đầu
+    MAX_UNDO_DEPTH = 100
+    
+    # Giới hạn mặc định của một khối mới đào: số giao dịch và tổng kích thước (bytes)
+    MAX_BLOCK_TRANSACTIONS = 1000
+    MAX_BLOCK_BYTES = 1_000_000
+    
+    # Khi cắt tỉa: số khối giữa hai lần tạo ảnh chụp sổ cái
+    SNAPSHOT_INTERVAL = 100
+    
+    def __init__(self, difficulty: int = 4, mining_workers: int = 1,
+                 compact: bool = False, validation_workers: int = 1,
+                 store: Optional['BlockStore'] = None,
+                 max_block_transactions: Optional[int] = MAX_BLOCK_TRANSACTIONS,
+                 max_block_bytes: Optional[int] = MAX_BLOCK_BYTES,
+                 block_time: float = 30.0, retarget_interval: int = 10,
+                 require_signatures: bool = False, verification_workers: int = 1,
+                 prune_depth: Optional[int] = None, snapshot_path: Optional[str] = None,
+                 ledger_path: Optional[str] = None):
         """
         Khởi tạo blockchain mới.
         
         Args:
-            difficulty: Độ khó của thuật toán PoW (số lượng số 0 đầu tiên)
+            difficulty: Độ khó ban đầu của thuật toán PoW (số lượng số 0 đầu tiên)
+            mining_workers: Số tiến trình dùng để đào (1 = đào tuần tự,
+                None = dùng tất cả lõi CPU)
+            compact: Lưu các khối ở dạng gọn (giao dịch dạng cột) để giảm bộ nhớ
+            validation_workers: Số tiến trình dùng để kiểm tra chuỗi
+                (1 = tuần tự, None = dùng tất cả lõi CPU)
+            store: Kho khối trên đĩa (nếu có, chuỗi được lưu và tải lại từ đó)
+            max_block_transactions: Số giao dịch tối đa trong khối mới đào
+                (None = không giới hạn)
+            max_block_bytes: Tổng kích thước giao dịch tối đa trong khối mới
+                đào (None = không giới hạn)
+            block_time: Thời gian mong muốn giữa hai khối (giây)
+            retarget_interval: Số khối giữa hai lần điều chỉnh độ khó
+            require_signatures: Bắt buộc mọi giao dịch (trừ phần thưởng) phải
+                có chữ ký; giao dịch có chữ ký luôn được kiểm tra
+            verification_workers: Số tiến trình dùng để kiểm tra chữ ký
+                (1 = tuần tự, None = dùng tất cả lõi CPU)
+            prune_depth: Số khối gần nhất được giữ giao dịch; các khối cũ hơn
+                chỉ còn header và số dư được tính từ ảnh chụp sổ cái. Chuỗi
+                không thể đổi nhánh sâu hơn phần đã cắt tỉa (None = không cắt tỉa)
+            snapshot_path: File lưu ảnh chụp sổ cái (nếu có, ảnh chụp được
+                ghi ra mỗi khi cắt tỉa và được tải lại khi khởi động)
+            ledger_path: File lưu trạng thái sổ cái khi gọi `close()` (nếu
+                có và thuộc chuỗi đã lưu, khi khởi động chỉ các khối mới hơn
+                được áp dụng lại)
+        
+        Raises:
+            ValueError: Nếu prune_depth nhỏ hơn 1
         """
-        self.chain: List[Block] = []
-        self.pending_transactions: List[Dict] = []
+        if prune_depth is not None and prune_depth < 1:
+            raise ValueError("prune_depth phải lớn hơn hoặc bằng 1")
+        
+        # Khi có kho trên đĩa, chính kho đóng vai trò danh sách khối
+        self.store = store
+        self.chain: List[Block] = store if store is not None else []
+        self.mempool = Mempool()
         self.difficulty = difficulty
+        self.mining_workers = mining_workers
+        self.compact = compact
+        self.validation_workers = validation_workers
+        
+        # Địa chỉ trong các khối dạng gọn của chuỗi này
+        self._addresses = AddressTable()
+        self._validator = ChainValidator(validation_workers)
+        self._template_builder = BlockTemplateBuilder(max_block_transactions, max_block_bytes)
+        self._retargeter = Retargeter(difficulty_to_target(difficulty),
+                                      retarget_interval, block_time)
+        self.require_signatures = require_signatures
+        self._verifier = SignatureVerifier(verification_workers)
+        
+        # Sổ cái số dư: địa chỉ -> số dư, cập nhật mỗi khi thêm khối
+        self._balances: Dict[str, float] = {}
+        
+        # Dữ liệu hoàn tác sổ cái cho các khối gần nhất: mỗi phần tử lưu
+        # số dư cũ (None nếu chưa có) của các địa chỉ mà khối đã thay đổi
+        self._balance_undo: Deque[Dict[str, Optional[float]]] = deque(maxlen=self.MAX_UNDO_DEPTH)
+        
+        # Id của các giao dịch đã xác nhận trong chuỗi (trừ phần thưởng), để
+        # một giao dịch đã ký không thể được đưa vào chuỗi lần thứ hai
+        self._confirmed: Set[str] = set()
+        
+        # Chỉ mục lịch sử giao dịch theo địa chỉ (từ ảnh chụp sổ cái trở đi)
+        self.history = AddressHistory()
         
-        # Tạo khối khởi đầu (genesis block)
-        self.create_genesis_block()
+        # Bản mã hóa JSON của cả chuỗi để gửi cho peer (tạo khi cần lần đầu)
+        self._chain_cache = ChainCache()
+        
+        # Ảnh chụp sổ cái: các khối trước nó không cần giao dịch để tính số dư
+        self.prune_depth = prune_depth
+        self.snapshot_path = snapshot_path
+        self.snapshot: Optional[StateSnapshot] = (
+            StateSnapshot.load(snapshot_path) if snapshot_path else None)
+        self.ledger_path = ledger_path
+        
+        # Khóa bảo vệ các thao tác thay đổi chuỗi (đào, nhận khối, thay chuỗi)
+        self._lock = threading.RLock()
+        
+        # Bộ kiểm tra proof gần nhất, dạng ((last_proof, target), checker);
+        # gán cả cặp một lần để an toàn khi nhiều thread cùng dùng
+        self._proof_checker: Optional[tuple] = None
+        
+        # Token của lượt đào đang chạy
+        self._mining_token: Optional[CancelToken] = None
+        
+        # Tải chuỗi đã lưu hoặc tạo khối khởi đầu (genesis block)
+        if len(self.chain) > 0:
+            self._load_ledger()
+        else:
+            self.create_genesis_block()
     
     def create_genesis_block(self) -> None:
         """Tạo khối đầu tiên trong blockchain."""
@@ -87,15 +446,135 @@ class Blockchain:
             timestamp=time(),
             transactions=[],
             proof=0,
-            previous_hash="0"
+            previous_hash="0",
+            target=self._retargeter.initial_target
         )
-        self.chain.append(genesis_block)
+        self._append_block(genesis_block)
     
     @property
     def last_block(self) -> Block:
         """Trả về khối cuối cùng trong blockchain."""
         return self.chain[-1]
     
+    @property
+    def lock(self) -> threading.RLock:
+        """
+        Khóa của chuỗi. Chuỗi không thay đổi trong lúc giữ khóa, nên có thể
+        đọc nhiều khối một cách nhất quán.
+        """
+        return self._lock
+    
+    @property
+    def current_target(self) -> int:
+        """Target mà khối tiếp theo phải dùng."""
+        return self._retargeter.next_target(self.chain)
+    
+    @property
+    def current_difficulty(self) -> float:
+        """Độ khó của khối tiếp theo (số lượng số 0 hex đầu tiên tương đương)."""
+        return target_to_difficulty(self.current_target)
+    
+    @property
+    def snapshot_height(self) -> int:
+        """Độ cao của ảnh chụp sổ cái (0 nếu chưa có)."""
+        snapshot = self.snapshot
+        return snapshot.height if snapshot is not None else 0
+    
+    @property
+    def pending_transactions(self) -> List[Dict]:
+        """Danh sách giao dịch đang chờ (bản sao, theo thứ tự nhận được)."""
+        return self.mempool.transactions()
+    
+    @pending_transactions.setter
+    def pending_transactions(self, transactions: List[Dict]) -> None:
+        self.mempool.clear()
+        for transaction in transactions:
+            self.mempool.add(transaction)
+    
+    def get_block(self, index: int) -> Optional[Block]:
+        """
+        Lấy khối theo số thứ tự.
+        
+        Args:
+            index: Số thứ tự của khối
+            
+        Returns:
+            Khối hoặc None nếu không tồn tại
+        """
+        if 0 <= index < len(self.chain):
+            return self.chain[index]
+        return None
+    
+    def get_block_by_hash(self, block_hash: str) -> Optional[Block]:
+        """
+        Lấy khối theo hash.
+        
+        Args:
+            block_hash: Hash của khối
+            
+        Returns:
+            Khối hoặc None nếu không tồn tại
+        """
+        if self.store is not None:
+            return self.store.get_block_by_hash(block_hash)
+        
+        # Duyệt từ cuối chuỗi vì các khối mới thường được tra cứu nhiều hơn
+        for block in reversed(self.chain):
+            if block.hash == block_hash:
+                return block
+        return None
+    
+    def get_transaction_proof(self, txid: str, block_index: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Tạo bằng chứng rằng một giao dịch đã được đưa vào chuỗi.
+        
+        Args:
+            txid: Id của giao dịch
+            block_index: Index của khối chứa giao dịch (nếu không có, tìm
+                từ cuối chuỗi)
+        
+        Returns:
+            Dictionary gồm index, hash, gốc Merkle của khối và bằng chứng
+            Merkle, hoặc None nếu không tìm thấy giao dịch
+        """
+        if block_index is not None:
+            block = self.get_block(block_index)
+            blocks = [block] if block is not None else []
+        else:
+            blocks = reversed(self.chain)
+        
+        for block in blocks:
+            proof = block.merkle_proof(txid)
+            if proof is not None:
+                return {
+                    "txid": txid,
+                    "block_index": block.index,
+                    "block_hash": block.hash,
+                    "merkle_root": block.merkle_root,
+                    "proof": proof
+                }
+        return None
+    
+    def verify_transaction_proof(self, transaction_proof: Dict[str, Any]) -> bool:
+        """
+        Kiểm tra bằng chứng giao dịch so với header của khối trong chuỗi.
+        
+        Args:
+            transaction_proof: Kết quả của `get_transaction_proof`
+        
+        Returns:
+            True nếu khối tồn tại trong chuỗi và giao dịch thuộc khối đó
+        """
+        try:
+            block = self.get_block(transaction_proof["block_index"])
+            if block is None or block.hash != transaction_proof["block_hash"]:
+                return False
+            return verify_merkle_proof(transaction_proof["txid"],
+                                       transaction_proof["proof"],
+                                       block.merkle_root)
+        except (KeyError, TypeError, ValueError):
+            return False
+    
     def add_transaction(self, sender: str, receiver: str, amount: float) -> int:
         """
         Thêm một giao dịch mới vào danh sách chờ.
@@ -108,7 +587,7 @@ class Blockchain:
         Returns:
             Index của khối sẽ chứa giao dịch này
         """
-        self.pending_transactions.append({
+        self.mempool.add({
             "sender": sender,
             "receiver": receiver,
             "amount": amount,
@@ -117,109 +596,508 @@ class Blockchain:
         
         return self.last_block.index + 1
     
-    def proof_of_work(self, last_proof: int) -> int:
+    def submit_transaction(self, transaction: Dict[str, Any]) -> bool:
+        """
+        Thêm một giao dịch đã tạo sẵn (ví dụ nhận từ mạng) vào danh sách chờ.
+        
+        Nhận lại một giao dịch đã có trong danh sách chờ hoặc đã được xác
+        nhận không có tác dụng. Giao dịch được kiểm tra bằng cùng các quy
+        tắc với giao dịch trong khối (xem `LedgerOverlay`), với số dư đã xác
+        nhận của người gửi trừ đi các giao dịch chờ khác của người gửi.
+        
+        Args:
+            transaction: Giao dịch dạng dictionary
+            
+        Returns:
+            True nếu giao dịch hợp lệ và được thêm mới
+        """
+        # Kiểm tra số dư (rẻ) trước chữ ký; mempool kiểm tra lại khi thêm
+        if not LedgerOverlay(self._spendable_balance, is_confirmed=self.is_confirmed).check(transaction):
+            return False
+        txid = transaction_id(transaction)
+        if txid in self.mempool:
+            return False
+        if not self.verify_signatures([transaction]):
+            return False
+        
+        balance = self.get_balance(transaction["sender"])
+        return self.mempool.add(transaction, txid, balance) is not None
+    
+    def _spendable_balance(self, address: str) -> float:
+        """Số dư đã xác nhận của một địa chỉ trừ các giao dịch chờ của nó."""
+        return self.get_balance(address) - self.mempool.pending_spend(address)
+    
+    def is_confirmed(self, txid: str) -> bool:
+        """
+        Kiểm tra một giao dịch đã được xác nhận trong chuỗi hiện tại chưa.
+        
+        Args:
+            txid: Id của giao dịch
+            
+        Returns:
+            True nếu giao dịch (không phải phần thưởng) đã nằm trong một khối
+        """
+        return txid in self._confirmed
+    
+    def verify_signatures(self, transactions: List[Dict]) -> bool:
+        """
+        Kiểm tra chữ ký của các giao dịch (theo lô, bỏ qua giao dịch đã kiểm tra).
+        
+        Giao dịch chưa ký chỉ được chấp nhận khi không bắt buộc chữ ký. Giao
+        dịch phần thưởng ở cuối khối không có chữ ký nên được bỏ ra trước khi
+        gọi (xem `without_reward`).
+        
+        Args:
+            transactions: Các giao dịch cần kiểm tra
+            
+        Returns:
+            True nếu tất cả giao dịch đều hợp lệ
+        """
+        to_verify = [transaction for transaction in transactions
+                     if self.require_signatures or is_signed(transaction)]
+        return all(self._verifier.verify_transactions(to_verify))
+    
+    def proof_of_work(self, last_proof: int,
+                      cancel_token: Optional[CancelToken] = None,
+                      target: Optional[int] = None) -> Optional[int]:
         """
         Thuật toán Proof of Work.
         Tìm một số (nonce) sao cho hash của nó với proof trước đó
-        có số lượng số 0 đầu tiên bằng độ khó.
+        (dạng số) nhỏ hơn target.
         
         Args:
             last_proof: Proof của khối trước đó
+            cancel_token: Token để hủy việc tìm kiếm (nếu có)
+            target: Target cần đạt (mặc định: target của khối tiếp theo)
             
         Returns:
-            Giá trị nonce thỏa mãn điều kiện
+            Giá trị nonce thỏa mãn điều kiện, hoặc None nếu bị hủy
         """
+        if target is None:
+            target = self.current_target
+        
+        # Chia không gian nonce cho nhiều tiến trình nếu được cấu hình; nếu
+        # mọi tiến trình đều bị lỗi, đào tuần tự trong tiến trình hiện tại
+        if self.mining_workers != 1:
+            try:
+                return ParallelMiner(self.mining_workers).search(
+                    last_proof, target, cancel_token)
+            except MinerError:
+                pass
+        
+        checker = self._get_proof_checker(last_proof, target)
+        
+        # Kiểm tra nonce theo từng lô
         proof = 0
-        while not self.valid_proof(last_proof, proof):
-            proof += 1
+        while cancel_token is None or not cancel_token.cancelled:
+            found = checker.search(proof, proof + self.PROOF_BATCH_SIZE)
+            if found is not None:
+                return found
+            proof += self.PROOF_BATCH_SIZE
         
-        return proof
+        return None
     
-    def valid_proof(self, last_proof: int, proof: int) -> bool:
+    def _get_proof_checker(self, last_proof: int, target: int) -> ProofChecker:
+        """Lấy bộ kiểm tra proof cho (last_proof, target), dùng lại nếu đã có."""
+        key = (last_proof, target)
+        cached = self._proof_checker
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        checker = ProofChecker(last_proof, target)
+        self._proof_checker = (key, checker)
+        return checker
+    
+    def valid_proof(self, last_proof: int, proof: int, target: Optional[int] = None) -> bool:
         """
         Kiểm tra xem proof có hợp lệ không.
         
         Args:
             last_proof: Proof của khối trước đó
             proof: Proof hiện tại cần kiểm tra
+            target: Target cần đạt (mặc định: target của khối tiếp theo)
             
         Returns:
-            True nếu hash bắt đầu bằng số lượng số 0 bằng độ khó
+            True nếu giá trị số của hash nhỏ hơn target
         """
-        guess = f'{last_proof}{proof}'.encode()
-        guess_hash = hashlib.sha256(guess).hexdigest()
-        
-        return guess_hash[:self.difficulty] == '0' * self.difficulty
+        if target is None:
+            target = self.current_target
+        return self._get_proof_checker(last_proof, target).check(proof)
     
-    def mine_block(self, miner_address: str) -> Block:
+    def mine_block(self, miner_address: str,
+                   cancel_token: Optional[CancelToken] = None) -> Optional[Block]:
         """
         Đào một khối mới.
         
+        Lượt đào bị hủy khi `cancel_mining()` được gọi (ví dụ khi nhận được
+        khối mới từ mạng) hoặc khi `cancel_token` bị hủy.
+        
         Args:
             miner_address: Địa chỉ của người đào để nhận phần thưởng
+            cancel_token: Token cha để dừng việc đào từ bên ngoài (nếu có)
             
         Returns:
-            Khối mới đã được đào
+            Khối mới đã được đào, hoặc None nếu lượt đào bị hủy
         """
-        # Thêm giao dịch phần thưởng
-        self.pending_transactions.append({
-            "sender": "0",  # "0" đại diện cho hệ thống
-            "receiver": miner_address,
-            "amount": 100.0,  # Phần thưởng 100 TuCoin
-            "timestamp": time()
-        })
+        # Tạo token cho lượt đào trước khi lấy khối cuối cùng, để không bỏ lỡ
+        # lời hủy nào đến sau thời điểm này
+        job_token = CancelToken(parent=cancel_token)
+        self._mining_token = job_token
         
-        # Lấy proof của khối trước đó
-        last_proof = self.last_block.proof
-        
-        # Tìm proof mới
-        proof = self.proof_of_work(last_proof)
-        
-        # Tạo khối mới
-        new_block = Block(
-            index=len(self.chain),
-            timestamp=time(),
-            transactions=self.pending_transactions.copy(),
-            proof=proof,
-            previous_hash=self.last_block.hash
-        )
-        
-        # Xóa các giao dịch đã được thêm vào khối
-        self.pending_transactions = []
+        try:
+            tip = self.last_block
+            target = self.current_target
+            
+            # Giao dịch phần thưởng chỉ được thêm khi đào thành công
+            reward_transaction = {
+                "sender": REWARD_SENDER,  # "0" đại diện cho hệ thống
+                "receiver": miner_address,
+                "amount": BLOCK_REWARD,
+                "timestamp": time()
+            }
+            
+            # Tìm proof mới dựa trên proof của khối trước đó
+            proof = self.proof_of_work(tip.proof, job_token, target)
+            
+            with self._lock:
+                # Bỏ kết quả nếu bị hủy hoặc chuỗi đã có khối mới trong lúc đào
+                if proof is None or self.last_block.hash != tip.hash:
+                    return None
+                
+                # Tạo khối mới với các giao dịch được chọn theo độ ưu tiên
+                included_transactions = self.select_transactions([reward_transaction])
+                
+                # Thời gian của khối phải lớn hơn trung vị thời gian các khối trước
+                median_time = self._retargeter.median_time_past(self.chain, tip.index + 1)
+                new_block = Block(
+                    index=tip.index + 1,
+                    timestamp=max(time(), median_time + 0.001),
+                    transactions=included_transactions + [reward_transaction],
+                    proof=proof,
+                    previous_hash=tip.hash,
+                    target=target
+                )
+                
+                # Xóa các giao dịch đã được thêm vào khối
+                self.mempool.remove_transactions(included_transactions)
+                
+                # Thêm khối mới vào chuỗi
+                self._append_block(new_block)
+                self._auto_prune()
+            
+            return new_block
+        finally:
+            if self._mining_token is job_token:
+                self._mining_token = None
+    
+    def select_transactions(self, reserved: List[Dict] = ()) -> List[Dict]:
+        """
+        Chọn giao dịch từ danh sách chờ cho khối tiếp theo.
         
-        # Thêm khối mới vào chuỗi
-        self.chain.append(new_block)
+        Giao dịch được chọn theo độ ưu tiên trong giới hạn số lượng và kích
+        thước của khối; giao dịch không hợp lệ trên sổ cái hiện tại (ví dụ
+        không đủ số dư) hoặc không còn chỗ vẫn ở lại danh sách chờ.
         
-        return new_block
+        Args:
+            reserved: Giao dịch luôn có trong khối (ví dụ phần thưởng)
+            
+        Returns:
+            Danh sách giao dịch được chọn
+        """
+        with self._lock:
+            ledger = LedgerOverlay(self.get_balance, len(self.chain), self.is_confirmed)
+            return self._template_builder.select(self.mempool.by_priority(), ledger, reserved)
     
-    def is_chain_valid(self) -> bool:
+    def cancel_mining(self) -> None:
+        """Hủy lượt đào đang chạy (nếu có)."""
+        token = self._mining_token
+        if token is not None:
+            token.cancel()
+    
+    def add_block(self, block: Block) -> bool:
         """
-        Kiểm tra tính hợp lệ của toàn bộ blockchain.
+        Thêm một khối nhận từ mạng vào cuối chuỗi.
         
+        Giao dịch của khối được áp dụng lên sổ cái hiện tại theo cùng các
+        quy tắc với khối tự đào (xem `LedgerOverlay`).
+        
+        Args:
+            block: Khối cần thêm
+            
         Returns:
-            True nếu blockchain hợp lệ
+            True nếu khối nối tiếp khối cuối hợp lệ và đã được thêm
         """
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i - 1]
+        # Bỏ qua sớm khối không nối tiếp khối cuối, trước khi kiểm tra chữ ký
+        if block.index != self.last_block.index + 1:
+            return False
+        
+        # Kiểm tra cấu trúc trước chữ ký; chỉ giao dịch phần thưởng ở cuối
+        # khối được miễn chữ ký
+        if block.is_pruned or not is_well_formed_block(block.transactions):
+            return False
+        
+        # Kiểm tra chữ ký trước khi giữ khóa (giao dịch đã có trong mempool
+        # được bỏ qua nhờ bộ nhớ đệm)
+        if not self.verify_signatures(without_reward(block.transactions)):
+            return False
+        
+        with self._lock:
+            last_block = self.last_block
             
-            # Kiểm tra hash của khối hiện tại
-            if current_block.hash != current_block.calculate_hash():
+            # Kiểm tra tính hợp lệ của khối so với khối cuối
+            if (block.index != last_block.index + 1 or
+                    block.previous_hash != last_block.hash or
+                    block.target != self.current_target or
+                    not self._retargeter.is_valid_timestamp(self.chain, block.index, block.timestamp) or
+                    not self.valid_proof(last_block.proof, block.proof, block.target)):
                 return False
             
-            # Kiểm tra liên kết giữa các khối
-            if current_block.previous_hash != previous_block.hash:
+            # Kiểm tra hash của header và gốc Merkle của giao dịch
+            if block.merkle_root != block.calculate_merkle_root() or block.hash != block.calculate_hash():
                 return False
             
-            # Kiểm tra proof of work
-            if not self.valid_proof(previous_block.proof, current_block.proof):
+            # Giao dịch phải hợp lệ trên số dư sau các giao dịch đứng trước
+            ledger = LedgerOverlay(self.get_balance, len(self.chain), self.is_confirmed)
+            if not ledger.apply_block(block.transactions):
                 return False
+            
+            self._append_block(block)
+            
+            # Xóa các giao dịch đã được thêm vào khối
+            self.mempool.remove_transactions(block.transactions)
+            self._auto_prune()
         
+        # Hủy lượt đào đang chạy trên khối cuối cũ
+        self.cancel_mining()
         return True
     
+    def _append_block(self, block: Block) -> None:
+        """Nối khối vào chuỗi và cập nhật sổ cái số dư, chỉ mục lịch sử."""
+        self.chain.append(block)
+        self._apply_balances(block)
+        self.history.add_block(block)
+        self._chain_cache.add_block(block)
+        
+        if self.compact:
+            block.compact(self._addresses)
+    
+    @staticmethod
+    def _confirmed_ids(block: Block) -> List[str]:
+        """Id của các giao dịch (trừ phần thưởng) mà khối xác nhận."""
+        return [transaction_id(transaction) for transaction in without_reward(block.transactions)]
+    
+    def _apply_balances(self, block: Block) -> None:
+        """
+        Cộng các giao dịch của khối vào sổ cái số dư, ghi nhận id giao dịch
+        đã xác nhận và lưu dữ liệu hoàn tác.
+        """
+        self._confirmed.update(self._confirmed_ids(block))
+
+        balances = self._balances
+        undo: Dict[str, Optional[float]] = {}
+        
+        for transaction in block.transactions:
+            amount = transaction["amount"]
+            sender = transaction["sender"]
+            receiver = transaction["receiver"]
+            
+            if sender not in undo:
+                undo[sender] = balances.get(sender)
+            if receiver not in undo:
+                undo[receiver] = balances.get(receiver)
+            
+            balances[sender] = balances.get(sender, 0.0) - amount
+            balances[receiver] = balances.get(receiver, 0.0) + amount
+        
+        self._balance_undo.append(undo)
+    
+    def _revert_balances(self) -> None:
+        """Hoàn tác chính xác thay đổi sổ cái của khối được thêm gần nhất."""
+        balances = self._balances
+        for address, old_balance in self._balance_undo.pop().items():
+            if old_balance is None:
+                balances.pop(address, None)
+            else:
+                balances[address] = old_balance
+    
+    def _rebuild_balances(self) -> None:
+        """
+        Tính lại sổ cái số dư và chỉ mục lịch sử từ ảnh chụp sổ cái (hoặc
+        từ đầu chuỗi nếu không có ảnh chụp thuộc chuỗi hiện tại).
+        """
+        snapshot = self.snapshot
+        if snapshot is not None and not snapshot.matches(self.chain):
+            snapshot = self.snapshot = None
+        
+        self._balances = dict(snapshot.balances) if snapshot is not None else {}
+        self._confirmed = set(snapshot.txids) if snapshot is not None else set()
+        self._balance_undo.clear()
+        self.history.clear()
+        for height in range(self.snapshot_height, len(self.chain)):
+            block = self.chain[height]
+            self._apply_balances(block)
+            self.history.add_block(block)
+    
+    def _balances_at(self, height: int) -> Dict[str, float]:
+        """
+        Tính số dư sau `height` khối bằng cách áp dụng các khối từ ảnh chụp
+        sổ cái (hoặc từ đầu chuỗi). Gọi khi đang giữ khóa.
+        """
+        balances = dict(self.snapshot.balances) if self.snapshot is not None else {}
+        for block in self.chain[self.snapshot_height:height]:
+            for transaction in block.transactions:
+                amount = transaction["amount"]
+                sender = transaction["sender"]
+                receiver = transaction["receiver"]
+                balances[sender] = balances.get(sender, 0.0) - amount
+                balances[receiver] = balances.get(receiver, 0.0) + amount
+        return balances
+    
+    def _confirmed_after(self, height: int) -> Set[str]:
+        """Id của các giao dịch được xác nhận từ khối `height` trở đi."""
+        return {txid for block in self.chain[height:] for txid in self._confirmed_ids(block)}
+    
+    def _ledger_at(self, height: int) -> LedgerOverlay:
+        """
+        Tạo lớp trạng thái tạm với số dư và giao dịch đã xác nhận sau
+        `height` khối (ví dụ tại khối chung khi đổi nhánh). Gọi khi đang giữ khóa.
+        
+        Khi đủ dữ liệu hoàn tác, chỉ số dư của các địa chỉ bị các khối sau
+        đó thay đổi được khôi phục; các địa chỉ khác đọc từ sổ cái hiện tại,
+        nên kết quả chỉ đúng khi chuỗi chưa có thêm khối mới.
+        """
+        removed = self._confirmed_after(height)
+        depth = len(self.chain) - height
+        if depth > len(self._balance_undo):
+            return LedgerOverlay.from_balances(self._balances_at(height), height,
+                                               self._confirmed - removed)
+        
+        # Hoàn tác từ khối mới nhất về khối cũ nhất bị bỏ qua
+        restored: Dict[str, float] = {}
+        undo_entries = list(self._balance_undo)
+        for undo in reversed(undo_entries[len(undo_entries) - depth:]):
+            for address, old_balance in undo.items():
+                restored[address] = 0.0 if old_balance is None else old_balance
+        
+        balances = self._balances
+        confirmed = self._confirmed
+        return LedgerOverlay(lambda address: restored[address] if address in restored
+                             else balances.get(address, 0.0), height,
+                             lambda txid: txid in confirmed and txid not in removed)
+    
+    def _load_ledger(self) -> None:
+        """
+        Khôi phục sổ cái và chỉ mục lịch sử từ checkpoint lưu khi đóng, rồi
+        chỉ áp dụng các khối mới hơn nó. Tính lại từ ảnh chụp (hoặc từ đầu
+        chuỗi) nếu không có checkpoint thuộc chuỗi hiện tại.
+        """
+        checkpoint = LedgerCheckpoint.load(self.ledger_path) if self.ledger_path else None
+        if checkpoint is None or not checkpoint.matches(self.chain):
+            self._rebuild_balances()
+            return
+        
+        if self.snapshot is not None and not self.snapshot.matches(self.chain):
+            self.snapshot = None
+        
+        self._balances = checkpoint.balances
+        self._confirmed = checkpoint.txids
+        self._balance_undo.clear()
+        self._balance_undo.extend(checkpoint.undo)
+        self.history = AddressHistory.from_dict(checkpoint.history)
+        self.history.prune(self.snapshot_height)
+        for height in range(checkpoint.height, len(self.chain)):
+            block = self.chain[height]
+            self._apply_balances(block)
+            self.history.add_block(block)
+    
+    def close(self) -> None:
+        """
+        Đóng các nhóm tiến trình kiểm tra chữ ký, kiểm tra chuỗi và lưu
+        trạng thái sổ cái ra `ledger_path` (nếu có) để lần khởi động sau
+        không phải áp dụng lại toàn bộ chuỗi.
+        """
+        self._verifier.close()
+        self._validator.close()
+        if not self.ledger_path:
+            return
+        
+        with self._lock:
+            checkpoint = LedgerCheckpoint(len(self.chain), self.last_block.hash,
+                                          dict(self._balances), list(self._balance_undo),
+                                          self.history.to_dict(), self._confirmed)
+        checkpoint.save(self.ledger_path)
+    
+    def prune(self, height: int) -> bool:
+        """
+        Tạo ảnh chụp sổ cái tại một độ cao rồi cắt tỉa các khối trước đó.
+        
+        Giao dịch của các khối trước `height` bị bỏ khỏi bộ nhớ, chỉ giữ
+        header; khi dùng kho trên đĩa, giao dịch vẫn được lưu trong kho.
+        Số dư và việc kiểm tra chuỗi tiếp tục dựa trên ảnh chụp.
+        
+        Args:
+            height: Số khối đầu chuỗi được đưa vào ảnh chụp
+            
+        Returns:
+            True nếu đã tạo ảnh chụp mới
+        """
+        with self._lock:
+            height = min(height, len(self.chain))
+            start = self.snapshot_height
+            if height <= start:
+                return False
+            
+            blocks = self.chain[start:height]
+            snapshot = StateSnapshot(height, blocks[-1].hash, self._balances_at(height),
+                                     self._confirmed - self._confirmed_after(height))
+            if self.snapshot_path:
+                snapshot.save(self.snapshot_path)
+            self.snapshot = snapshot
+            
+            if self.store is None:
+                for block in blocks:
+                    block.prune()
+                self._chain_cache.clear()
+            self.history.prune(height)
+            return True
+    
+    def _auto_prune(self) -> None:
+        """Cắt tỉa khi phần chưa cắt tỉa vượt quá prune_depth một khoảng."""
+        if self.prune_depth is None:
+            return
+        
+        height = len(self.chain) - self.prune_depth
+        if height >= self.snapshot_height + self.SNAPSHOT_INTERVAL:
+            self.prune(height)
+    
+    def validate_chain(self) -> Optional[int]:
+        """
+        Tìm khối không hợp lệ đầu tiên trong blockchain.
+        
+        Khối đã bị cắt tỉa chỉ được kiểm tra header (hash, liên kết, proof
+        of work và target); giao dịch được áp dụng từ ảnh chụp sổ cái.
+        
+        Returns:
+            Index của khối không hợp lệ đầu tiên, hoặc None nếu hợp lệ
+        """
+        with self._lock:
+            snapshot = self.snapshot
+            ledger = (LedgerOverlay.from_balances(snapshot.balances, snapshot.height, snapshot.txids)
+                      if snapshot is not None else LedgerOverlay.from_balances({}))
+        return self._validator.find_invalid_block(self.chain, self._retargeter, ledger=ledger)
+    
+    def is_chain_valid(self) -> bool:
+        """
+        Kiểm tra tính hợp lệ của toàn bộ blockchain.
+        
+        Returns:
+            True nếu blockchain hợp lệ
+        """
+        return self.validate_chain() is None
+    
     def get_balance(self, address: str) -> float:
         """
-        Tính số dư của một địa chỉ.
+        Lấy số dư của một địa chỉ từ sổ cái số dư.
         
         Args:
             address: Địa chỉ cần kiểm tra số dư
@@ -227,26 +1105,71 @@ class Blockchain:
         Returns:
             Số dư TuCoin của địa chỉ
         """
-        balance = 0.0
+        return self._balances.get(address, 0.0)
+    
+    def get_history(self, address: str, offset: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Lấy một trang lịch sử giao dịch của một địa chỉ, mới nhất trước.
         
-        # Duyệt qua tất cả các khối
-        for block in self.chain:
-            # Duyệt qua tất cả các giao dịch trong khối
-            for transaction in block.transactions:
-                if transaction["sender"] == address:
-                    balance -= transaction["amount"]
-                if transaction["receiver"] == address:
-                    balance += transaction["amount"]
+        Chi phí chỉ phụ thuộc kích thước trang, không phụ thuộc độ dài chuỗi.
         
-        return balance
+        Args:
+            address: Địa chỉ cần tra cứu
+            offset: Số giao dịch bỏ qua
+            limit: Số giao dịch tối đa trả về
+            
+        Returns:
+            Danh sách gồm index khối, vị trí, thời gian khối và giao dịch
+        """
+        with self._lock:
+            history = []
+            blocks: Dict[int, tuple] = {}
+            for height, position in self.history.get(address, offset, limit):
+                # Mỗi khối chỉ được đọc (và giải nén) một lần cho cả trang
+                if height not in blocks:
+                    block = self.chain[height]
+                    blocks[height] = (block.timestamp, block.transactions)
+                timestamp, transactions = blocks[height]
+                history.append({
+                    "block_index": height,
+                    "position": position,
+                    "block_timestamp": timestamp,
+                    "transaction": transactions[position]
+                })
+            return history
     
     def to_dict(self) -> Dict[str, Any]:
         """Chuyển đổi blockchain thành dictionary để serialize."""
-        return {
+        blockchain_dict = {
             "chain": [block.to_dict() for block in self.chain],
             "pending_transactions": self.pending_transactions,
             "difficulty": self.difficulty
         }
+        if self.snapshot is not None:
+            blockchain_dict["snapshot"] = self.snapshot.to_dict()
+        return blockchain_dict
+    
+    def serialize(self) -> bytes:
+        """
+        Mã hóa JSON của `to_dict()` để gửi qua mạng.
+        
+        Phần danh sách khối được lấy từ bộ đệm mã hóa của chuỗi, chỉ được
+        cập nhật khi nối khối hoặc đổi nhánh; mỗi lần gọi chỉ sao chép bộ
+        đệm và mã hóa danh sách giao dịch chờ.
+        
+        Returns:
+            Chuỗi bytes, giải mã được thành cùng dictionary với `to_dict()`
+        """
+        tail = {
+            "pending_transactions": self.pending_transactions,
+            "difficulty": self.difficulty
+        }
+        
+        with self._lock:
+            if self.snapshot is not None:
+                tail["snapshot"] = self.snapshot.to_dict()
+            return b"".join((b'{"chain": [', self._chain_cache.encoded(self.chain),
+                             b"], ", json.dumps(tail)[1:].encode()))
     
     @classmethod
     def from_dict(cls, blockchain_dict: Dict[str, Any]) -> 'Blockchain':
@@ -259,15 +1182,138 @@ class Blockchain:
         # Thêm các khối từ dictionary
         for block_dict in blockchain_dict["chain"]:
             blockchain.chain.append(Block.from_dict(block_dict))
+        if blockchain_dict.get("snapshot"):
+            blockchain.snapshot = StateSnapshot.from_dict(blockchain_dict["snapshot"])
+        blockchain._rebuild_balances()
         
         # Thêm các giao dịch đang chờ
         blockchain.pending_transactions = blockchain_dict["pending_transactions"]
         
         return blockchain
     
+    def block_locator(self) -> List[List[Any]]:
+        """
+        Tạo bộ định vị khối để peer tìm khối chung cuối cùng.
+        
+        Gồm 10 khối cuối, sau đó khoảng cách giữa hai khối tăng gấp đôi,
+        và luôn có khối genesis, nên kích thước chỉ tăng theo log độ dài chuỗi.
+        
+        Returns:
+            Danh sách các cặp [độ cao, hash], từ khối cuối về genesis
+        """
+        with self._lock:
+            locator = []
+            height = len(self.chain) - 1
+            step = 1
+            while height > 0:
+                locator.append([height, self.chain[height].hash])
+                if len(locator) >= 10:
+                    step *= 2
+                height -= step
+            locator.append([0, self.chain[0].hash])
+            return locator
+    
+    def get_headers(self, locator: List[List[Any]], limit: int) -> List[Block]:
+        """
+        Tìm các khối nối tiếp khối chung đầu tiên trong bộ định vị của peer.
+        
+        Args:
+            locator: Bộ định vị khối của peer (xem `block_locator`)
+            limit: Số khối tối đa trả về
+            
+        Returns:
+            Các khối sau khối chung (từ genesis nếu không có khối chung)
+        """
+        with self._lock:
+            start = 0
+            for height, block_hash in locator:
+                if (isinstance(height, int) and 0 <= height < len(self.chain) and
+                        self.chain[height].hash == block_hash):
+                    start = height + 1
+                    break
+            return self.chain[start:start + max(limit, 0)]
+    
+    def check_headers(self, headers: List[Block], checked: int = 0) -> Optional[int]:
+        """
+        Kiểm tra một dãy header nối tiếp chuỗi hiện tại trước khi tải giao dịch.
+        
+        Header được kiểm tra liên kết, hash, proof of work, target và thời
+        gian; gốc Merkle được kiểm tra khi các khối đầy đủ được tải về.
+        
+        Args:
+            headers: Các khối chỉ có header, liên tiếp nhau
+            checked: Số header đầu đã được kiểm tra trước đó (khi dãy header
+                được tải và kiểm tra theo từng lô)
+            
+        Returns:
+            Độ cao của header đầu tiên (số khối chung với chuỗi hiện tại),
+            hoặc None nếu dãy header không hợp lệ
+        """
+        if len(headers) <= checked:
+            return None
+        
+        start = headers[0].index
+        if any(headers[offset].index != start + offset for offset in range(checked, len(headers))):
+            return None
+        
+        with self._lock:
+            # Không thể đổi nhánh trước ảnh chụp sổ cái
+            if not self.snapshot_height <= start <= len(self.chain):
+                return None
+            if start > 0 and headers[0].previous_hash != self.chain[start - 1].hash:
+                return None
+            branch = ChainView(self.chain, start, headers)
+        
+        if self._validator.find_invalid_block(branch, self._retargeter, start + checked) is not None:
+            return None
+        return start
+    
+    def branch_has_more_work(self, start: int, blocks: Sequence[Block]) -> bool:
+        """
+        So sánh một nhánh với phần chuỗi hiện tại từ cùng độ cao.
+        
+        Args:
+            start: Độ cao của khối đầu tiên trong nhánh (số khối chung)
+            blocks: Các khối (hoặc header) của nhánh, bắt đầu từ `start`
+            
+        Returns:
+            True nếu tổng công việc của nhánh lớn hơn tổng công việc của các
+            khối từ `start` trở đi trong chuỗi hiện tại
+        """
+        branch_work = self._retargeter.chain_work(blocks)
+        with self._lock:
+            return branch_work > self._retargeter.chain_work(self.chain[start:])
+    
+    def find_fork_point(self, new_chain: List[Block]) -> int:
+        """
+        Tìm khối chung cuối cùng giữa chuỗi hiện tại và một chuỗi khác.
+        
+        So sánh hash từ độ cao chung lớn nhất trở xuống, nên chi phí tỉ lệ
+        với số khối khác nhau chứ không phải độ dài chuỗi.
+        
+        Args:
+            new_chain: Chuỗi cần so sánh
+            
+        Returns:
+            Index của khối chung cuối cùng, hoặc -1 nếu khác nhau từ genesis
+        """
+        height = min(len(self.chain), len(new_chain)) - 1
+        while height >= 0 and new_chain[height].hash != self.chain[height].hash:
+            height -= 1
+        return height
+    
     def replace_chain(self, new_chain: List[Block]) -> bool:
         """
-        Thay thế blockchain hiện tại bằng một chuỗi mới dài hơn.
+        Thay thế blockchain hiện tại bằng một chuỗi mới có tổng công việc
+        lớn hơn.
+        
+        Hai nhánh được so sánh bằng tổng công việc (xem `block_work`) từ khối
+        chung cuối cùng, không phải số khối, để một chuỗi dài gồm các khối
+        dễ đào không thể thay thế chuỗi đã tốn nhiều công việc hơn.
+        
+        Chỉ phần khác nhau sau khối chung cuối cùng được kiểm tra và nối vào
+        chuỗi hiện tại; các giao dịch của những khối bị loại bỏ được đưa lại
+        vào danh sách chờ.
         
         Args:
             new_chain: Chuỗi mới để thay thế
@@ -275,22 +1321,127 @@ class Blockchain:
         Returns:
             True nếu chuỗi được thay thế, False nếu không
         """
-        # Tạo một blockchain tạm thời để kiểm tra tính hợp lệ
-        temp_blockchain = Blockchain(self.difficulty)
-        temp_blockchain.chain = new_chain
+        fork_point = self.find_fork_point(new_chain)
+        if not self.branch_has_more_work(fork_point + 1, new_chain[fork_point + 1:]):
+            return False
         
-        # Kiểm tra xem chuỗi mới có dài hơn và hợp lệ không
-        if len(new_chain) > len(self.chain) and temp_blockchain.is_chain_valid():
-            self.chain = new_chain
-            return True
+        # Không thể đổi nhánh trước ảnh chụp sổ cái (giao dịch đã bị cắt tỉa),
+        # và không nhận khối đã bị cắt tỉa từ chuỗi khác
+        if fork_point + 1 < self.snapshot_height:
+            return False
+        if any(block.is_pruned for block in new_chain[fork_point + 1:]):
+            return False
+        
+        # Giao dịch của nhánh được áp dụng lên số dư tại khối chung
+        with self._lock:
+            if fork_point >= len(self.chain) or fork_point + 1 < self.snapshot_height:
+                return False
+            tip_hash = self.last_block.hash
+            ledger = self._ledger_at(fork_point + 1)
         
-        return False
+        # Kiểm tra phần khác nhau, nối tiếp các khối chung của chuỗi hiện tại
+        if fork_point >= 0:
+            anchor = self.chain[fork_point]
+            branch = ChainView(self.chain, fork_point + 1, new_chain[fork_point + 1:])
+            if self._validator.find_invalid_block(branch, self._retargeter, fork_point + 1,
+                                                  ledger) is not None:
+                return False
+        else:
+            anchor = None
+            if not self._validator.is_valid(new_chain, self._retargeter, ledger):
+                return False
+        
+        # Kiểm tra chữ ký của tất cả giao dịch mới trong một lượt
+        if not self.verify_signatures([transaction for block in new_chain[fork_point + 1:]
+                                       for transaction in without_reward(block.transactions)]):
+            return False
+        
+        with self._lock:
+            # Chuỗi hiện tại có thể đã thay đổi trong lúc kiểm tra
+            if not self.branch_has_more_work(fork_point + 1, new_chain[fork_point + 1:]):
+                return False
+            if anchor is not None and (len(self.chain) <= fork_point or
+                                       self.chain[fork_point].hash != anchor.hash):
+                return False
+            if fork_point + 1 < self.snapshot_height:
+                return False
+            
+            # Số dư tại khối chung được tính trên chuỗi lúc bắt đầu kiểm tra;
+            # nếu chuỗi đã có thêm khối, áp dụng lại giao dịch của nhánh
+            if self.last_block.hash != tip_hash:
+                ledger = self._ledger_at(fork_point + 1)
+                if ledger.find_invalid_block(new_chain, fork_point + 1) is not None:
+                    return False
+            
+            suffix = new_chain[fork_point + 1:]
+            removed_blocks = self._truncate_chain(fork_point + 1)
+            for block in suffix:
+                self._append_block(block)
+            
+            self._restore_pending_transactions(removed_blocks, suffix)
+            self._auto_prune()
+        
+        # Lượt đào hiện tại dựa trên khối cuối cũ, không còn giá trị
+        self.cancel_mining()
+        return True
+    
+    def _truncate_chain(self, height: int) -> List[Block]:
+        """
+        Xóa các khối từ độ cao `height` trở lên và hoàn tác sổ cái số dư.
+        
+        Args:
+            height: Số khối được giữ lại
+            
+        Returns:
+            Danh sách các khối đã bị xóa
+        """
+        removed_blocks = self.chain[height:]
+        if not removed_blocks:
+            return removed_blocks
+        
+        self._chain_cache.truncate(height)
+        
+        if len(removed_blocks) <= len(self._balance_undo):
+            for block in reversed(removed_blocks):
+                self._revert_balances()
+                self._confirmed.difference_update(self._confirmed_ids(block))
+                self.history.remove_block(block)
+            del self.chain[height:]
+        else:
+            # Không đủ dữ liệu hoàn tác: tính lại từ đầu
+            del self.chain[height:]
+            self._rebuild_balances()
+        
+        return removed_blocks
+    
+    def _restore_pending_transactions(self, removed_blocks: List[Block],
+                                      added_blocks: List[Block]) -> None:
+        """Đưa giao dịch của các khối bị loại bỏ trở lại danh sách chờ."""
+        confirmed = {transaction_id(transaction)
+                     for block in added_blocks for transaction in block.transactions}
+        
+        for block in removed_blocks:
+            for transaction in block.transactions:
+                # Bỏ qua giao dịch phần thưởng
+                if transaction["sender"] == REWARD_SENDER:
+                    continue
+                
+                txid = transaction_id(transaction)
+                if txid not in confirmed:
+                    self.mempool.add(transaction, txid)
+        
+        # Giao dịch đang chờ đã nằm trong chuỗi mới
+        self.mempool.remove_transactions(
+            transaction for block in added_blocks for transaction in block.transactions)
 
 
 if __name__ == "__main__":
     # Kiểm tra nhanh
     blockchain = Blockchain()
     
+    # Đào khối đầu tiên để address1 có số dư
+    blockchain.mine_block("address1")
+    
     # Thêm một số giao dịch
     blockchain.add_transaction("address1", "address2", 10)
     blockchain.add_transaction("address2", "address3", 5)
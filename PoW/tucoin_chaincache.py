@@ -0,0 +1,73 @@
+from array import array
+from typing import Sequence
+
+# Phân cách giữa hai khối trong danh sách JSON (giống json.dumps)
+_SEPARATOR = b", "
+
+
+class ChainCache:
+    """
+    Bản mã hóa JSON của danh sách khối, ghép từ bản mã hóa của từng khối.
+
+    Bộ đệm chỉ được tạo ở lần dùng đầu tiên, sau đó được cập nhật khi nối
+    khối và cắt ngắn khi khối bị xóa khỏi cuối chuỗi, nên mỗi khối chỉ được
+    mã hóa một lần. Đối tượng không tự khóa: người gọi (Blockchain) giữ khóa
+    của chuỗi khi dùng.
+    """
+
+    def __init__(self):
+        # Các khối đã mã hóa, nối tiếp nhau và cách nhau bởi _SEPARATOR
+        self._buffer = bytearray()
+
+        # Vị trí bắt đầu (kể cả phân cách đứng trước) của mỗi khối trong bộ đệm
+        self._offsets = array('Q')
+        self._built = False
+
+    def add_block(self, block) -> None:
+        """
+        Thêm bản mã hóa của khối vừa được nối vào cuối chuỗi.
+
+        Args:
+            block: Khối vừa được nối
+        """
+        if not self._built:
+            return
+
+        self._offsets.append(len(self._buffer))
+        if len(self._offsets) > 1:
+            self._buffer += _SEPARATOR
+        self._buffer += block.serialize()
+
+    def truncate(self, height: int) -> None:
+        """
+        Bỏ bản mã hóa của các khối từ độ cao `height` trở lên.
+
+        Args:
+            height: Số khối được giữ lại
+        """
+        if height < len(self._offsets):
+            del self._buffer[self._offsets[height]:]
+            del self._offsets[height:]
+
+    def clear(self) -> None:
+        """Bỏ toàn bộ bộ đệm (được tạo lại ở lần dùng tiếp theo)."""
+        self._buffer = bytearray()
+        self._offsets = array('Q')
+        self._built = False
+
+    def encoded(self, chain: Sequence) -> bytearray:
+        """
+        Bản mã hóa của các khối trong chuỗi, chưa gồm dấu ngoặc vuông.
+
+        Args:
+            chain: Chuỗi khối mà bộ đệm đang theo dõi
+
+        Returns:
+            Bộ đệm (không sao chép; chỉ hợp lệ cho đến khi chuỗi thay đổi)
+        """
+        if not self._built or len(self._offsets) != len(chain):
+            self.clear()
+            self._built = True
+            for height in range(len(chain)):
+                self.add_block(chain[height])
+        return self._buffer
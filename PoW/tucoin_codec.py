@@ -0,0 +1,510 @@
+import struct
+import sys
+import zlib
+from array import array
+from itertools import chain
+from typing import Any, Dict, List, Optional, Sequence
+
+from tucoin_framing import ItemHook, decode_message
+
+# Tên các codec dùng khi thỏa thuận trong CONNECT / CONNECT_ACK
+CODEC_JSON = "json"
+CODEC_BINARY = "binary/1"
+
+# Các codec được hỗ trợ, theo thứ tự ưu tiên
+SUPPORTED_CODECS = (CODEC_BINARY, CODEC_JSON)
+
+# Thông điệp nhị phân: MAGIC, phiên bản, cờ, nội dung. MAGIC khác "{" và
+# khoảng trắng nên phân biệt được với thông điệp JSON từ byte đầu tiên.
+MAGIC = 0xB7
+VERSION = 1
+_FLAG_ZLIB = 0x01
+_HEADER_SIZE = 3
+
+# Nội dung từ kích thước này (bytes) được nén bằng zlib
+COMPRESS_THRESHOLD = 4096
+COMPRESS_LEVEL = 1
+
+# Kích thước tối đa sau khi giải nén khi người gọi không đặt giới hạn (bytes)
+MAX_DECOMPRESSED_SIZE = 32 * 1024 * 1024
+
+# Kiểu của một giá trị
+_NONE, _FALSE, _TRUE, _INT, _BIGINT, _FLOAT, _STR, _REF, _HEX, _LIST, _DICT, _TABLE = range(12)
+
+# Cách lưu một cột của bảng (danh sách các dictionary)
+_COLUMN_ANY, _COLUMN_INT, _COLUMN_FLOAT, _COLUMN_STR, _COLUMN_HEX = range(5)
+
+# Chuỗi hex chữ thường (hash, khóa, chữ ký) từ độ dài này được gửi dạng bytes thô
+_MIN_HEX_LENGTH = 16
+
+# Chuỗi không dài hơn giới hạn này được gửi một lần rồi tham chiếu theo số thứ tự
+_MAX_SHARED_LENGTH = 256
+
+# Bảng cần ít nhất số hàng này và không quá số cột này
+_MIN_TABLE_ROWS = 2
+_MAX_TABLE_COLUMNS = 64
+
+_MAX_DEPTH = 64
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+_DOUBLE = struct.Struct("<d")
+_SWAP = sys.byteorder == "big"
+
+
+class CodecError(ValueError):
+    """Thông điệp nhị phân không hợp lệ."""
+
+
+def choose_codec(offered: Any) -> str:
+    """
+    Chọn codec ưu tiên nhất mà cả hai bên cùng hỗ trợ.
+
+    Args:
+        offered: Danh sách tên codec peer hỗ trợ (giá trị khác được bỏ qua)
+
+    Returns:
+        Tên codec, CODEC_JSON nếu không có codec chung
+    """
+    if isinstance(offered, list):
+        for codec in SUPPORTED_CODECS:
+            if codec in offered:
+                return codec
+    return CODEC_JSON
+
+
+def _hex_bytes(text: str) -> Optional[bytes]:
+    """Bytes của chuỗi hex chữ thường, hoặc None nếu không giải mã lại đúng chuỗi đó."""
+    try:
+        data = bytes.fromhex(text)
+    except ValueError:
+        return None
+    return data if data.hex() == text else None
+
+
+def is_binary(payload) -> bool:
+    """True nếu nội dung thông điệp là dạng nhị phân (không phải JSON)."""
+    return len(payload) > 0 and payload[0] == MAGIC
+
+
+class _Encoder:
+    """Mã hóa một giá trị dạng JSON thành bytes."""
+
+    def __init__(self):
+        self.out = bytearray()
+        self.strings: Dict[str, int] = {}
+
+    def varint(self, number: int) -> None:
+        out = self.out
+        while number >= 0x80:
+            out.append((number & 0x7F) | 0x80)
+            number >>= 7
+        out.append(number)
+
+    def array(self, typecode: str, values: Sequence) -> None:
+        packed = array(typecode, values)
+        if _SWAP:
+            packed.byteswap()
+        self.out += packed.tobytes()
+
+    def string(self, text: str) -> None:
+        index = self.strings.get(text)
+        if index is not None:
+            self.out.append(_REF)
+            self.varint(index)
+            return
+
+        if len(text) <= _MAX_SHARED_LENGTH:
+            self.strings[text] = len(self.strings)
+        data = _hex_bytes(text) if len(text) >= _MIN_HEX_LENGTH else None
+        if data is not None:
+            self.out.append(_HEX)
+        else:
+            data = text.encode()
+            self.out.append(_STR)
+        self.varint(len(data))
+        self.out += data
+
+    def value(self, value: Any) -> None:
+        kind = type(value)
+        if kind is str:
+            self.string(value)
+        elif kind is int:
+            if _INT64_MIN <= value <= _INT64_MAX:
+                self.out.append(_INT)
+                self.varint(value * 2 if value >= 0 else -value * 2 - 1)
+            else:
+                data = value.to_bytes(value.bit_length() // 8 + 1, "big", signed=True)
+                self.out.append(_BIGINT)
+                self.varint(len(data))
+                self.out += data
+        elif kind is float:
+            self.out.append(_FLOAT)
+            self.out += _DOUBLE.pack(value)
+        elif value is None:
+            self.out.append(_NONE)
+        elif kind is bool:
+            self.out.append(_TRUE if value else _FALSE)
+        elif kind is dict:
+            self.out.append(_DICT)
+            self.varint(len(value))
+            for key, item in value.items():
+                if type(key) is not str:
+                    raise TypeError(f"khóa phải là chuỗi, không phải {type(key).__name__}")
+                self.string(key)
+                self.value(item)
+        elif kind is list or kind is tuple:
+            if not self.table(value):
+                self.out.append(_LIST)
+                self.varint(len(value))
+                for item in value:
+                    self.value(item)
+        elif hasattr(value, "to_dict"):
+            self.value(value.to_dict())
+        else:
+            raise TypeError(f"không mã hóa được giá trị kiểu {kind.__name__}")
+
+    def table(self, rows: Sequence) -> bool:
+        """Mã hóa danh sách các dictionary theo cột; False nếu không phù hợp."""
+        if len(rows) < _MIN_TABLE_ROWS or any(type(row) is not dict for row in rows):
+            return False
+        keys = dict.fromkeys(chain.from_iterable(rows))
+        if not keys or len(keys) > _MAX_TABLE_COLUMNS or any(type(key) is not str for key in keys):
+            return False
+
+        self.out.append(_TABLE)
+        self.varint(len(rows))
+        self.varint(len(keys))
+        for key in keys:
+            self.string(key)
+            present = [key in row for row in rows]
+            if all(present):
+                self.out.append(0)
+                self.column([row[key] for row in rows])
+            else:
+                self.out.append(1)
+                self.out += bytes(present)
+                self.column([row[key] for row in rows if key in row])
+        return True
+
+    def column(self, values: List[Any]) -> None:
+        kinds = set(map(type, values))
+        if kinds == {float}:
+            self.out.append(_COLUMN_FLOAT)
+            self.array('d', values)
+        elif kinds == {int} and _INT64_MIN <= min(values) and max(values) <= _INT64_MAX:
+            self.out.append(_COLUMN_INT)
+            self.array('q', values)
+        elif kinds == {str}:
+            # Cột hex: mọi giá trị cùng độ dài chẵn nên ghép lại vẫn tách được
+            width = len(values[0])
+            data = None
+            if width >= _MIN_HEX_LENGTH and width % 2 == 0 and all(len(text) == width for text in values):
+                data = _hex_bytes("".join(values))
+            if data is not None:
+                self.out.append(_COLUMN_HEX)
+                self.varint(width // 2)
+                self.out += data
+            else:
+                self.string_column(values)
+        else:
+            self.out.append(_COLUMN_ANY)
+            for value in values:
+                self.value(value)
+
+    def string_column(self, values: List[str]) -> None:
+        """Cột chuỗi: các chuỗi mới rồi số thứ tự (4 bytes) của từng giá trị."""
+        strings = self.strings
+        added: List[str] = []
+        indices = []
+        for text in values:
+            index = strings.get(text)
+            if index is None:
+                index = strings[text] = len(strings)
+                added.append(text)
+            indices.append(index)
+
+        self.out.append(_COLUMN_STR)
+        self.varint(len(added))
+        for text in added:
+            data = text.encode()
+            self.varint(len(data))
+            self.out += data
+        self.array('I', indices)
+
+
+class _Decoder:
+    """Giải mã bytes tạo bởi `_Encoder`."""
+
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+        self.strings: List[str] = []
+
+    def take(self, size: int):
+        start = self.position
+        end = start + size
+        if end > len(self.data):
+            raise CodecError("thông điệp nhị phân bị cắt cụt")
+        self.position = end
+        return self.data[start:end]
+
+    def byte(self) -> int:
+        try:
+            value = self.data[self.position]
+        except IndexError:
+            raise CodecError("thông điệp nhị phân bị cắt cụt") from None
+        self.position += 1
+        return value
+
+    def varint(self) -> int:
+        byte = self.byte()
+        if byte < 0x80:
+            return byte
+
+        result = byte & 0x7F
+        shift = 7
+        while True:
+            byte = self.byte()
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+            if shift > 63:
+                raise CodecError("số nguyên quá dài")
+
+    def count(self) -> int:
+        """Số phần tử; mỗi phần tử chiếm ít nhất một byte nên không thể vượt số bytes còn lại."""
+        count = self.varint()
+        if count > len(self.data) - self.position:
+            raise CodecError("số phần tử không hợp lệ")
+        return count
+
+    def array(self, typecode: str, count: int) -> list:
+        values = array(typecode)
+        values.frombytes(self.take(count * values.itemsize))
+        if _SWAP:
+            values.byteswap()
+        return values.tolist()
+
+    def shared(self, text: str) -> str:
+        if len(text) <= _MAX_SHARED_LENGTH:
+            self.strings.append(text)
+        return text
+
+    def string(self, tag: int) -> Optional[str]:
+        """Chuỗi có kiểu `tag`, hoặc None nếu `tag` không phải kiểu chuỗi."""
+        if tag == _STR:
+            return self.shared(str(self.take(self.varint()), "utf-8"))
+        if tag == _REF:
+            index = self.varint()
+            if index >= len(self.strings):
+                raise CodecError("tham chiếu chuỗi không hợp lệ")
+            return self.strings[index]
+        if tag == _HEX:
+            return self.shared(self.take(self.varint()).hex())
+        return None
+
+    def key(self) -> str:
+        # Chỉ đọc chuỗi: khóa là dictionary hay danh sách sẽ lồng không giới hạn độ sâu
+        key = self.string(self.byte())
+        if key is None:
+            raise CodecError("khóa phải là chuỗi")
+        return key
+
+    def value(self, depth: int) -> Any:
+        tag = self.byte()
+        text = self.string(tag)
+        if text is not None:
+            return text
+        if tag == _INT:
+            number = self.varint()
+            return number >> 1 if not number & 1 else -(number >> 1) - 1
+        if tag == _FLOAT:
+            return _DOUBLE.unpack(self.take(_DOUBLE.size))[0]
+        if tag == _BIGINT:
+            return int.from_bytes(self.take(self.varint()), "big", signed=True)
+        if tag == _NONE:
+            return None
+        if tag == _FALSE:
+            return False
+        if tag == _TRUE:
+            return True
+
+        if depth >= _MAX_DEPTH:
+            raise CodecError("thông điệp lồng quá sâu")
+        if tag == _DICT:
+            result = {}
+            for _ in range(self.count()):
+                key = self.key()
+                result[key] = self.value(depth + 1)
+            return result
+        if tag == _LIST:
+            return [self.value(depth + 1) for _ in range(self.count())]
+        if tag == _TABLE:
+            return self.table(depth + 1)
+        raise CodecError(f"kiểu giá trị không hợp lệ: {tag}")
+
+    def table(self, depth: int) -> List[Dict[str, Any]]:
+        count = self.count()
+        columns = self.count()
+        if count < _MIN_TABLE_ROWS or not columns:
+            raise CodecError("bảng không hợp lệ")
+
+        rows: List[Dict[str, Any]] = [{} for _ in range(count)]
+        for _ in range(columns):
+            key = self.key()
+            if self.byte():
+                selected = [row for row, present in zip(rows, self.take(count)) if present]
+            else:
+                selected = rows
+            for row, value in zip(selected, self.column(len(selected), depth)):
+                row[key] = value
+        return rows
+
+    def column(self, count: int, depth: int) -> list:
+        kind = self.byte()
+        if kind == _COLUMN_FLOAT:
+            return self.array('d', count)
+        if kind == _COLUMN_INT:
+            return self.array('q', count)
+        if kind == _COLUMN_HEX:
+            width = 2 * self.varint()
+            if not width:
+                raise CodecError("cột hex không hợp lệ")
+            text = self.take(count * width // 2).hex()
+            return [text[start:start + width] for start in range(0, len(text), width)]
+        if kind == _COLUMN_STR:
+            for _ in range(self.count()):
+                self.strings.append(str(self.take(self.varint()), "utf-8"))
+            strings = self.strings
+            try:
+                return [strings[index] for index in self.array('I', count)]
+            except IndexError:
+                raise CodecError("tham chiếu chuỗi không hợp lệ") from None
+        if kind == _COLUMN_ANY:
+            return [self.value(depth) for _ in range(count)]
+        raise CodecError(f"kiểu cột không hợp lệ: {kind}")
+
+
+def encode_binary(message: Dict[str, Any], compress_threshold: int = COMPRESS_THRESHOLD) -> bytes:
+    """
+    Mã hóa một thông điệp sang dạng nhị phân.
+
+    Số nguyên và số thực được phân biệt (để hash tính lại từ thông điệp
+    giải mã không đổi), chuỗi hex được gửi dạng bytes, chuỗi lặp lại được
+    gửi một lần, danh sách các dictionary (khối, giao dịch) được lưu theo
+    cột. Đối tượng có `to_dict()` (như Block) được mã hóa qua dictionary.
+
+    Args:
+        message: Thông điệp dạng dictionary
+        compress_threshold: Nén nội dung từ kích thước này (bytes)
+
+    Returns:
+        Thông điệp đã mã hóa
+
+    Raises:
+        TypeError: Nếu thông điệp chứa giá trị không mã hóa được
+    """
+    encoder = _Encoder()
+    encoder.value(message)
+    body = encoder.out
+
+    flags = 0
+    if len(body) >= compress_threshold:
+        compressed = zlib.compress(body, COMPRESS_LEVEL)
+        if len(compressed) < len(body):
+            body = compressed
+            flags |= _FLAG_ZLIB
+    return bytes((MAGIC, VERSION, flags)) + body
+
+
+def _apply_hooks(message: Dict[str, Any], hooks: Dict[str, ItemHook]) -> None:
+    """Chuyển đổi các mảng có khóa trong `hooks` (như `decode_message`)."""
+    containers = [message] + [value for value in message.values() if isinstance(value, dict)]
+    for container in containers:
+        for key, hook in hooks.items():
+            items = container.get(key)
+            if isinstance(items, list):
+                try:
+                    container[key] = [hook(item) for item in items]
+                except (KeyError, TypeError, ValueError) as e:
+                    raise CodecError(f"phần tử \"{key}\" không hợp lệ: {e!r}") from None
+
+
+def decode_binary(payload, hooks: Optional[Dict[str, ItemHook]] = None,
+                  max_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Giải mã một thông điệp nhị phân.
+
+    Args:
+        payload: Nội dung thông điệp (bytes hoặc memoryview)
+        hooks: Khóa mảng -> hàm chuyển đổi từng phần tử (như `decode_message`)
+        max_size: Kích thước tối đa sau khi giải nén (bytes, None =
+            MAX_DECOMPRESSED_SIZE)
+
+    Returns:
+        Thông điệp dạng dictionary
+
+    Raises:
+        CodecError: Nếu thông điệp không hợp lệ (kể cả bị cắt cụt hoặc có
+            phần tử không chuyển đổi được bằng `hooks`), sai phiên bản hoặc
+            vượt quá giới hạn kích thước
+    """
+    data = memoryview(payload)
+    if len(data) < _HEADER_SIZE or data[0] != MAGIC:
+        raise CodecError("không phải thông điệp nhị phân")
+    if data[1] != VERSION:
+        raise CodecError(f"phiên bản không được hỗ trợ: {data[1]}")
+
+    if max_size is None:
+        max_size = MAX_DECOMPRESSED_SIZE
+
+    body = data[_HEADER_SIZE:]
+    if data[2] & _FLAG_ZLIB:
+        # Giới hạn max_length: dữ liệu nén nhỏ không thể bung ra quá max_size
+        decompressor = zlib.decompressobj()
+        try:
+            body = decompressor.decompress(body, max_size)
+        except zlib.error as e:
+            raise CodecError(f"dữ liệu nén bị hỏng: {e}") from None
+        if decompressor.unconsumed_tail:
+            raise CodecError(f"thông điệp giải nén vượt quá {max_size} bytes")
+        if not decompressor.eof:
+            raise CodecError("dữ liệu nén bị cắt cụt")
+    else:
+        body = bytes(body)
+
+    decoder = _Decoder(body)
+    try:
+        message = decoder.value(0)
+    except (UnicodeDecodeError, OverflowError, MemoryError, RecursionError) as e:
+        raise CodecError(f"thông điệp nhị phân không hợp lệ: {e}") from None
+    if decoder.position != len(body):
+        raise CodecError("dữ liệu thừa sau thông điệp nhị phân")
+    if not isinstance(message, dict):
+        raise CodecError("thông điệp phải là một dictionary")
+
+    if hooks:
+        _apply_hooks(message, hooks)
+    return message
+
+
+def decode_payload(payload, hooks: Optional[Dict[str, ItemHook]] = None,
+                   max_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Giải mã một thông điệp JSON hoặc nhị phân (nhận ra theo byte đầu tiên).
+
+    Args:
+        payload: Nội dung thông điệp (bytes hoặc memoryview)
+        hooks: Khóa mảng -> hàm chuyển đổi từng phần tử
+        max_size: Kích thước tối đa sau khi giải nén (bytes)
+
+    Returns:
+        Thông điệp dạng dictionary
+
+    Raises:
+        ValueError: Nếu nội dung không hợp lệ
+    """
+    if is_binary(payload):
+        return decode_binary(payload, hooks, max_size)
+    return decode_message(payload, hooks)
@@ -0,0 +1,259 @@
+import math
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+# Số đơn vị nhỏ nhất trong một TuCoin (số tiền được lưu dạng số nguyên)
+AMOUNT_SCALE = 10 ** 8
+
+# Các trường của một giao dịch có thể lưu dạng cột
+TRANSACTION_FIELDS = frozenset(("sender", "receiver", "amount", "timestamp"))
+
+# Các trường của một giao dịch đã ký (khóa công khai và chữ ký dạng hex)
+SIGNED_TRANSACTION_FIELDS = TRANSACTION_FIELDS | {"public_key", "signature"}
+
+# Kích thước khóa công khai và chữ ký (bytes)
+PUBLIC_KEY_SIZE = 32
+SIGNATURE_SIZE = 64
+
+# Cờ cho biết giá trị gốc là số nguyên (để mã hóa JSON và hash không đổi)
+_AMOUNT_IS_INT = 1
+_TIMESTAMP_IS_INT = 2
+
+# Cờ cho biết giao dịch có khóa công khai và chữ ký
+_SIGNED = 4
+
+_INT64_LIMIT = 1 << 63
+_FLOAT_EXACT_LIMIT = 1 << 53
+
+
+class AddressTable:
+    """
+    Bảng intern địa chỉ: mỗi chuỗi địa chỉ chỉ được lưu một lần.
+
+    Mỗi blockchain dùng một bảng riêng cho các khối dạng gọn của nó, nên
+    bảng được giải phóng cùng blockchain. Bảng chỉ thêm địa chỉ, như sổ cái
+    số dư (vốn đã giữ mọi địa chỉ từng xuất hiện trong chuỗi).
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._addresses: List[str] = []
+        self._lock = threading.Lock()
+
+    def intern(self, address: str) -> int:
+        """
+        Lấy id số nguyên của một địa chỉ, thêm mới nếu chưa có.
+
+        Args:
+            address: Chuỗi địa chỉ
+
+        Returns:
+            Id của địa chỉ
+        """
+        address_id = self._ids.get(address)
+        if address_id is None:
+            with self._lock:
+                address_id = self._ids.get(address)
+                if address_id is None:
+                    address_id = len(self._addresses)
+                    self._addresses.append(address)
+                    self._ids[address] = address_id
+        return address_id
+
+    def lookup(self, address_id: int) -> str:
+        """Lấy chuỗi địa chỉ từ id."""
+        return self._addresses[address_id]
+
+    def __len__(self) -> int:
+        return len(self._addresses)
+
+
+def _encode_amount(amount) -> Optional[int]:
+    """Đổi số tiền thành số nguyên đơn vị nhỏ nhất, None nếu mất chính xác."""
+    if type(amount) is int:
+        units = amount * AMOUNT_SCALE
+    elif type(amount) is float and math.isfinite(amount):
+        units = round(amount * AMOUNT_SCALE)
+        if units / AMOUNT_SCALE != amount:
+            return None
+    else:
+        return None
+
+    return units if -_INT64_LIMIT <= units < _INT64_LIMIT else None
+
+
+def _decode_hex(value, size: int) -> Optional[bytes]:
+    """Đổi chuỗi hex chữ thường có đúng `size` bytes, None nếu không khôi phục chính xác."""
+    if type(value) is not str or len(value) != 2 * size:
+        return None
+    try:
+        data = bytes.fromhex(value)
+    except ValueError:
+        return None
+    return data if data.hex() == value else None
+
+
+class TransactionColumns:
+    """
+    Danh sách giao dịch của một khối lưu dạng cột trong một bộ đệm duy nhất.
+
+    Bộ đệm gồm các cột liên tiếp: số tiền (int64, đơn vị 1e-8 TuCoin),
+    thời gian (float64), id người gửi, id người nhận (uint32, trong bảng
+    địa chỉ của khối) và cờ kiểu dữ liệu (uint8), rồi đến khóa công khai và
+    chữ ký (32 + 64 bytes) của các giao dịch đã ký, theo thứ tự giao dịch.
+    """
+
+    __slots__ = ("count", "_buffer", "_addresses")
+
+    def __init__(self, count: int, buffer: bytes, addresses: AddressTable):
+        """
+        Args:
+            count: Số giao dịch
+            buffer: Bộ đệm chứa các cột
+            addresses: Bảng địa chỉ chứa các id người gửi, người nhận
+        """
+        self.count = count
+        self._buffer = buffer
+        self._addresses = addresses
+
+    @classmethod
+    def from_transactions(cls, transactions: List[Dict],
+                          addresses: AddressTable) -> Optional['TransactionColumns']:
+        """
+        Chuyển danh sách giao dịch sang dạng cột.
+
+        Chỉ chuyển khi có thể khôi phục chính xác từng giao dịch (cùng các
+        trường, cùng giá trị và kiểu số), để hash của khối không thay đổi.
+
+        Args:
+            transactions: Danh sách giao dịch dạng dictionary
+            addresses: Bảng địa chỉ để lưu người gửi, người nhận
+
+        Returns:
+            Đối tượng TransactionColumns hoặc None nếu không thể chuyển
+        """
+        amounts = array('q')
+        timestamps = array('d')
+        senders = array('I')
+        receivers = array('I')
+        flags = bytearray()
+        signatures = bytearray()
+
+        for transaction in transactions:
+            if type(transaction) is not dict:
+                return None
+
+            signed = transaction.keys() == SIGNED_TRANSACTION_FIELDS
+            if not signed and transaction.keys() != TRANSACTION_FIELDS:
+                return None
+
+            if signed:
+                public_key = _decode_hex(transaction["public_key"], PUBLIC_KEY_SIZE)
+                signature = _decode_hex(transaction["signature"], SIGNATURE_SIZE)
+                if public_key is None or signature is None:
+                    return None
+                signatures += public_key + signature
+
+            sender = transaction["sender"]
+            receiver = transaction["receiver"]
+            if type(sender) is not str or type(receiver) is not str:
+                return None
+
+            amount = transaction["amount"]
+            units = _encode_amount(amount)
+            if units is None:
+                return None
+
+            timestamp = transaction["timestamp"]
+            if type(timestamp) is int:
+                if abs(timestamp) > _FLOAT_EXACT_LIMIT:
+                    return None
+            elif type(timestamp) is not float:
+                return None
+
+            amounts.append(units)
+            timestamps.append(timestamp)
+            senders.append(addresses.intern(sender))
+            receivers.append(addresses.intern(receiver))
+            flags.append((_AMOUNT_IS_INT if type(amount) is int else 0) |
+                         (_TIMESTAMP_IS_INT if type(timestamp) is int else 0) |
+                         (_SIGNED if signed else 0))
+
+        buffer = (amounts.tobytes() + timestamps.tobytes() +
+                  senders.tobytes() + receivers.tobytes() + bytes(flags) + bytes(signatures))
+        return cls(len(flags), buffer, addresses)
+
+    def _column(self, offset: int, item_size: int, fmt: str) -> memoryview:
+        """Lấy một cột dưới dạng memoryview có kiểu."""
+        return memoryview(self._buffer)[offset:offset + self.count * item_size].cast(fmt)
+
+    @property
+    def amounts(self) -> memoryview:
+        """Cột số tiền (đơn vị nhỏ nhất, xem AMOUNT_SCALE)."""
+        return self._column(0, 8, 'q')
+
+    @property
+    def timestamps(self) -> memoryview:
+        """Cột thời gian giao dịch."""
+        return self._column(8 * self.count, 8, 'd')
+
+    @property
+    def sender_ids(self) -> memoryview:
+        """Cột id người gửi."""
+        return self._column(16 * self.count, 4, 'I')
+
+    @property
+    def receiver_ids(self) -> memoryview:
+        """Cột id người nhận."""
+        return self._column(20 * self.count, 4, 'I')
+
+    @property
+    def flags(self) -> memoryview:
+        """Cột cờ kiểu dữ liệu."""
+        return self._column(24 * self.count, 1, 'B')
+
+    @property
+    def signatures(self) -> memoryview:
+        """Khóa công khai và chữ ký của các giao dịch đã ký (96 bytes mỗi giao dịch)."""
+        return memoryview(self._buffer)[25 * self.count:]
+
+    def to_list(self) -> List[Dict]:
+        """
+        Khôi phục danh sách giao dịch dạng dictionary.
+
+        Returns:
+            Danh sách giao dịch mới, giống hệt danh sách ban đầu
+        """
+        lookup = self._addresses.lookup
+        signatures = self.signatures
+        offset = 0
+        transactions = []
+
+        for units, timestamp, sender_id, receiver_id, flag in zip(
+                self.amounts, self.timestamps, self.sender_ids,
+                self.receiver_ids, self.flags):
+            transaction = {
+                "sender": lookup(sender_id),
+                "receiver": lookup(receiver_id),
+                "amount": units // AMOUNT_SCALE if flag & _AMOUNT_IS_INT else units / AMOUNT_SCALE,
+                "timestamp": int(timestamp) if flag & _TIMESTAMP_IS_INT else timestamp
+            }
+
+            if flag & _SIGNED:
+                key_end = offset + PUBLIC_KEY_SIZE
+                transaction["public_key"] = signatures[offset:key_end].hex()
+                offset = key_end + SIGNATURE_SIZE
+                transaction["signature"] = signatures[key_end:offset].hex()
+
+            transactions.append(transaction)
+
+        return transactions
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        """Kích thước bộ đệm (bytes)."""
+        return len(self._buffer)
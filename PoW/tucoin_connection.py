@@ -0,0 +1,537 @@
+import asyncio
+import select
+import socket
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Mapping, Optional, Union
+
+from tucoin_codec import decode_payload
+from tucoin_framing import ItemHook, MessageReader, write_frame, write_frame_async
+
+
+class PeerConnection:
+    """
+    Kết nối TCP lâu dài đến một peer, dùng cho nhiều thông điệp.
+
+    Kết nối được mở khi cần và mở lại khi bị đóng. Sau mỗi lần kết nối
+    thất bại, lần thử tiếp theo bị hoãn một khoảng thời gian tăng gấp đôi
+    (đến `max_backoff`), trong thời gian đó mọi yêu cầu thất bại ngay.
+    Các yêu cầu trên cùng một kết nối được thực hiện lần lượt.
+    """
+
+    def __init__(self, address: str, max_message_size: int,
+                 max_peer_bytes: Optional[int] = None,
+                 hooks: Optional[Dict[str, ItemHook]] = None,
+                 connect_timeout: float = 5.0, timeout: float = 30.0,
+                 min_backoff: float = 1.0, max_backoff: float = 60.0):
+        """
+        Args:
+            address: Địa chỉ peer dạng "host:port"
+            max_message_size: Kích thước tối đa của một phản hồi (bytes)
+            max_peer_bytes: Tổng số bytes tối đa nhận mỗi phút (None = không giới hạn)
+            hooks: Hàm chuyển đổi phần tử mảng khi giải mã phản hồi
+            connect_timeout: Thời gian chờ kết nối (giây)
+            timeout: Thời gian chờ gửi hoặc nhận một thông điệp (giây)
+            min_backoff: Thời gian hoãn sau lần kết nối thất bại đầu tiên (giây)
+            max_backoff: Thời gian hoãn tối đa (giây)
+        """
+        host, port = address.rsplit(":", 1)
+        self.address = address
+        self._endpoint = (host, int(port))
+        self.max_message_size = max_message_size
+        self.max_peer_bytes = max_peer_bytes
+        self.hooks = hooks
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._socket: Optional[socket.socket] = None
+        self._reader: Optional[MessageReader] = None
+
+        # Số lần kết nối thất bại liên tiếp và thời điểm được thử lại
+        self.failures = 0
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+    @property
+    def connected(self) -> bool:
+        """True nếu đang giữ một kết nối mở."""
+        return self._socket is not None
+
+    def _close_socket(self) -> None:
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+        self._socket = None
+        self._reader = None
+
+    def _is_open(self) -> bool:
+        """
+        Kiểm tra kết nối đang giữ có còn dùng được không.
+
+        Peer không gửi gì ngoài phản hồi cho yêu cầu, nên nếu socket đọc được
+        khi không có yêu cầu nào thì peer đã đóng kết nối (hoặc gửi dữ liệu
+        không mong đợi).
+        """
+        try:
+            readable, _, _ = select.select([self._socket], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def _connect(self) -> None:
+        """Mở kết nối mới, hoặc báo lỗi ngay nếu đang trong thời gian hoãn."""
+        if time.monotonic() < self._retry_at:
+            raise ConnectionError(f"đang chờ kết nối lại đến {self.address}")
+
+        try:
+            sock = socket.create_connection(self._endpoint, timeout=self.connect_timeout)
+        except OSError:
+            self.failures += 1
+            self._backoff = min(max(2 * self._backoff, self.min_backoff), self.max_backoff)
+            self._retry_at = time.monotonic() + self._backoff
+            raise
+
+        sock.settimeout(self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket = sock
+        self._reader = MessageReader(self.max_message_size, self.max_peer_bytes)
+        self.failures = 0
+        self._backoff = 0.0
+
+    def _send(self, payload: bytes) -> None:
+        """
+        Gửi một thông điệp, mở lại kết nối một lần nếu kết nối cũ đã hỏng.
+
+        Phải được gọi khi đang giữ khóa.
+        """
+        if self._socket is not None and not self._is_open():
+            self._close_socket()
+
+        reused = self._socket is not None
+        if not reused:
+            self._connect()
+
+        try:
+            write_frame(self._socket, payload)
+        except OSError:
+            self._close_socket()
+            if not reused:
+                raise
+            self._connect()
+            try:
+                write_frame(self._socket, payload)
+            except OSError:
+                self._close_socket()
+                raise
+
+    def _acquire(self) -> None:
+        """Chờ lượt dùng kết nối, tối đa `timeout` giây."""
+        if not self._lock.acquire(timeout=self.timeout):
+            raise TimeoutError(f"kết nối đến {self.address} đang bận")
+
+    def send(self, payload: bytes) -> None:
+        """
+        Gửi một thông điệp không cần phản hồi.
+
+        Args:
+            payload: Thông điệp đã mã hóa
+
+        Raises:
+            OSError: Nếu không gửi được (kể cả khi đang trong thời gian hoãn
+                hoặc kết nối bận quá thời gian chờ)
+        """
+        self._acquire()
+        try:
+            self._send(payload)
+        finally:
+            self._lock.release()
+
+    def request(self, payload: bytes) -> Dict[str, Any]:
+        """
+        Gửi một thông điệp và chờ phản hồi.
+
+        Args:
+            payload: Thông điệp đã mã hóa
+
+        Returns:
+            Phản hồi đã giải mã
+
+        Raises:
+            OSError: Nếu không gửi hoặc nhận được (kết nối bị đóng)
+            ValueError: Nếu phản hồi không hợp lệ (kết nối bị đóng)
+        """
+        self._acquire()
+        try:
+            self._send(payload)
+            try:
+                response = self._reader.read(self._socket)
+                if response is None:
+                    raise ConnectionError(f"{self.address} đã đóng kết nối")
+                return decode_payload(response, self.hooks, self.max_message_size)
+            except Exception:
+                # Kết nối không còn đồng bộ với peer: bỏ và mở lại lần sau
+                self._close_socket()
+                raise
+        finally:
+            self._lock.release()
+
+    def close(self) -> None:
+        """Đóng kết nối (sẽ được mở lại ở yêu cầu tiếp theo)."""
+        with self._lock:
+            self._close_socket()
+
+
+class AsyncPeerConnection:
+    """
+    Kết nối lâu dài đến một peer dùng asyncio (như `PeerConnection`).
+
+    Mọi phương thức phải được gọi trên cùng một event loop. Việc giải mã
+    phản hồi (có thể tốn nhiều CPU với lô khối lớn) chạy trong `executor`
+    để không chặn event loop.
+    """
+
+    def __init__(self, address: str, max_message_size: int,
+                 max_peer_bytes: Optional[int] = None,
+                 hooks: Optional[Dict[str, ItemHook]] = None,
+                 connect_timeout: float = 5.0, timeout: float = 30.0,
+                 min_backoff: float = 1.0, max_backoff: float = 60.0,
+                 executor: Optional[Executor] = None):
+        """
+        Args:
+            address: Địa chỉ peer dạng "host:port"
+            max_message_size: Kích thước tối đa của một phản hồi (bytes)
+            max_peer_bytes: Tổng số bytes tối đa nhận mỗi phút (None = không giới hạn)
+            hooks: Hàm chuyển đổi phần tử mảng khi giải mã phản hồi
+            connect_timeout: Thời gian chờ kết nối (giây)
+            timeout: Thời gian chờ gửi hoặc nhận một thông điệp (giây)
+            min_backoff: Thời gian hoãn sau lần kết nối thất bại đầu tiên (giây)
+            max_backoff: Thời gian hoãn tối đa (giây)
+            executor: Nơi giải mã phản hồi (None = executor mặc định của loop)
+        """
+        host, port = address.rsplit(":", 1)
+        self.address = address
+        self._endpoint = (host, int(port))
+        self.max_message_size = max_message_size
+        self.max_peer_bytes = max_peer_bytes
+        self.hooks = hooks
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.executor = executor
+
+        self._lock = asyncio.Lock()
+        self._stream: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader: Optional[MessageReader] = None
+
+        # Số lần kết nối thất bại liên tiếp và thời điểm được thử lại
+        self.failures = 0
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+    @property
+    def connected(self) -> bool:
+        """True nếu đang giữ một kết nối mở."""
+        return self._writer is not None
+
+    def close(self) -> None:
+        """Đóng kết nối (sẽ được mở lại ở yêu cầu tiếp theo)."""
+        if self._writer is not None:
+            self._writer.close()
+        self._stream = None
+        self._writer = None
+        self._reader = None
+
+    def _is_open(self) -> bool:
+        """Kiểm tra kết nối đang giữ có còn dùng được không (peer chưa đóng)."""
+        return not self._writer.is_closing() and not self._stream.at_eof()
+
+    async def _connect(self) -> None:
+        """Mở kết nối mới, hoặc báo lỗi ngay nếu đang trong thời gian hoãn."""
+        if time.monotonic() < self._retry_at:
+            raise ConnectionError(f"đang chờ kết nối lại đến {self.address}")
+
+        try:
+            self._stream, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(*self._endpoint), self.connect_timeout)
+        except (OSError, asyncio.TimeoutError):
+            self.failures += 1
+            self._backoff = min(max(2 * self._backoff, self.min_backoff), self.max_backoff)
+            self._retry_at = time.monotonic() + self._backoff
+            raise
+
+        self._reader = MessageReader(self.max_message_size, self.max_peer_bytes)
+        self.failures = 0
+        self._backoff = 0.0
+
+    async def _send(self, payload: bytes) -> None:
+        """
+        Gửi một thông điệp, mở lại kết nối một lần nếu kết nối cũ đã hỏng.
+
+        Phải được gọi khi đang giữ khóa. Nếu việc gửi bị hủy giữa chừng,
+        kết nối bị đóng vì peer có thể đã nhận một phần thông điệp.
+        """
+        if self._writer is not None and not self._is_open():
+            self.close()
+
+        reused = self._writer is not None
+        if not reused:
+            await self._connect()
+
+        try:
+            await write_frame_async(self._writer, payload, self.timeout)
+        except OSError:
+            self.close()
+            if not reused:
+                raise
+            await self._connect()
+            try:
+                await write_frame_async(self._writer, payload, self.timeout)
+            except BaseException:
+                self.close()
+                raise
+        except BaseException:
+            self.close()
+            raise
+
+    async def _acquire(self) -> None:
+        """Chờ lượt dùng kết nối, tối đa `timeout` giây."""
+        try:
+            await asyncio.wait_for(self._lock.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"kết nối đến {self.address} đang bận") from None
+
+    async def send(self, payload: bytes) -> None:
+        """
+        Gửi một thông điệp không cần phản hồi.
+
+        Args:
+            payload: Thông điệp đã mã hóa
+
+        Raises:
+            OSError: Nếu không gửi được (kể cả khi đang trong thời gian hoãn
+                hoặc kết nối bận quá thời gian chờ)
+        """
+        await self._acquire()
+        try:
+            await self._send(payload)
+        finally:
+            self._lock.release()
+
+    async def request(self, payload: bytes) -> Dict[str, Any]:
+        """
+        Gửi một thông điệp và chờ phản hồi.
+
+        Args:
+            payload: Thông điệp đã mã hóa
+
+        Returns:
+            Phản hồi đã giải mã
+
+        Raises:
+            OSError: Nếu không gửi hoặc nhận được (kết nối bị đóng)
+            ValueError: Nếu phản hồi không hợp lệ
+        """
+        await self._acquire()
+        try:
+            await self._send(payload)
+            try:
+                response = await asyncio.wait_for(self._reader.read_async(self._stream),
+                                                  self.timeout)
+                if response is None:
+                    raise ConnectionError(f"{self.address} đã đóng kết nối")
+            except BaseException:
+                # Kết nối không còn đồng bộ với peer: bỏ và mở lại lần sau
+                self.close()
+                raise
+        finally:
+            self._lock.release()
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, decode_payload, response,
+                                          self.hooks, self.max_message_size)
+
+
+class ConnectionPool:
+    """Giữ một kết nối lâu dài đến mỗi peer, dùng chung cho phát sóng và đồng bộ."""
+
+    def __init__(self, **options):
+        """
+        Args:
+            **options: Tham số cho mỗi `PeerConnection` (max_message_size, ...)
+        """
+        self._options = options
+        self._connections: Dict[str, PeerConnection] = {}
+        self._lock = threading.Lock()
+
+    def get(self, address: str) -> PeerConnection:
+        """
+        Lấy kết nối đến một peer (tạo mới nếu chưa có; chưa mở socket).
+
+        Args:
+            address: Địa chỉ peer dạng "host:port"
+
+        Returns:
+            Kết nối đến peer
+        """
+        with self._lock:
+            connection = self._connections.get(address)
+            if connection is None:
+                connection = self._connections[address] = PeerConnection(address, **self._options)
+            return connection
+
+    def remove(self, address: str) -> None:
+        """Đóng và bỏ kết nối đến một peer."""
+        with self._lock:
+            connection = self._connections.pop(address, None)
+        if connection is not None:
+            connection.close()
+
+    def close(self) -> None:
+        """Đóng tất cả kết nối."""
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for connection in connections:
+            connection.close()
+
+
+# Kết quả gửi đến một peer
+DELIVERED = "delivered"
+FAILED = "failed"
+TIMED_OUT = "timed_out"
+QUARANTINED = "quarantined"
+
+
+class PeerQuarantine:
+    """
+    Theo dõi các peer gửi thất bại liên tiếp.
+
+    Peer thất bại liên tiếp `failure_limit` lần bị cách ly (bỏ qua khi phát
+    sóng) trong một khoảng thời gian tăng gấp đôi sau mỗi lần thất bại tiếp
+    theo; một lần gửi thành công xóa trạng thái của peer.
+    """
+
+    def __init__(self, failure_limit: int = 3, quarantine_time: float = 30.0,
+                 max_quarantine_time: float = 600.0):
+        """
+        Args:
+            failure_limit: Số lần thất bại liên tiếp trước khi cách ly peer
+            quarantine_time: Thời gian cách ly lần đầu (giây)
+            max_quarantine_time: Thời gian cách ly tối đa (giây)
+        """
+        self.failure_limit = failure_limit
+        self.quarantine_time = quarantine_time
+        self.max_quarantine_time = max_quarantine_time
+
+        # Số lần thất bại liên tiếp và thời điểm hết cách ly của mỗi peer
+        self._failures: Dict[str, int] = {}
+        self._quarantine: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def is_quarantined(self, peer: str) -> bool:
+        """True nếu peer đang bị cách ly."""
+        with self._lock:
+            return self._quarantine.get(peer, 0.0) > time.monotonic()
+
+    def record(self, peer: str, delivered: bool) -> None:
+        """Ghi nhận kết quả một lần gửi đến peer."""
+        with self._lock:
+            if delivered:
+                self._failures.pop(peer, None)
+                self._quarantine.pop(peer, None)
+                return
+
+            failures = self._failures[peer] = self._failures.get(peer, 0) + 1
+            if failures >= self.failure_limit:
+                duration = min(self.quarantine_time * 2 ** (failures - self.failure_limit),
+                               self.max_quarantine_time)
+                self._quarantine[peer] = time.monotonic() + duration
+
+    def forget(self, peer: str) -> None:
+        """Bỏ trạng thái thất bại và cách ly của một peer."""
+        with self._lock:
+            self._failures.pop(peer, None)
+            self._quarantine.pop(peer, None)
+
+
+class Broadcaster:
+    """
+    Gửi một thông điệp đến nhiều peer cùng lúc.
+
+    Mỗi peer được gửi trong một thread của nhóm thread, nên peer chậm hoặc
+    không phản hồi không làm chậm các peer khác. Peer thất bại nhiều lần
+    liên tiếp bị cách ly (xem `PeerQuarantine`).
+    """
+
+    def __init__(self, pool: ConnectionPool, workers: int = 8,
+                 quarantine: Optional[PeerQuarantine] = None):
+        """
+        Args:
+            pool: Nhóm kết nối đến các peer
+            workers: Số thread gửi
+            quarantine: Trạng thái cách ly của các peer (mặc định: tạo mới)
+        """
+        self._pool = pool
+        self.quarantine = quarantine if quarantine is not None else PeerQuarantine()
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="tucoin-broadcast")
+
+    def is_quarantined(self, peer: str) -> bool:
+        """True nếu peer đang bị cách ly."""
+        return self.quarantine.is_quarantined(peer)
+
+    def _deliver(self, peer: str, payload: bytes) -> str:
+        """Gửi đến một peer (chạy trong thread gửi)."""
+        try:
+            self._pool.get(peer).send(payload)
+        except Exception:
+            self.quarantine.record(peer, False)
+            return FAILED
+        self.quarantine.record(peer, True)
+        return DELIVERED
+
+    def broadcast(self, peers: Iterable[str], payload: Union[bytes, Mapping[str, bytes]],
+                  timeout: Optional[float] = None) -> Dict[str, str]:
+        """
+        Gửi thông điệp đến các peer cùng lúc.
+
+        Args:
+            peers: Địa chỉ các peer
+            payload: Thông điệp đã mã hóa, hoặc địa chỉ peer -> thông điệp
+                đã mã hóa cho peer đó
+            timeout: Thời gian chờ kết quả tối đa (giây); việc gửi chưa xong
+                vẫn tiếp tục sau khi hết thời gian chờ
+
+        Returns:
+            Kết quả của từng peer: DELIVERED, FAILED, TIMED_OUT hoặc QUARANTINED
+        """
+        results: Dict[str, str] = {}
+        futures = {}
+        for peer in peers:
+            if self.is_quarantined(peer):
+                results[peer] = QUARANTINED
+            else:
+                data = payload if isinstance(payload, bytes) else payload[peer]
+                futures[self._executor.submit(self._deliver, peer, data)] = peer
+
+        if futures:
+            done, _ = wait(futures, timeout)
+            for future, peer in futures.items():
+                results[peer] = future.result() if future in done else TIMED_OUT
+        return results
+
+    def forget(self, peer: str) -> None:
+        """Bỏ trạng thái thất bại và cách ly của một peer."""
+        self.quarantine.forget(peer)
+
+    def close(self) -> None:
+        """Dừng nhóm thread gửi (không chờ các lượt gửi đang chạy)."""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,412 @@
+import hashlib
+import secrets
+from typing import List, Optional, Sequence, Tuple
+
+# Tham số đường cong secp256k1: y^2 = x^3 + 7 trên trường F_p
+P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+G = (0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+     0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8)
+
+# Điểm dạng Jacobian (X, Y, Z) ứng với điểm affine (X / Z^2, Y / Z^3); Z = 0 là điểm vô cực
+Point = Tuple[int, int, int]
+INFINITY: Point = (0, 1, 0)
+
+# Nhân vô hướng theo cửa sổ 4 bit
+_WINDOW = 4
+_WINDOW_SIZE = 1 << _WINDOW
+_WINDOWS = 256 // _WINDOW
+
+# Bảng nhân sẵn của G: _g_table[i][j] = j * 16^i * G (dạng affine), tạo khi dùng lần đầu
+_g_table: Optional[List[List[Optional[Tuple[int, int]]]]] = None
+
+
+def _double(point: Point) -> Point:
+    """Nhân đôi một điểm."""
+    x, y, z = point
+    if z == 0 or y == 0:
+        return INFINITY
+
+    yy = y * y % P
+    s = 4 * x * yy % P
+    m = 3 * x * x % P
+    x3 = (m * m - 2 * s) % P
+    y3 = (m * (s - x3) - 8 * yy * yy) % P
+    z3 = 2 * y * z % P
+    return x3, y3, z3
+
+
+def _add(point: Point, other: Point) -> Point:
+    """Cộng hai điểm."""
+    x1, y1, z1 = point
+    x2, y2, z2 = other
+    if z1 == 0:
+        return other
+    if z2 == 0:
+        return point
+
+    z1z1 = z1 * z1 % P
+    z2z2 = z2 * z2 % P
+    u1 = x1 * z2z2 % P
+    u2 = x2 * z1z1 % P
+    s1 = y1 * z2 * z2z2 % P
+    s2 = y2 * z1 * z1z1 % P
+
+    if u1 == u2:
+        return _double(point) if s1 == s2 else INFINITY
+
+    h = (u2 - u1) % P
+    r = (s2 - s1) % P
+    hh = h * h % P
+    hhh = h * hh % P
+    v = u1 * hh % P
+    x3 = (r * r - hhh - 2 * v) % P
+    y3 = (r * (v - x3) - s1 * hhh) % P
+    z3 = h * z1 * z2 % P
+    return x3, y3, z3
+
+
+def _add_affine(point: Point, other: Tuple[int, int]) -> Point:
+    """Cộng một điểm Jacobian với một điểm affine (Z = 1)."""
+    x1, y1, z1 = point
+    x2, y2 = other
+    if z1 == 0:
+        return x2, y2, 1
+
+    z1z1 = z1 * z1 % P
+    u2 = x2 * z1z1 % P
+    s2 = y2 * z1 * z1z1 % P
+
+    if x1 == u2:
+        return _double(point) if y1 == s2 else INFINITY
+
+    h = (u2 - x1) % P
+    r = (s2 - y1) % P
+    hh = h * h % P
+    hhh = h * hh % P
+    v = x1 * hh % P
+    x3 = (r * r - hhh - 2 * v) % P
+    y3 = (r * (v - x3) - y1 * hhh) % P
+    z3 = h * z1 % P
+    return x3, y3, z3
+
+
+def _to_affine(point: Point) -> Optional[Tuple[int, int]]:
+    """Đổi điểm Jacobian sang affine (None nếu là điểm vô cực)."""
+    x, y, z = point
+    if z == 0:
+        return None
+    z_inv = pow(z, -1, P)
+    z_inv2 = z_inv * z_inv % P
+    return x * z_inv2 % P, y * z_inv2 * z_inv % P
+
+
+def _batch_to_affine(points: Sequence[Point]) -> List[Tuple[int, int]]:
+    """Đổi nhiều điểm (khác vô cực) sang affine với một phép nghịch đảo duy nhất."""
+    prefix = []
+    product = 1
+    for _, _, z in points:
+        product = product * z % P
+        prefix.append(product)
+
+    inverse = pow(product, -1, P)
+    result: List[Tuple[int, int]] = [None] * len(points)
+    for position in range(len(points) - 1, -1, -1):
+        x, y, z = points[position]
+        z_inv = inverse * prefix[position - 1] % P if position else inverse
+        inverse = inverse * z % P
+        z_inv2 = z_inv * z_inv % P
+        result[position] = (x * z_inv2 % P, y * z_inv2 * z_inv % P)
+    return result
+
+
+def _generator_table() -> List[List[Optional[Tuple[int, int]]]]:
+    """Bảng nhân sẵn của G cho phép nhân cơ sở cố định không cần nhân đôi."""
+    global _g_table
+    if _g_table is None:
+        table = []
+        base: Point = (G[0], G[1], 1)
+        for _ in range(_WINDOWS):
+            row: List[Optional[Tuple[int, int]]] = [None]
+            current = base
+            for _ in range(1, _WINDOW_SIZE):
+                row.append(_to_affine(current))
+                current = _add(current, base)
+            table.append(row)
+            # current = 16 * base
+            base = current
+        _g_table = table
+    return _g_table
+
+
+def _multiply_generator(scalar: int) -> Point:
+    """
+    Tính scalar * G bằng bảng nhân sẵn.
+
+    Thời gian phụ thuộc vào các chữ số của scalar, nên chỉ dùng cho dữ liệu
+    công khai (kiểm tra chữ ký); với khóa riêng tư và nonce dùng `_ladder`.
+    """
+    table = _generator_table()
+    result = INFINITY
+    for row in table:
+        digit = scalar & (_WINDOW_SIZE - 1)
+        if digit:
+            result = _add_affine(result, row[digit])
+        scalar >>= _WINDOW
+    return result
+
+
+def _cswap(first: Point, second: Point, bit: int) -> Tuple[Point, Point]:
+    """Đổi chỗ hai điểm khi bit = 1 bằng phép toán bit, không rẽ nhánh."""
+    mask = -bit
+    swapped_first = []
+    swapped_second = []
+    for a, b in zip(first, second):
+        delta = (a ^ b) & mask
+        swapped_first.append(a ^ delta)
+        swapped_second.append(b ^ delta)
+    return tuple(swapped_first), tuple(swapped_second)
+
+
+def _ladder(scalar: int) -> Point:
+    """
+    Tính scalar * G (0 < scalar < N) bằng thang Montgomery cho dữ liệu bí mật.
+
+    Mỗi bit đều thực hiện đúng một phép cộng và một phép nhân đôi, và hai
+    điểm được đổi chỗ bằng `_cswap`, nên chuỗi phép toán không phụ thuộc
+    vào giá trị của scalar. Scalar được cộng thêm N hoặc 2N để luôn có
+    đúng 257 bit (không lộ số bit 0 ở đầu); kết quả không đổi vì N * G là
+    điểm vô cực. (Phép toán số nguyên lớn của Python không đảm bảo thời
+    gian hằng, nên đây là biện pháp giảm rò rỉ, không phải bảo đảm tuyệt đối.)
+    """
+    extended = scalar + N
+    extended += N * (1 - (extended >> 256))
+
+    # Bit cao nhất (bit 256) luôn là 1: bắt đầu với R0 = G, R1 = 2G
+    base: Point = (G[0], G[1], 1)
+    r0, r1 = base, _double(base)
+    for position in range(255, -1, -1):
+        bit = (extended >> position) & 1
+        r0, r1 = _cswap(r0, r1, bit)
+        r1 = _add(r0, r1)
+        r0 = _double(r0)
+        r0, r1 = _cswap(r0, r1, bit)
+    return r0
+
+
+def _multiply_many(terms: Sequence[Tuple[int, Tuple[int, int]]]) -> Point:
+    """
+    Tính tổng k_i * P_i (nhân đa vô hướng kiểu Straus).
+
+    Các lần nhân đôi được dùng chung cho mọi điểm, nên tổng của nhiều tích
+    rẻ hơn nhiều so với tính từng tích rồi cộng lại.
+    """
+    multiples: List[Point] = []
+    scalars = []
+    for scalar, point in terms:
+        scalar %= N
+        if scalar == 0:
+            continue
+        # 1P, 2P, ..., 15P (các bội của một điểm khác vô cực đều khác vô cực vì N nguyên tố)
+        current = (point[0], point[1], 1)
+        multiples.append(current)
+        for _ in range(2, _WINDOW_SIZE):
+            current = _add_affine(current, point)
+            multiples.append(current)
+        scalars.append(scalar)
+
+    if not scalars:
+        return INFINITY
+
+    # Bảng affine để mỗi phép cộng trong vòng lặp chính là phép cộng hỗn hợp (rẻ hơn)
+    affine = _batch_to_affine(multiples)
+    step = _WINDOW_SIZE - 1
+    tables = [[None] + affine[start:start + step] for start in range(0, len(affine), step)]
+
+    top = max(scalars).bit_length()
+    result = INFINITY
+    for window in range((top + _WINDOW - 1) // _WINDOW - 1, -1, -1):
+        for _ in range(_WINDOW):
+            result = _double(result)
+        shift = window * _WINDOW
+        for scalar, row in zip(scalars, tables):
+            digit = (scalar >> shift) & (_WINDOW_SIZE - 1)
+            if digit:
+                result = _add_affine(result, row[digit])
+    return result
+
+
+def _tagged_hash(tag: str, data: bytes) -> bytes:
+    """Hash có nhãn theo BIP-340."""
+    tag_hash = hashlib.sha256(tag.encode()).digest()
+    return hashlib.sha256(tag_hash + tag_hash + data).digest()
+
+
+def _lift_x(x: int) -> Optional[Tuple[int, int]]:
+    """Điểm có hoành độ x và tung độ chẵn, None nếu không tồn tại."""
+    if x >= P:
+        return None
+    c = (pow(x, 3, P) + 7) % P
+    y = pow(c, (P + 1) // 4, P)
+    if y * y % P != c:
+        return None
+    return x, y if y % 2 == 0 else P - y
+
+
+def _secret_scalar(private_key: str) -> int:
+    """
+    Đổi khóa riêng tư (32 bytes dạng hex) thành số nguyên trong [1, N - 1].
+
+    Raises:
+        ValueError: Nếu khóa sai định dạng hoặc nằm ngoài khoảng hợp lệ
+    """
+    try:
+        key_bytes = bytes.fromhex(private_key)
+    except TypeError:
+        raise ValueError("invalid private key") from None
+    scalar = int.from_bytes(key_bytes, "big")
+    if len(key_bytes) != 32 or not 0 < scalar < N:
+        raise ValueError("invalid private key")
+    return scalar
+
+
+def public_key(private_key: str) -> str:
+    """
+    Tính khóa công khai (hoành độ 32 bytes, dạng hex) từ khóa riêng tư.
+
+    Args:
+        private_key: Khóa riêng tư dạng hex
+
+    Returns:
+        Khóa công khai dạng hex (64 ký tự)
+
+    Raises:
+        ValueError: Nếu khóa riêng tư không hợp lệ
+    """
+    x, _ = _to_affine(_ladder(_secret_scalar(private_key)))
+    return x.to_bytes(32, "big").hex()
+
+
+def sign(private_key: str, message: bytes, aux_rand: Optional[bytes] = None) -> str:
+    """
+    Ký một thông điệp bằng chữ ký Schnorr (BIP-340) trên secp256k1.
+
+    Args:
+        private_key: Khóa riêng tư dạng hex
+        message: Thông điệp cần ký (thường là hash 32 bytes)
+        aux_rand: 32 bytes ngẫu nhiên phụ trợ (mặc định: tạo mới; chỉ truyền
+            vào khi cần chữ ký xác định, ví dụ với bộ test của BIP-340)
+
+    Returns:
+        Chữ ký dạng hex (128 ký tự)
+
+    Raises:
+        ValueError: Nếu khóa riêng tư không hợp lệ
+    """
+    d = _secret_scalar(private_key)
+    px, py = _to_affine(_ladder(d))
+    if py % 2:
+        d = N - d
+    px_bytes = px.to_bytes(32, "big")
+
+    if aux_rand is None:
+        aux_rand = secrets.token_bytes(32)
+    aux = _tagged_hash("BIP0340/aux", aux_rand)
+    t = (d ^ int.from_bytes(aux, "big")).to_bytes(32, "big")
+    k = int.from_bytes(_tagged_hash("BIP0340/nonce", t + px_bytes + message), "big") % N
+    if k == 0:
+        raise ValueError("invalid nonce")
+
+    rx, ry = _to_affine(_ladder(k))
+    if ry % 2:
+        k = N - k
+    rx_bytes = rx.to_bytes(32, "big")
+
+    e = int.from_bytes(_tagged_hash("BIP0340/challenge", rx_bytes + px_bytes + message), "big") % N
+    return (rx_bytes + ((k + e * d) % N).to_bytes(32, "big")).hex()
+
+
+def _parse(public_key_hex: str, message: bytes,
+           signature_hex: str) -> Optional[Tuple[Tuple[int, int], int, int, int]]:
+    """Tách (điểm khóa công khai, r, s, e) từ dữ liệu chữ ký, None nếu sai định dạng."""
+    try:
+        key_bytes = bytes.fromhex(public_key_hex)
+        signature = bytes.fromhex(signature_hex)
+    except (TypeError, ValueError):
+        return None
+    if len(key_bytes) != 32 or len(signature) != 64:
+        return None
+
+    point = _lift_x(int.from_bytes(key_bytes, "big"))
+    r = int.from_bytes(signature[:32], "big")
+    s = int.from_bytes(signature[32:], "big")
+    if point is None or r >= P or s >= N:
+        return None
+
+    e = int.from_bytes(_tagged_hash("BIP0340/challenge", signature[:32] + key_bytes + message), "big") % N
+    return point, r, s, e
+
+
+def verify(public_key_hex: str, message: bytes, signature_hex: str) -> bool:
+    """
+    Kiểm tra một chữ ký Schnorr.
+
+    Args:
+        public_key_hex: Khóa công khai dạng hex
+        message: Thông điệp đã ký
+        signature_hex: Chữ ký dạng hex
+
+    Returns:
+        True nếu chữ ký hợp lệ
+    """
+    parsed = _parse(public_key_hex, message, signature_hex)
+    if parsed is None:
+        return False
+    point, r, s, e = parsed
+
+    # R = s * G - e * P
+    result = _add(_multiply_generator(s), _multiply_many([(N - e, point)]))
+    affine = _to_affine(result)
+    return affine is not None and affine[1] % 2 == 0 and affine[0] == r
+
+
+def verify_batch(items: Sequence[Tuple[str, bytes, str]]) -> bool:
+    """
+    Kiểm tra nhiều chữ ký cùng lúc (kiểm tra theo lô của BIP-340).
+
+    Kiểm tra một tổ hợp tuyến tính ngẫu nhiên của các phương trình chữ ký
+    bằng một phép nhân đa vô hướng, nhanh hơn kiểm tra từng chữ ký. Kết quả
+    True khi và chỉ khi (với xác suất áp đảo) mọi chữ ký đều hợp lệ; khi
+    False cần kiểm tra từng chữ ký để biết chữ ký nào sai.
+
+    Args:
+        items: Các bộ (khóa công khai hex, thông điệp, chữ ký hex)
+
+    Returns:
+        True nếu tất cả chữ ký hợp lệ
+    """
+    if len(items) == 1:
+        return verify(*items[0])
+
+    s_total = 0
+    terms: List[Tuple[int, Tuple[int, int]]] = []
+
+    for position, (public_key_hex, message, signature_hex) in enumerate(items):
+        parsed = _parse(public_key_hex, message, signature_hex)
+        if parsed is None:
+            return False
+        point, r, s, e = parsed
+        r_point = _lift_x(r)
+        if r_point is None:
+            return False
+
+        # Hệ số ngẫu nhiên 128 bit (hệ số đầu tiên là 1)
+        a = 1 if position == 0 else secrets.randbits(128) | 1
+        s_total += a * s
+        terms.append((a, r_point))
+        terms.append((a * e, point))
+
+    # (sum a_i s_i) G - sum a_i R_i - sum a_i e_i P_i phải là điểm vô cực
+    negated = [(N - scalar % N, point) for scalar, point in terms]
+    result = _add(_multiply_generator(s_total % N), _multiply_many(negated))
+    return result[2] == 0
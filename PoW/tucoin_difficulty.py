@@ -0,0 +1,207 @@
+import math
+import time
+from typing import Iterable, Optional, Sequence
+
+from tucoin_miner import HASH_SPACE
+
+# Target lớn nhất được phép (độ khó thấp nhất)
+MAX_TARGET = HASH_SPACE - 1
+
+
+def target_to_difficulty(target: int) -> float:
+    """
+    Đổi target thành độ khó tương đương (số lượng số 0 hex đầu tiên).
+
+    Ngược với `difficulty_to_target`, nhưng cho kết quả số thực để hiển thị
+    các mức độ khó nằm giữa hai số nguyên.
+
+    Args:
+        target: Ngưỡng mà hash phải nhỏ hơn
+
+    Returns:
+        Độ khó tương đương
+    """
+    return 64 - math.log(max(target, 1), 16)
+
+
+def block_work(target) -> int:
+    """
+    Lượng công việc của một khối: số hash trung bình cần thử để đạt target.
+
+    Args:
+        target: Target của khối
+
+    Returns:
+        Công việc của khối (0 nếu target không hợp lệ)
+    """
+    if not isinstance(target, int) or isinstance(target, bool) or not 0 < target <= MAX_TARGET:
+        return 0
+    return HASH_SPACE // target
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class Retargeter:
+    """
+    Điều chỉnh target của proof of work để giữ thời gian giữa các khối.
+
+    Cứ mỗi `interval` khối, target mới được tính từ target cũ theo tỉ lệ
+    giữa thời gian thực tế và thời gian mong muốn của các khối vừa qua
+    (giới hạn trong khoảng [1/max_adjustment, max_adjustment]). Các khối
+    còn lại dùng target của khối trước. Target chỉ phụ thuộc các khối đứng
+    trước nên mọi node tính ra cùng một giá trị.
+
+    Vì target dựa trên thời gian do người đào ghi vào khối, thời gian của
+    mỗi khối phải lớn hơn trung vị thời gian của `median_span` khối trước
+    và không được vượt quá thời gian hiện tại `max_future_time` giây.
+    """
+
+    def __init__(self, initial_target: int, interval: int = 10,
+                 block_time: float = 30.0, max_adjustment: int = 4,
+                 median_span: int = 11, max_future_time: float = 600.0):
+        """
+        Khởi tạo bộ điều chỉnh target.
+
+        Args:
+            initial_target: Target của khối genesis và các khối đầu tiên
+            interval: Số khối giữa hai lần điều chỉnh
+            block_time: Thời gian mong muốn giữa hai khối (giây)
+            max_adjustment: Hệ số thay đổi lớn nhất trong một lần điều chỉnh
+            median_span: Số khối trước dùng để tính trung vị thời gian
+            max_future_time: Thời gian tối đa (giây) một khối được ghi
+                trước thời gian hiện tại
+        """
+        self.initial_target = min(initial_target, MAX_TARGET)
+        self.interval = max(interval, 2)
+        self.block_time = block_time
+        self.max_adjustment = max_adjustment
+        self.median_span = max(median_span, 1)
+        self.max_future_time = max_future_time
+
+    def _block_target(self, block) -> int:
+        """Target đã áp dụng cho một khối (genesis luôn dùng target ban đầu)."""
+        return self.initial_target if block.index == 0 else block.target
+
+    def expected_target(self, chain: Sequence, height: int) -> int:
+        """
+        Tính target mà khối ở độ cao `height` phải dùng.
+
+        Args:
+            chain: Chuỗi khối, ít nhất gồm các khối có index nhỏ hơn `height`
+            height: Độ cao của khối cần tính target
+
+        Returns:
+            Target của khối
+        """
+        if height <= 0:
+            return self.initial_target
+
+        previous_block = chain[height - 1]
+        previous_target = self._block_target(previous_block)
+        if height % self.interval != 0:
+            return previous_target
+
+        # Thời gian thực tế của interval - 1 khoảng giữa các khối vừa qua
+        first_block = chain[height - self.interval]
+        expected_span = (self.interval - 1) * self.block_time
+        actual_span = previous_block.timestamp - first_block.timestamp
+        actual_span = min(max(actual_span, expected_span / self.max_adjustment),
+                          expected_span * self.max_adjustment)
+
+        # Nhân bằng số nguyên (tỉ lệ tính theo mili giây) để kết quả xác định
+        new_target = previous_target * int(actual_span * 1000) // int(expected_span * 1000)
+        return min(max(new_target, 1), MAX_TARGET)
+
+    def next_target(self, chain: Sequence) -> int:
+        """Target của khối tiếp theo sẽ được nối vào chuỗi."""
+        return self.expected_target(chain, len(chain))
+
+    def chain_work(self, blocks: Iterable) -> int:
+        """
+        Tổng công việc của các khối (dùng để chọn giữa hai nhánh).
+
+        Args:
+            blocks: Các khối cần tính
+
+        Returns:
+            Tổng `block_work` của target các khối
+        """
+        return sum(block_work(self._block_target(block)) for block in blocks)
+
+    def median_time_past(self, chain: Sequence, height: int) -> float:
+        """
+        Trung vị thời gian của tối đa `median_span` khối đứng trước độ cao `height`.
+
+        Args:
+            chain: Chuỗi khối, ít nhất gồm các khối có index nhỏ hơn `height`
+            height: Độ cao của khối cần tính (lớn hơn 0)
+
+        Returns:
+            Trung vị thời gian (Unix timestamp)
+        """
+        timestamps = sorted(chain[index].timestamp
+                            for index in range(max(height - self.median_span, 0), height))
+        return timestamps[len(timestamps) // 2]
+
+    def _valid_timestamp(self, timestamp, median_time: float, now: float) -> bool:
+        return _is_number(timestamp) and median_time < timestamp <= now + self.max_future_time
+
+    def is_valid_timestamp(self, chain: Sequence, height: int, timestamp,
+                           now: Optional[float] = None) -> bool:
+        """
+        Kiểm tra thời gian của khối ở độ cao `height`.
+
+        Args:
+            chain: Chuỗi khối, ít nhất gồm các khối có index nhỏ hơn `height`
+            height: Độ cao của khối
+            timestamp: Thời gian ghi trong khối
+            now: Thời gian hiện tại (mặc định: đồng hồ của máy)
+
+        Returns:
+            True nếu thời gian lớn hơn trung vị thời gian các khối trước và
+            không quá xa trong tương lai (khối genesis luôn hợp lệ)
+        """
+        if height <= 0:
+            return True
+        if now is None:
+            now = time.time()
+        return self._valid_timestamp(timestamp, self.median_time_past(chain, height), now)
+
+    def find_invalid_header(self, chain: Sequence, start: int = 1,
+                            now: Optional[float] = None) -> Optional[int]:
+        """
+        Tìm khối đầu tiên (từ `start`) có thời gian không hợp lệ hoặc target
+        khác với target phải dùng.
+
+        Args:
+            chain: Chuỗi khối đầy đủ (từ genesis)
+            start: Index khối đầu tiên cần kiểm tra
+            now: Thời gian hiện tại (mặc định: đồng hồ của máy)
+
+        Returns:
+            Index của khối sai đầu tiên, hoặc None nếu tất cả đều đúng
+        """
+        start = max(start, 1)
+        if start >= len(chain):
+            return None
+        if now is None:
+            now = time.time()
+
+        # Cửa sổ thời gian của các khối trước, trượt theo từng khối
+        window = [chain[index].timestamp
+                  for index in range(max(start - self.median_span, 0), start)]
+
+        for height in range(start, len(chain)):
+            block = chain[height]
+            timestamps = sorted(window)
+            if not self._valid_timestamp(block.timestamp, timestamps[len(timestamps) // 2], now):
+                return height
+            if block.target != self.expected_target(chain, height):
+                return height
+
+            window.append(block.timestamp)
+            if len(window) > self.median_span:
+                del window[0]
+        return None
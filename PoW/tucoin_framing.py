@@ -0,0 +1,246 @@
+import asyncio
+import json
+import re
+import socket
+import struct
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Mỗi thông điệp: độ dài (4 bytes, big-endian) + nội dung
+_LENGTH = struct.Struct(">I")
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Hàm chuyển đổi từng phần tử của một mảng khi giải mã (ví dụ Block.from_dict)
+ItemHook = Callable[[Any], Any]
+
+
+class FramingError(Exception):
+    """Thông điệp vượt quá giới hạn kích thước cho phép."""
+
+
+class MessageReader:
+    """
+    Đọc các thông điệp có tiền tố độ dài từ một kết nối.
+
+    Nội dung được đọc thẳng vào một bộ đệm cấp phát trước bằng `recv_into`
+    nên chi phí tỉ lệ tuyến tính với kích thước thông điệp. Mỗi thông điệp
+    bị giới hạn kích thước, và tổng số bytes một peer gửi trong một khoảng
+    thời gian cũng bị giới hạn.
+    """
+
+    # Bộ đệm lớn hơn kích thước này không được giữ lại sau thông điệp lớn
+    RETAIN_SIZE = 1024 * 1024
+
+    def __init__(self, max_message_size: int, max_peer_bytes: Optional[int] = None,
+                 window: float = 60.0):
+        """
+        Args:
+            max_message_size: Kích thước tối đa của một thông điệp (bytes)
+            max_peer_bytes: Tổng số bytes tối đa nhận trong mỗi khoảng
+                `window` giây (None = không giới hạn)
+            window: Độ dài khoảng thời gian tính giới hạn của peer (giây)
+        """
+        self.max_message_size = max_message_size
+        self.max_peer_bytes = max_peer_bytes
+        self.window = window
+
+        self._header = bytearray(_LENGTH.size)
+        self._buffer = bytearray()
+
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+
+    @staticmethod
+    def _read_exact(sock: socket.socket, view: memoryview) -> bool:
+        """Đọc cho đến khi đầy `view`; False nếu kết nối bị đóng giữa chừng."""
+        while view:
+            received = sock.recv_into(view)
+            if received == 0:
+                return False
+            view = view[received:]
+        return True
+
+    def _check_length(self, length: int) -> None:
+        """Kiểm tra giới hạn của một thông điệp và tính nó vào giới hạn của peer."""
+        if length > self.max_message_size:
+            raise FramingError(f"thông điệp {length} bytes vượt quá giới hạn {self.max_message_size} bytes")
+        if self.max_peer_bytes is None:
+            return
+
+        now = time.monotonic()
+        if now - self._window_start >= self.window:
+            self._window_start = now
+            self._window_bytes = 0
+
+        self._window_bytes += length
+        if self._window_bytes > self.max_peer_bytes:
+            raise FramingError(f"peer gửi quá {self.max_peer_bytes} bytes trong {self.window:g} giây")
+
+    def read(self, sock: socket.socket) -> Optional[memoryview]:
+        """
+        Đọc một thông điệp.
+
+        Args:
+            sock: Socket nguồn
+
+        Returns:
+            Nội dung thông điệp (chỉ hợp lệ đến lần đọc tiếp theo), hoặc None
+            nếu kết nối bị đóng
+
+        Raises:
+            FramingError: Nếu thông điệp vượt quá giới hạn kích thước
+        """
+        if not self._read_exact(sock, memoryview(self._header)):
+            return None
+
+        (length,) = _LENGTH.unpack(self._header)
+        self._check_length(length)
+
+        # Dùng lại bộ đệm nếu đủ lớn, bỏ bộ đệm quá lớn của thông điệp trước
+        if length > len(self._buffer) or len(self._buffer) > max(length, self.RETAIN_SIZE):
+            self._buffer = bytearray(length)
+
+        view = memoryview(self._buffer)[:length]
+        if not self._read_exact(sock, view):
+            return None
+        return view
+
+    async def read_async(self, stream: asyncio.StreamReader) -> Optional[bytes]:
+        """
+        Đọc một thông điệp từ luồng asyncio (cùng giới hạn như `read`).
+
+        Args:
+            stream: Luồng đọc của kết nối
+
+        Returns:
+            Nội dung thông điệp, hoặc None nếu kết nối bị đóng
+
+        Raises:
+            FramingError: Nếu thông điệp vượt quá giới hạn kích thước
+        """
+        try:
+            (length,) = _LENGTH.unpack(await stream.readexactly(_LENGTH.size))
+            self._check_length(length)
+            return await stream.readexactly(length)
+        except asyncio.IncompleteReadError:
+            return None
+
+
+def write_frame(sock: socket.socket, payload: bytes) -> None:
+    """
+    Gửi một thông điệp có tiền tố độ dài.
+
+    Args:
+        sock: Socket đích
+        payload: Nội dung thông điệp
+    """
+    sock.sendall(_LENGTH.pack(len(payload)))
+    sock.sendall(payload)
+
+
+async def write_frame_async(writer: asyncio.StreamWriter, payload: bytes,
+                            timeout: Optional[float] = None) -> None:
+    """
+    Gửi một thông điệp có tiền tố độ dài qua luồng asyncio.
+
+    Args:
+        writer: Luồng ghi của kết nối
+        payload: Nội dung thông điệp
+        timeout: Thời gian chờ gửi xong (giây)
+    """
+    writer.write(_LENGTH.pack(len(payload)))
+    writer.write(payload)
+    await asyncio.wait_for(writer.drain(), timeout)
+
+
+def _skip_whitespace(text: str, position: int) -> int:
+    return _WHITESPACE.match(text, position).end()
+
+
+def _expect(text: str, position: int, char: str) -> int:
+    """Kiểm tra ký tự tại `position` và trả về vị trí sau nó (bỏ khoảng trắng)."""
+    if text[position] != char:
+        raise ValueError(f"cần '{char}' tại vị trí {position}")
+    return _skip_whitespace(text, position + 1)
+
+
+def _decode_array(text: str, position: int, hook: ItemHook) -> Tuple[list, int]:
+    """Giải mã một mảng JSON, chuyển đổi từng phần tử ngay sau khi giải mã."""
+    items = []
+    position = _expect(text, position, "[")
+    if text[position] == "]":
+        return items, position + 1
+
+    while True:
+        item, position = _decoder.raw_decode(text, position)
+        items.append(hook(item))
+        position = _skip_whitespace(text, position)
+        if text[position] == "]":
+            return items, position + 1
+        position = _expect(text, position, ",")
+
+
+def _decode_object(text: str, position: int, hooks: Dict[str, ItemHook],
+                   depth: int) -> Tuple[Dict[str, Any], int]:
+    """Giải mã một object JSON; mảng có khóa trong `hooks` được giải mã từng phần tử."""
+    result: Dict[str, Any] = {}
+    position = _expect(text, position, "{")
+    if text[position] == "}":
+        return result, position + 1
+
+    while True:
+        key, position = _decoder.raw_decode(text, position)
+        if not isinstance(key, str):
+            raise ValueError(f"khóa không hợp lệ tại vị trí {position}")
+        position = _expect(text, _skip_whitespace(text, position), ":")
+
+        if key in hooks and text[position] == "[":
+            value, position = _decode_array(text, position, hooks[key])
+        elif depth > 0 and text[position] == "{":
+            value, position = _decode_object(text, position, hooks, depth - 1)
+        else:
+            value, position = _decoder.raw_decode(text, position)
+        result[key] = value
+
+        position = _skip_whitespace(text, position)
+        if text[position] == "}":
+            return result, position + 1
+        position = _expect(text, position, ",")
+
+
+def decode_message(payload, hooks: Optional[Dict[str, ItemHook]] = None) -> Dict[str, Any]:
+    """
+    Giải mã một thông điệp JSON.
+
+    Các mảng có khóa trong `hooks` (ở thông điệp hoặc trong "data") được
+    giải mã từng phần tử và chuyển đổi ngay, ví dụ thành từng khối, nên
+    không cần giữ cùng lúc cây dictionary của cả chuỗi và các khối.
+
+    Args:
+        payload: Nội dung thông điệp (bytes hoặc memoryview)
+        hooks: Khóa mảng -> hàm chuyển đổi từng phần tử
+
+    Returns:
+        Thông điệp dạng dictionary
+
+    Raises:
+        ValueError: Nếu nội dung không phải một object JSON hợp lệ
+    """
+    text = str(payload, "utf-8")
+    if not hooks:
+        message = json.loads(text)
+        if not isinstance(message, dict):
+            raise ValueError("thông điệp phải là một object JSON")
+        return message
+
+    try:
+        position = _skip_whitespace(text, 0)
+        message, position = _decode_object(text, position, hooks, 1)
+    except IndexError:
+        raise ValueError("thông điệp JSON bị cắt cụt") from None
+
+    if _skip_whitespace(text, position) != len(text):
+        raise ValueError("dữ liệu thừa sau thông điệp JSON")
+    return message
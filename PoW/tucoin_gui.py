@@ -10,6 +10,8 @@ import socket
 # aaa
 from tucoin_blockchain import Blockchain, Block
 from tucoin_node import Node
+from tucoin_async_node import AsyncNode
+from tucoin_storage import BlockStore
 from tucoin_wallet import Wallet, WalletManager
 
 def get_local_ip():
@@ -26,23 +28,52 @@ def get_local_ip():
 class TuCoinGUI:
     """Giao diện người dùng cho ứng dụng TuCoin."""
     
-    def __init__(self, host: str = '127.0.0.1', port: int = 5000):
+    def __init__(self, host: str = '127.0.0.1', port: int = 5000,
+                 mining_workers: Optional[int] = None, compact: bool = False,
+                 data_dir: Optional[str] = None, require_signatures: bool = False,
+                 prune_depth: Optional[int] = None, use_asyncio: bool = False,
+                 migrate_wallets: bool = False, validation_workers: int = 2):
         """
         Khởi tạo giao diện người dùng.
         
         Args:
             host: Địa chỉ IP của node
             port: Cổng lắng nghe
+            mining_workers: Số tiến trình đào (mặc định: tất cả lõi CPU)
+            compact: Lưu blockchain ở dạng gọn để giảm bộ nhớ
+            data_dir: Thư mục lưu blockchain trên đĩa (None: chỉ lưu trong bộ nhớ)
+            require_signatures: Chỉ chấp nhận giao dịch có chữ ký hợp lệ
+            prune_depth: Chỉ giữ giao dịch của số khối gần nhất này
+                (None: giữ toàn bộ)
+            use_asyncio: Dùng node asyncio (một event loop cho mọi kết nối)
+            migrate_wallets: Lưu các file ví đặt theo địa chỉ cũ sang tên theo
+                địa chỉ mới (file cũ được giữ lại làm bản sao lưu)
+            validation_workers: Số tiến trình kiểm tra chuỗi và kiểm tra chữ
+                ký; tách riêng với số tiến trình đào vì các nhóm này có thể
+                chạy cùng lúc với việc đào
         """
         self.host = host
         self.port = port
         
         # Khởi tạo wallet manager
         self.wallet_manager = WalletManager()
-        
-        # Khởi tạo blockchain và node
-        self.blockchain = Blockchain()
-        self.node = Node(host=host, port=port, blockchain=self.blockchain)
+        if migrate_wallets:
+            self.wallet_manager.migrate_wallet_files()
+        
+        # Khởi tạo blockchain (tải lại từ đĩa nếu có) và node
+        self.block_store = BlockStore(data_dir) if data_dir else None
+        self.blockchain = Blockchain(mining_workers=mining_workers, compact=compact,
+                                     validation_workers=validation_workers,
+                                     store=self.block_store,
+                                     require_signatures=require_signatures,
+                                     verification_workers=validation_workers,
+                                     prune_depth=prune_depth,
+                                     snapshot_path=os.path.join(data_dir, "snapshot.json")
+                                     if data_dir else None,
+                                     ledger_path=os.path.join(data_dir, "ledger.json")
+                                     if data_dir else None)
+        node_class = AsyncNode if use_asyncio else Node
+        self.node = node_class(host=host, port=port, blockchain=self.blockchain)
         
         # Đặt callback cập nhật UI
         self.node.set_update_callback(self.update_ui)
@@ -204,6 +235,9 @@ class TuCoinGUI:
         self.copy_address_button = ttk.Button(wallet_actions_frame, text="Sao chép địa chỉ", command=self.copy_address_to_clipboard)
         self.copy_address_button.grid(row=0, column=2, padx=5)
         
+        self.sweep_legacy_button = ttk.Button(wallet_actions_frame, text="Chuyển số dư địa chỉ cũ", command=self.sweep_legacy_balance)
+        self.sweep_legacy_button.grid(row=0, column=3, padx=5)
+        
         # Danh sách ví đã lưu
         saved_wallets_frame = ttk.LabelFrame(main_frame, text="Ví đã lưu", padding=10)
         saved_wallets_frame.pack(fill=tk.BOTH, expand=True, pady=5)
@@ -234,7 +268,7 @@ class TuCoinGUI:
         mining_info_frame.pack(fill=tk.X, pady=5)
         
         ttk.Label(mining_info_frame, text="Độ khó hiện tại:").grid(row=0, column=0, sticky=tk.W, pady=2)
-        self.mining_difficulty_label = ttk.Label(mining_info_frame, text=f"{self.blockchain.difficulty} (số 0 đầu tiên)")
+        self.mining_difficulty_label = ttk.Label(mining_info_frame, text=f"{self.blockchain.current_difficulty:.2f} (số 0 đầu tiên)")
         self.mining_difficulty_label.grid(row=0, column=1, sticky=tk.W, pady=2)
         
         ttk.Label(mining_info_frame, text="Phần thưởng:").grid(row=1, column=0, sticky=tk.W, pady=2)
@@ -250,7 +284,10 @@ class TuCoinGUI:
         mining_actions_frame.pack(fill=tk.X, pady=10)
         
         self.start_mining_button = ttk.Button(mining_actions_frame, text="Đào khối mới", command=self.mine_block)
-        self.start_mining_button.pack()
+        self.start_mining_button.pack(side=tk.LEFT, expand=True, anchor=tk.E, padx=5)
+        
+        self.stop_mining_button = ttk.Button(mining_actions_frame, text="Dừng đào", command=self.stop_mining, state="disabled")
+        self.stop_mining_button.pack(side=tk.LEFT, expand=True, anchor=tk.W, padx=5)
         
         # Lịch sử đào
         mining_history_frame = ttk.LabelFrame(main_frame, text="Lịch sử đào", padding=10)
@@ -383,7 +420,7 @@ class TuCoinGUI:
         self.blockchain_blocks_label.grid(row=0, column=1, sticky=tk.W, pady=2)
         
         ttk.Label(blockchain_info_frame, text="Độ khó:").grid(row=1, column=0, sticky=tk.W, pady=2)
-        self.blockchain_difficulty_label = ttk.Label(blockchain_info_frame, text=f"{self.blockchain.difficulty} (số 0 đầu tiên)")
+        self.blockchain_difficulty_label = ttk.Label(blockchain_info_frame, text=f"{self.blockchain.current_difficulty:.2f} (số 0 đầu tiên)")
         self.blockchain_difficulty_label.grid(row=1, column=1, sticky=tk.W, pady=2)
         
         # Danh sách các khối
@@ -501,6 +538,29 @@ class TuCoinGUI:
             self.root.clipboard_append(wallet.address)
             messagebox.showinfo("Thành công", "Đã sao chép địa chỉ ví vào clipboard")
 
+    def sweep_legacy_balance(self):
+        """Chuyển số dư ở địa chỉ cũ của ví sang địa chỉ mới."""
+        wallet = self.wallet_manager.get_current_wallet()
+        if not wallet or not wallet.legacy_address:
+            messagebox.showinfo("Thông báo", "Ví hiện tại không có địa chỉ cũ")
+            return
+        
+        # Địa chỉ cũ không tạo từ khóa công khai nên giao dịch không thể ký
+        if self.blockchain.require_signatures:
+            messagebox.showerror("Lỗi", "Node bắt buộc chữ ký: không thể chuyển số dư từ địa chỉ cũ")
+            return
+        
+        balance = self.blockchain.get_balance(wallet.legacy_address)
+        if balance <= 0:
+            messagebox.showinfo("Thông báo", "Địa chỉ cũ không có số dư")
+            return
+        
+        if self.node.add_transaction(wallet.legacy_address, wallet.address, balance):
+            messagebox.showinfo("Thành công", f"Đã chuyển {balance} TuCoin sang {wallet.address}")
+            self.update_ui()
+        else:
+            messagebox.showerror("Lỗi", "Không thể gửi giao dịch")
+    
     def connect_to_peer(self):
         """Kết nối đến một node khác."""
         host = self.peer_host_entry.get()
@@ -542,6 +602,8 @@ class TuCoinGUI:
         # Vô hiệu hóa nút đào
         self.start_mining_button["state"] = "disabled"
         self.mine_button["state"] = "disabled"
+        self.stop_mining_button["state"] = "normal"
+        self.mining_stopped_by_user = False
         
         def mining_thread():
             # Đào khối mới
@@ -550,16 +612,25 @@ class TuCoinGUI:
             # Kích hoạt lại nút đào
             self.start_mining_button["state"] = "normal"
             self.mine_button["state"] = "normal"
+            self.stop_mining_button["state"] = "disabled"
             
             if new_block:
                 messagebox.showinfo("Thành công", f"Đã đào được khối mới #{new_block.index}")
                 self.update_ui()
+            elif self.mining_stopped_by_user:
+                messagebox.showinfo("Thông báo", "Đã dừng đào")
             else:
                 messagebox.showerror("Lỗi", "Không thể đào khối mới")
         
         # Chạy đào trong thread riêng
         threading.Thread(target=mining_thread, daemon=True).start()
 
+    def stop_mining(self):
+        """Dừng việc đào đang chạy."""
+        self.mining_stopped_by_user = True
+        self.stop_mining_button["state"] = "disabled"
+        self.node.stop_mining()
+
     def show_send_dialog(self):
         """Hiển thị hộp thoại gửi TuCoin."""
         wallet = self.wallet_manager.get_current_wallet()
@@ -583,7 +654,8 @@ class TuCoinGUI:
 
     def send_transaction(self):
         """Gửi giao dịch mới."""
-        if not self.wallet:
+        wallet = self.wallet_manager.get_current_wallet()
+        if not wallet:
             messagebox.showerror("Lỗi", "Vui lòng tạo hoặc tải ví trước")
             return
         
@@ -596,13 +668,13 @@ class TuCoinGUI:
                 raise ValueError("Số lượng phải lớn hơn 0")
             
             # Kiểm tra số dư
-            balance = self.blockchain.get_balance(self.wallet.address)
+            balance = self.blockchain.get_balance(wallet.address)
             if amount > balance:
                 messagebox.showerror("Lỗi", f"Số dư không đủ (hiện có {balance} TuCoin)")
                 return
             
-            # Tạo và gửi giao dịch
-            success = self.node.add_transaction(self.wallet.address, receiver, amount)
+            # Tạo, ký và gửi giao dịch
+            success = self.node.add_transaction(wallet.address, receiver, amount, wallet.private_key)
             
             if success:
                 # Xóa form
@@ -671,15 +743,34 @@ class TuCoinGUI:
             self.wallet_balance_label["text"] = f"{balance} TuCoin"
             self.transaction_from_label["text"] = address
             self.mining_address_label["text"] = address
+            
+            # Cập nhật lịch sử đào từ chỉ mục lịch sử (chỉ trang mới nhất)
+            self.mining_history_tree.delete(*self.mining_history_tree.get_children())
+            for entry in self.blockchain.get_history(address, 0, 50):
+                transaction = entry["transaction"]
+                if transaction["sender"] != "0":
+                    continue
+                self.mining_history_tree.insert("", tk.END, values=(
+                    entry["block_index"],
+                    entry["block_timestamp"],
+                    # Giao dịch phần thưởng đứng cuối khối: vị trí + 1 là số giao dịch
+                    entry["position"] + 1,
+                    f"{transaction['amount']} TuCoin"
+                ))
         
         # Cập nhật thông tin blockchain
         chain_length = len(self.blockchain.chain)
-        pending_count = len(self.blockchain.pending_transactions)
+        pending_count = len(self.blockchain.mempool)
         
         self.overview_blocks_label["text"] = str(chain_length)
         self.overview_pending_label["text"] = str(pending_count)
         self.blockchain_blocks_label["text"] = str(chain_length)
         
+        # Độ khó thay đổi theo thời gian đào của các khối gần đây
+        difficulty_text = f"{self.blockchain.current_difficulty:.2f} (số 0 đầu tiên)"
+        self.mining_difficulty_label["text"] = difficulty_text
+        self.blockchain_difficulty_label["text"] = difficulty_text
+        
         # Cập nhật thông tin mạng
         peers_count = len(self.node.peers)
         self.overview_peers_label["text"] = str(peers_count)
@@ -718,7 +809,11 @@ class TuCoinGUI:
     def on_close(self):
         """Xử lý khi đóng ứng dụng."""
         self.running = False
+        self.node.stop_mining()
         self.node.stop()
+        self.blockchain.close()
+        if self.block_store:
+            self.block_store.close()
         self.root.destroy()
 
 def main():
@@ -726,6 +821,25 @@ def main():
     parser = argparse.ArgumentParser(description="TuCoin GUI")
     parser.add_argument("--host", default=None, help="Địa chỉ IP của node (mặc định: tự động)")
     parser.add_argument("--port", type=int, default=5000, help="Cổng lắng nghe")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Số tiến trình đào (mặc định: tất cả lõi CPU)")
+    parser.add_argument("--validation-workers", type=int, default=2, metavar="N",
+                        help="Số tiến trình kiểm tra chuỗi và chữ ký (mặc định: 2)")
+    parser.add_argument("--compact", action="store_true",
+                        help="Lưu blockchain ở dạng gọn để giảm bộ nhớ")
+    parser.add_argument("--data-dir", default=None,
+                        help="Thư mục lưu blockchain (mặc định: chaindata/<cổng>)")
+    parser.add_argument("--memory", action="store_true",
+                        help="Không lưu blockchain ra đĩa")
+    parser.add_argument("--require-signatures", action="store_true",
+                        help="Chỉ chấp nhận giao dịch có chữ ký hợp lệ")
+    parser.add_argument("--prune", type=int, default=None, metavar="N",
+                        help="Chỉ giữ giao dịch của N khối gần nhất (mặc định: giữ toàn bộ)")
+    parser.add_argument("--asyncio", action="store_true",
+                        help="Dùng một event loop asyncio cho mọi kết nối (nhiều peer)")
+    parser.add_argument("--migrate-wallets", action="store_true",
+                        help="Lưu ví đặt tên theo địa chỉ cũ sang tên theo địa chỉ mới "
+                             "(file cũ được giữ lại dạng .json.bak)")
     
     args = parser.parse_args()
     
@@ -733,12 +847,22 @@ def main():
     host = args.host if args.host else get_local_ip()
     port = args.port
     
+    # Mỗi node lưu blockchain trong thư mục riêng theo cổng
+    data_dir = None
+    if not args.memory:
+        data_dir = args.data_dir if args.data_dir else os.path.join("chaindata", str(port))
+    
     print("="*50)
     print(f"Node address: {host}:{port}")
     print("Sử dụng địa chỉ này để kết nối từ máy khác")
     print("="*50)
     
-    app = TuCoinGUI(host=host, port=port)
+    app = TuCoinGUI(host=host, port=port, mining_workers=args.workers,
+                    compact=args.compact, data_dir=data_dir,
+                    require_signatures=args.require_signatures,
+                    prune_depth=args.prune, use_asyncio=args.asyncio,
+                    migrate_wallets=args.migrate_wallets,
+                    validation_workers=args.validation_workers)
     app.root.mainloop()
 
 if __name__ == "__main__":
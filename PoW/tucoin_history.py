@@ -0,0 +1,149 @@
+import base64
+import sys
+import threading
+from array import array
+from typing import Dict, List, Tuple
+
+
+class AddressHistory:
+    """
+    Chỉ mục lịch sử giao dịch theo địa chỉ.
+
+    Mỗi địa chỉ ứng với danh sách các cặp (độ cao khối, vị trí giao dịch
+    trong khối) có liên quan đến địa chỉ đó, theo thứ tự tăng dần. Chỉ mục
+    được cập nhật khi nối khối và hoàn tác khi khối bị xóa khỏi cuối chuỗi;
+    các mục của khối đã bị cắt tỉa được xóa khỏi đầu danh sách.
+    """
+
+    def __init__(self):
+        # Địa chỉ -> các cặp (độ cao, vị trí) lưu xen kẽ trong một mảng số
+        self._entries: Dict[str, array] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _addresses(transaction: Dict) -> Tuple[str, ...]:
+        """Các địa chỉ liên quan đến một giao dịch (không lặp lại)."""
+        sender = transaction["sender"]
+        receiver = transaction["receiver"]
+        return (sender,) if sender == receiver else (sender, receiver)
+
+    def add_block(self, block) -> None:
+        """
+        Thêm các giao dịch của một khối vừa được nối vào cuối chuỗi.
+
+        Args:
+            block: Khối vừa được nối
+        """
+        height = block.index
+        with self._lock:
+            for position, transaction in enumerate(block.transactions):
+                for address in self._addresses(transaction):
+                    entries = self._entries.get(address)
+                    if entries is None:
+                        entries = self._entries[address] = array('Q')
+                    entries.append(height)
+                    entries.append(position)
+
+    def remove_block(self, block) -> None:
+        """
+        Xóa các giao dịch của khối cuối chuỗi (khi khối bị loại bỏ).
+
+        Args:
+            block: Khối bị xóa (phải là khối cao nhất còn trong chỉ mục)
+        """
+        height = block.index
+        with self._lock:
+            for transaction in block.transactions:
+                for address in self._addresses(transaction):
+                    entries = self._entries.get(address)
+                    if entries is None:
+                        continue
+                    while entries and entries[-2] >= height:
+                        del entries[-2:]
+                    if not entries:
+                        del self._entries[address]
+
+    def prune(self, height: int) -> None:
+        """
+        Xóa các mục thuộc những khối có độ cao nhỏ hơn `height`
+        (khi giao dịch của các khối đó bị cắt tỉa).
+
+        Args:
+            height: Độ cao khối đầu tiên còn giữ giao dịch
+        """
+        with self._lock:
+            for address in list(self._entries):
+                entries = self._entries[address]
+                count = 0
+                while count < len(entries) and entries[count] < height:
+                    count += 2
+                if count == len(entries):
+                    del self._entries[address]
+                elif count:
+                    del entries[:count]
+
+    def clear(self) -> None:
+        """Xóa toàn bộ chỉ mục."""
+        with self._lock:
+            self._entries.clear()
+
+    def to_dict(self) -> Dict[str, str]:
+        """
+        Chuyển đổi chỉ mục thành dictionary để lưu (mảng của mỗi địa chỉ
+        được mã hóa base64, little-endian).
+        """
+        with self._lock:
+            result = {}
+            for address, entries in self._entries.items():
+                if sys.byteorder == "big":
+                    entries = array('Q', entries)
+                    entries.byteswap()
+                result[address] = base64.b64encode(entries.tobytes()).decode()
+            return result
+
+    @classmethod
+    def from_dict(cls, history_dict: Dict[str, str]) -> 'AddressHistory':
+        """Tạo chỉ mục từ kết quả của `to_dict()`."""
+        history = cls()
+        for address, encoded in history_dict.items():
+            entries = array('Q', base64.b64decode(encoded))
+            if sys.byteorder == "big":
+                entries.byteswap()
+            history._entries[address] = entries
+        return history
+
+    def count(self, address: str) -> int:
+        """Số giao dịch liên quan đến một địa chỉ."""
+        entries = self._entries.get(address)
+        return len(entries) // 2 if entries is not None else 0
+
+    def get(self, address: str, offset: int = 0, limit: int = 50,
+            newest_first: bool = True) -> List[Tuple[int, int]]:
+        """
+        Lấy một trang lịch sử của địa chỉ.
+
+        Chi phí chỉ phụ thuộc kích thước trang, không phụ thuộc độ dài chuỗi.
+
+        Args:
+            address: Địa chỉ cần tra cứu
+            offset: Số mục bỏ qua
+            limit: Số mục tối đa trả về
+            newest_first: Trả về giao dịch mới nhất trước
+
+        Returns:
+            Danh sách các cặp (độ cao khối, vị trí giao dịch)
+        """
+        with self._lock:
+            entries = self._entries.get(address)
+            if entries is None or offset < 0 or limit <= 0:
+                return []
+
+            total = len(entries) // 2
+            if newest_first:
+                stop = total - offset
+                start = max(stop - limit, 0)
+                indices = range(stop - 1, start - 1, -1)
+            else:
+                indices = range(offset, min(offset + limit, total))
+
+            return [(entries[2 * index], entries[2 * index + 1]) for index in indices]
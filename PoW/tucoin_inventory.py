@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+# Loại mục trong thông điệp INV / GETDATA
+INV_TRANSACTION = "tx"
+INV_BLOCK = "block"
+INV_TYPES = (INV_TRANSACTION, INV_BLOCK)
+
+
+class SeenCache:
+    """
+    Tập các mục (loại, hash) đã thấy gần đây.
+
+    Dùng để không tải lại hoặc phát lại một giao dịch hay khối đã nhận từ
+    peer khác. Tập có giới hạn số lượng (mục cũ nhất bị bỏ khi đầy) và mỗi
+    mục chỉ được giữ trong `ttl` giây, nên bộ nhớ không tăng theo thời gian
+    chạy của node.
+    """
+
+    def __init__(self, capacity: int = 50000, ttl: float = 600.0):
+        """
+        Args:
+            capacity: Số mục tối đa
+            ttl: Thời gian giữ một mục (giây)
+        """
+        self.capacity = capacity
+        self.ttl = ttl
+
+        # Mục -> thời điểm hết hạn, theo thứ tự thêm vào (cũng là thứ tự hết hạn)
+        self._expiry: 'OrderedDict[Hashable, float]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        expiry = self._expiry
+        while expiry and next(iter(expiry.values())) <= now:
+            expiry.popitem(last=False)
+
+    def add(self, key: Hashable) -> bool:
+        """
+        Đánh dấu một mục là đã thấy.
+
+        Args:
+            key: Mục cần đánh dấu
+
+        Returns:
+            True nếu mục chưa được thấy (và vừa được thêm)
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if key in self._expiry:
+                return False
+
+            self._expiry[key] = now + self.ttl
+            if len(self._expiry) > self.capacity:
+                self._expiry.popitem(last=False)
+            return True
+
+    def discard(self, key: Hashable) -> None:
+        """Bỏ đánh dấu một mục (ví dụ khi tải mục đó thất bại)."""
+        with self._lock:
+            self._expiry.pop(key, None)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            self._expire(time.monotonic())
+            return key in self._expiry
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._expiry)
@@ -0,0 +1,168 @@
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Set
+
+from tucoin_transaction import (REWARD_SENDER, is_well_formed, is_well_formed_block, transaction_id,
+                                without_reward)
+
+
+class LedgerOverlay:
+    """
+    Lớp trạng thái tạm trên sổ cái số dư, dùng chung để kiểm tra giao dịch.
+
+    Mọi nơi đưa giao dịch vào khối (chọn giao dịch khi đào, nhận khối từ
+    peer, đổi nhánh, kiểm tra chuỗi) đều dùng lớp này nên cùng áp dụng một
+    bộ quy tắc: giao dịch đúng cấu trúc, số tiền dương, người nhận khác
+    người gửi, người gửi không phải hệ thống, chưa từng được xác nhận (kể
+    cả trong các giao dịch đã áp dụng) và người gửi đủ số dư sau các giao
+    dịch đã áp dụng trước đó. Sổ cái gốc không bị thay đổi.
+    """
+
+    def __init__(self, get_balance: Callable[[str], float], height: int = 0,
+                 is_confirmed: Optional[Callable[[str], bool]] = None):
+        """
+        Khởi tạo lớp trạng thái tạm.
+
+        Args:
+            get_balance: Hàm lấy số dư gốc của một địa chỉ
+            height: Độ cao mà số dư gốc tương ứng (số khối đã được tính)
+            is_confirmed: Hàm cho biết một id giao dịch đã được xác nhận
+                trong các khối trước `height` hay chưa (None = chưa có)
+        """
+        self._get_balance = get_balance
+        self.height = height
+        self._is_confirmed = is_confirmed
+
+        # Số dư của các địa chỉ đã bị thay đổi bởi giao dịch đã áp dụng
+        self._balances: Dict[str, float] = {}
+
+        # Id của các giao dịch đã áp dụng, để một giao dịch không được dùng lại
+        self._txids: Set[str] = set()
+
+    @classmethod
+    def from_balances(cls, balances: Dict[str, float], height: int = 0,
+                      txids: Iterable[str] = ()) -> 'LedgerOverlay':
+        """
+        Tạo lớp trạng thái tạm trên một bảng số dư cố định.
+
+        Args:
+            balances: Số dư gốc (không bị thay đổi)
+            height: Độ cao mà bảng số dư tương ứng
+            txids: Id của các giao dịch đã xác nhận tại độ cao đó
+
+        Returns:
+            Lớp trạng thái tạm mới
+        """
+        confirmed = set(txids)
+        return cls(lambda address: balances.get(address, 0.0), height, confirmed.__contains__)
+
+    def balance(self, address: str) -> float:
+        """Số dư của một địa chỉ sau các giao dịch đã áp dụng."""
+        balances = self._balances
+        if address not in balances:
+            balances[address] = self._get_balance(address)
+        return balances[address]
+
+    def check(self, transaction: Any) -> bool:
+        """
+        Kiểm tra một giao dịch (không phải phần thưởng) mà không áp dụng nó.
+
+        Args:
+            transaction: Giao dịch cần kiểm tra (có thể nhận từ bên ngoài)
+
+        Returns:
+            True nếu giao dịch hợp lệ trên trạng thái hiện tại
+        """
+        return self._valid_id(transaction) is not None
+
+    def add(self, transaction: Any) -> bool:
+        """
+        Kiểm tra rồi áp dụng một giao dịch.
+
+        Args:
+            transaction: Giao dịch cần áp dụng
+
+        Returns:
+            True nếu giao dịch hợp lệ và đã được áp dụng
+        """
+        txid = self._valid_id(transaction)
+        if txid is None:
+            return False
+        self._txids.add(txid)
+        self._transfer(transaction)
+        return True
+
+    def apply_block(self, transactions: Any) -> bool:
+        """
+        Áp dụng các giao dịch của một khối, dừng ở giao dịch sai đầu tiên.
+
+        Args:
+            transactions: Các giao dịch của khối (giao dịch phần thưởng, nếu
+                có, ở cuối)
+
+        Returns:
+            True nếu mọi giao dịch đều hợp lệ; khi False, trạng thái tạm chỉ
+            còn dùng để loại bỏ
+        """
+        if not is_well_formed_block(transactions):
+            return False
+
+        body = without_reward(transactions)
+        if not all(self.add(transaction) for transaction in body):
+            return False
+
+        # Phần thưởng được cộng sau cùng nên không thể tiêu trong cùng khối
+        if len(body) < len(transactions):
+            self._transfer(transactions[-1])
+        return True
+
+    def find_invalid_block(self, chain: Sequence, start: int, stop: Optional[int] = None) -> Optional[int]:
+        """
+        Áp dụng tuần tự các khối trong [start, stop) của một chuỗi.
+
+        Các khối trước `height` đã được tính trong số dư gốc nên được bỏ qua.
+
+        Args:
+            chain: Danh sách khối (từ genesis)
+            start: Index khối đầu tiên cần kiểm tra
+            stop: Index sau khối cuối cùng cần kiểm tra (mặc định: hết chuỗi)
+
+        Returns:
+            Index của khối có giao dịch không hợp lệ đầu tiên, hoặc None
+        """
+        if stop is None:
+            stop = len(chain)
+
+        for index in range(max(start, self.height), stop):
+            block = chain[index]
+            # Khối đã bị cắt tỉa không còn giao dịch để tính số dư
+            if block.is_pruned or not self.apply_block(block.transactions):
+                return index
+        return None
+
+    def _valid_id(self, transaction: Any) -> Optional[str]:
+        """Id của giao dịch nếu nó hợp lệ trên trạng thái hiện tại, ngược lại None."""
+        if not is_well_formed(transaction):
+            return None
+
+        amount = transaction["amount"]
+        sender = transaction["sender"]
+        if not amount > 0 or sender == transaction["receiver"] or sender == REWARD_SENDER:
+            return None
+        if self.balance(sender) < amount:
+            return None
+
+        # Giao dịch đã xác nhận không được dùng lại (chữ ký của nó vẫn hợp lệ)
+        txid = transaction_id(transaction)
+        if txid in self._txids or (self._is_confirmed is not None and self._is_confirmed(txid)):
+            return None
+        return txid
+
+    def _transfer(self, transaction: Dict[str, Any]) -> None:
+        """Chuyển số tiền của giao dịch từ người gửi sang người nhận."""
+        amount = transaction["amount"]
+        sender = transaction["sender"]
+        receiver = transaction["receiver"]
+
+        # Người gửi phần thưởng là hệ thống, không có số dư
+        if sender != REWARD_SENDER:
+            self._balances[sender] = self.balance(sender) - amount
+        self._balances[receiver] = self.balance(receiver) + amount
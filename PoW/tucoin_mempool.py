@@ -0,0 +1,211 @@
+import heapq
+import threading
+from collections import OrderedDict
+from time import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from tucoin_transaction import transaction_id
+
+
+def amount_priority(transaction: Dict[str, Any]) -> float:
+    """
+    Độ ưu tiên mặc định: giao dịch có số tiền lớn hơn được giữ lại trước.
+
+    Chỉ dùng được khi giao dịch được thêm cùng số dư của người gửi: tổng
+    số tiền chờ của một người gửi không vượt quá số dư đã xác nhận, nên
+    muốn có độ ưu tiên cao phải thực sự giữ số tiền đó.
+    """
+    return transaction["amount"]
+
+
+class Mempool:
+    """
+    Danh sách giao dịch chờ, đánh chỉ mục theo id giao dịch.
+
+    Thêm, tra cứu và xóa đều O(1); nhận lại một giao dịch đã có không tạo
+    bản sao. Khi đầy, giao dịch có độ ưu tiên thấp nhất (cũ nhất nếu bằng
+    nhau) bị loại; giao dịch quá `max_age` giây bị loại khi có giao dịch mới.
+    Tổng số tiền chờ của mỗi người gửi được theo dõi để từ chối giao dịch
+    vượt quá số dư.
+    """
+
+    def __init__(self, max_size: int = 10000, max_age: Optional[float] = 3600,
+                 priority: Callable[[Dict[str, Any]], float] = amount_priority):
+        """
+        Khởi tạo mempool.
+
+        Args:
+            max_size: Số giao dịch tối đa
+            max_age: Thời gian tối đa (giây) một giao dịch được giữ, None = không giới hạn
+            priority: Hàm tính độ ưu tiên của giao dịch
+        """
+        self.max_size = max_size
+        self.max_age = max_age
+        self.priority = priority
+
+        # id -> (giao dịch, thời điểm thêm), theo thứ tự thêm vào (cũ nhất trước)
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+        # Heap (độ ưu tiên, thời điểm thêm, id) để tìm giao dịch cần loại;
+        # phần tử của giao dịch đã bị xóa được bỏ qua khi lấy ra
+        self._heap: List[Tuple[float, float, str]] = []
+
+        # Người gửi -> [tổng số tiền, số giao dịch] của các giao dịch đang chờ
+        self._spending: Dict[str, List[float]] = {}
+
+        self._lock = threading.RLock()
+
+    def add(self, transaction: Dict[str, Any], txid: Optional[str] = None,
+            balance: Optional[float] = None) -> Optional[str]:
+        """
+        Thêm một giao dịch vào mempool.
+
+        Args:
+            transaction: Giao dịch cần thêm
+            txid: Id của giao dịch (tính tự động nếu không có)
+            balance: Số dư đã xác nhận của người gửi; nếu có, giao dịch bị
+                từ chối khi số tiền cộng các giao dịch chờ của người gửi
+                vượt quá số dư (None = không kiểm tra)
+
+        Returns:
+            Id của giao dịch nếu được thêm mới, None nếu đã có hoặc bị từ chối
+        """
+        if txid is None:
+            txid = transaction_id(transaction)
+        priority = self.priority(transaction)
+
+        with self._lock:
+            if txid in self._entries:
+                return None
+
+            now = time()
+            self._expire(now)
+
+            if balance is not None and self.pending_spend(transaction["sender"]) + transaction["amount"] > balance:
+                return None
+
+            if len(self._entries) >= self.max_size:
+                lowest = self._peek_lowest()
+                # Mempool đầy các giao dịch ưu tiên cao hơn: từ chối giao dịch mới
+                if lowest is None or priority <= lowest[0]:
+                    return None
+                self.remove(lowest[2])
+
+            self._entries[txid] = (transaction, now)
+            heapq.heappush(self._heap, (priority, now, txid))
+
+            spending = self._spending.setdefault(transaction["sender"], [0.0, 0])
+            spending[0] += transaction["amount"]
+            spending[1] += 1
+            return txid
+
+    def _release(self, transaction: Dict[str, Any]) -> None:
+        """Bỏ số tiền của một giao dịch vừa bị xóa khỏi tổng chờ của người gửi."""
+        sender = transaction["sender"]
+        spending = self._spending[sender]
+        spending[1] -= 1
+        if spending[1] == 0:
+            del self._spending[sender]
+        else:
+            spending[0] -= transaction["amount"]
+
+    def pending_spend(self, sender: str) -> float:
+        """Tổng số tiền của các giao dịch đang chờ của một người gửi."""
+        spending = self._spending.get(sender)
+        return spending[0] if spending is not None else 0.0
+
+    def _peek_lowest(self) -> Optional[Tuple[float, float, str]]:
+        """Phần tử heap của giao dịch có độ ưu tiên thấp nhất còn trong mempool."""
+        heap = self._heap
+        while heap and not self._is_live(heap[0]):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _is_live(self, item: Tuple[float, float, str]) -> bool:
+        """True nếu phần tử heap ứng với một giao dịch còn trong mempool."""
+        entry = self._entries.get(item[2])
+        return entry is not None and entry[1] == item[1]
+
+    def _expire(self, now: float) -> None:
+        """Loại các giao dịch đã quá thời gian tối đa."""
+        if self.max_age is None:
+            return
+
+        deadline = now - self.max_age
+        while self._entries:
+            txid, (transaction, added_at) = next(iter(self._entries.items()))
+            if added_at >= deadline:
+                break
+            del self._entries[txid]
+            self._release(transaction)
+
+        self._compact_heap()
+
+    def _compact_heap(self) -> None:
+        """Dựng lại heap khi có quá nhiều phần tử đã bị xóa."""
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [item for item in self._heap if self._is_live(item)]
+            heapq.heapify(self._heap)
+
+    def remove(self, txid: str) -> Optional[Dict[str, Any]]:
+        """
+        Xóa một giao dịch theo id.
+
+        Returns:
+            Giao dịch đã xóa hoặc None nếu không có
+        """
+        with self._lock:
+            entry = self._entries.pop(txid, None)
+            if entry is None:
+                return None
+
+            self._release(entry[0])
+            self._compact_heap()
+            return entry[0]
+
+    def remove_transactions(self, transactions: Iterable[Dict[str, Any]]) -> int:
+        """
+        Xóa các giao dịch (ví dụ đã được đưa vào khối).
+
+        Args:
+            transactions: Các giao dịch cần xóa
+
+        Returns:
+            Số giao dịch đã xóa
+        """
+        removed = 0
+        with self._lock:
+            for transaction in transactions:
+                if self.remove(transaction_id(transaction)) is not None:
+                    removed += 1
+        return removed
+
+    def get(self, txid: str) -> Optional[Dict[str, Any]]:
+        """Lấy giao dịch theo id."""
+        entry = self._entries.get(txid)
+        return entry[0] if entry else None
+
+    def transactions(self) -> List[Dict[str, Any]]:
+        """Danh sách giao dịch theo thứ tự thêm vào."""
+        with self._lock:
+            return [transaction for transaction, _ in self._entries.values()]
+
+    def by_priority(self) -> List[Dict[str, Any]]:
+        """Danh sách giao dịch theo độ ưu tiên giảm dần (cũ hơn trước nếu bằng nhau)."""
+        with self._lock:
+            entries = sorted(self._entries.values(),
+                             key=lambda entry: (-self.priority(entry[0]), entry[1]))
+        return [transaction for transaction, _ in entries]
+
+    def clear(self) -> None:
+        """Xóa toàn bộ mempool."""
+        with self._lock:
+            self._entries.clear()
+            self._heap.clear()
+            self._spending.clear()
+
+    def __contains__(self, txid: str) -> bool:
+        return txid in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
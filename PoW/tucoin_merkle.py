@@ -0,0 +1,119 @@
+import hashlib
+from typing import List, Sequence, Tuple
+
+# Gốc Merkle của khối không có giao dịch
+EMPTY_ROOT = "0" * 64
+
+# Một bước trong bằng chứng: (hash của nút anh em, vị trí "left" hoặc "right")
+ProofStep = Tuple[str, str]
+
+# Tiền tố phân biệt hash của lá và hash của nút trong: một nút trong không
+# thể được trình bày như một lá (danh sách [H(a‖b), c] không cho cùng gốc
+# với [a, b, c]) và ngược lại
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+
+def _hash_leaf(txid: bytes) -> bytes:
+    """Hash của lá từ id giao dịch."""
+    return hashlib.sha256(_LEAF_PREFIX + txid).digest()
+
+
+def _hash_pair(left: bytes, right: bytes) -> bytes:
+    """Hash của nút cha từ hai nút con."""
+    return hashlib.sha256(_NODE_PREFIX + left + right).digest()
+
+
+def _leaves(txids: Sequence[str]) -> List[bytes]:
+    """Tầng lá của cây."""
+    return [_hash_leaf(bytes.fromhex(txid)) for txid in txids]
+
+
+def _next_level(level: List[bytes]) -> List[bytes]:
+    """
+    Tính tầng tiếp theo của cây.
+
+    Nút lẻ cuối cùng được đưa thẳng lên tầng trên thay vì được nhân đôi, nên
+    [a, b, c] và [a, b, c, c] không cho cùng một gốc.
+    """
+    parents = [_hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        parents.append(level[-1])
+    return parents
+
+
+def merkle_root(txids: Sequence[str]) -> str:
+    """
+    Tính gốc Merkle của một danh sách id giao dịch.
+
+    Args:
+        txids: Id giao dịch (chuỗi hex) theo thứ tự trong khối
+
+    Returns:
+        Gốc Merkle (chuỗi hex)
+    """
+    if not txids:
+        return EMPTY_ROOT
+
+    level = _leaves(txids)
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0].hex()
+
+
+def merkle_proof(txids: Sequence[str], position: int) -> List[ProofStep]:
+    """
+    Tạo bằng chứng rằng giao dịch ở vị trí `position` thuộc cây Merkle.
+
+    Args:
+        txids: Id giao dịch theo thứ tự trong khối
+        position: Vị trí của giao dịch cần chứng minh
+
+    Returns:
+        Danh sách các bước từ lá lên gốc
+
+    Raises:
+        IndexError: Nếu vị trí không hợp lệ
+    """
+    if not 0 <= position < len(txids):
+        raise IndexError("transaction position out of range")
+
+    proof: List[ProofStep] = []
+    level = _leaves(txids)
+
+    while len(level) > 1:
+        sibling = position ^ 1
+        # Nút lẻ cuối cùng không có anh em ở tầng này
+        if sibling < len(level):
+            proof.append((level[sibling].hex(), "left" if sibling < position else "right"))
+        level = _next_level(level)
+        position //= 2
+
+    return proof
+
+
+def verify_merkle_proof(txid: str, proof: Sequence[ProofStep], root: str) -> bool:
+    """
+    Kiểm tra bằng chứng Merkle của một giao dịch.
+
+    Args:
+        txid: Id của giao dịch
+        proof: Bằng chứng tạo bởi `merkle_proof`
+        root: Gốc Merkle trong header của khối
+
+    Returns:
+        True nếu giao dịch thuộc cây có gốc `root`
+    """
+    try:
+        node = _hash_leaf(bytes.fromhex(txid))
+        for sibling, side in proof:
+            if side == "left":
+                node = _hash_pair(bytes.fromhex(sibling), node)
+            elif side == "right":
+                node = _hash_pair(node, bytes.fromhex(sibling))
+            else:
+                return False
+    except (TypeError, ValueError):
+        return False
+
+    return node.hex() == root
@@ -0,0 +1,221 @@
+import hashlib
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Optional
+
+# Giá trị hash lớn nhất có thể (256 bit) cộng một
+HASH_SPACE = 1 << 256
+
+
+def difficulty_to_target(difficulty: int) -> int:
+    """
+    Đổi độ khó (số lượng số 0 hex đầu tiên) thành ngưỡng số học.
+
+    Hash có ít nhất `difficulty` số 0 hex đầu tiên khi và chỉ khi
+    giá trị số của nó nhỏ hơn 16^(64 - difficulty).
+
+    Args:
+        difficulty: Số lượng số 0 đầu tiên yêu cầu
+
+    Returns:
+        Ngưỡng (target) mà hash phải nhỏ hơn
+    """
+    return 1 << (4 * (64 - max(difficulty, 0)))
+
+
+class ProofChecker:
+    """
+    Kiểm tra proof cho một `last_proof` cố định.
+
+    Tiền tố `last_proof` chỉ được hash một lần; mỗi nonce dùng một bản sao
+    của trạng thái hasher đó và so sánh digest thô với target đã tính sẵn.
+    """
+
+    __slots__ = ("_prefix_state", "_target_bytes")
+
+    def __init__(self, last_proof: int, target: int):
+        """
+        Args:
+            last_proof: Proof của khối trước đó
+            target: Ngưỡng mà hash phải nhỏ hơn
+        """
+        self._prefix_state = hashlib.sha256(str(last_proof).encode())
+        # None nghĩa là mọi hash đều hợp lệ (target phủ toàn bộ không gian)
+        self._target_bytes = target.to_bytes(32, "big") if target < HASH_SPACE else None
+
+    def check(self, proof: int) -> bool:
+        """Kiểm tra một nonce, cho kết quả giống `Blockchain.valid_proof`."""
+        if self._target_bytes is None:
+            return True
+
+        hasher = self._prefix_state.copy()
+        hasher.update(str(proof).encode())
+        return hasher.digest() < self._target_bytes
+
+    def search(self, start: int, stop: int) -> Optional[int]:
+        """
+        Kiểm tra một lô nonce trong khoảng [start, stop).
+
+        Returns:
+            Nonce hợp lệ nhỏ nhất trong khoảng hoặc None
+        """
+        if self._target_bytes is None:
+            return start if start < stop else None
+
+        copy_state = self._prefix_state.copy
+        target = self._target_bytes
+
+        for offset, encoded in enumerate(map(b"%d".__mod__, range(start, stop))):
+            hasher = copy_state()
+            hasher.update(encoded)
+            if hasher.digest() < target:
+                return start + offset
+
+        return None
+
+
+class MinerError(RuntimeError):
+    """Tất cả tiến trình đào đã dừng mà không tìm được proof."""
+
+
+class CancelToken:
+    """
+    Cờ hủy cho một lượt đào.
+
+    Token con bị coi là đã hủy khi chính nó hoặc token cha bị hủy, nhờ đó
+    người dùng có thể dừng hẳn việc đào (token cha) trong khi mạng chỉ hủy
+    lượt đào hiện tại (token con).
+    """
+
+    def __init__(self, parent: Optional['CancelToken'] = None):
+        """
+        Args:
+            parent: Token cha (nếu có)
+        """
+        self._event = threading.Event()
+        self.parent = parent
+
+    def cancel(self) -> None:
+        """Yêu cầu hủy công việc đang dùng token này."""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True nếu token hoặc một token cha đã bị hủy."""
+        return self._event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+
+def search_proof(last_proof: int, target: int, start: int, stop: int) -> Optional[int]:
+    """
+    Tìm proof hợp lệ đầu tiên trong khoảng [start, stop).
+
+    Args:
+        last_proof: Proof của khối trước đó
+        target: Ngưỡng mà hash phải nhỏ hơn
+        start: Nonce bắt đầu
+        stop: Nonce kết thúc (không bao gồm)
+
+    Returns:
+        Nonce hợp lệ hoặc None nếu không tìm thấy trong khoảng
+    """
+    return ProofChecker(last_proof, target).search(start, stop)
+
+
+def _mine_worker(last_proof: int, target: int, worker_id: int, workers: int,
+                 chunk_size: int, stop_event, results) -> None:
+    """
+    Tiến trình con: duyệt các đoạn nonce xen kẽ cho đến khi có kết quả.
+
+    Worker thứ i xử lý các đoạn [k * chunk_size, (k + 1) * chunk_size)
+    với k ≡ i (mod workers), nên các worker không bao giờ trùng nonce.
+    """
+    checker = ProofChecker(last_proof, target)
+    start = worker_id * chunk_size
+    stride = workers * chunk_size
+
+    while not stop_event.is_set():
+        proof = checker.search(start, start + chunk_size)
+        if proof is not None:
+            results.put(proof)
+            return
+        start += stride
+
+
+class ParallelMiner:
+    """Tìm proof of work song song trên nhiều tiến trình."""
+
+    # Khoảng thời gian (giây) giữa các lần kiểm tra token hủy
+    POLL_INTERVAL = 0.005
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 5000):
+        """
+        Khởi tạo bộ đào song song.
+
+        Args:
+            workers: Số tiến trình đào (mặc định: số lõi CPU)
+            chunk_size: Số nonce mỗi worker kiểm tra trước khi xem cờ dừng
+        """
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self._context = multiprocessing.get_context()
+
+    def search(self, last_proof: int, target: int,
+               cancel_token: Optional[CancelToken] = None) -> Optional[int]:
+        """
+        Tìm một proof hợp lệ, dừng tất cả worker khi có kết quả đầu tiên.
+
+        Args:
+            last_proof: Proof của khối trước đó
+            target: Ngưỡng mà hash phải nhỏ hơn
+            cancel_token: Token để hủy việc tìm kiếm (nếu có)
+
+        Returns:
+            Giá trị nonce thỏa mãn điều kiện hoặc None nếu bị hủy
+
+        Raises:
+            MinerError: Nếu mọi worker đã dừng (bị lỗi hoặc bị kết thúc)
+                mà không có kết quả
+        """
+        stop_event = self._context.Event()
+        results = self._context.Queue()
+
+        processes = [
+            self._context.Process(
+                target=_mine_worker,
+                args=(last_proof, target, worker_id, self.workers,
+                      self.chunk_size, stop_event, results),
+                daemon=True
+            )
+            for worker_id in range(self.workers)
+        ]
+
+        for process in processes:
+            process.start()
+
+        try:
+            while True:
+                try:
+                    return results.get(timeout=self.POLL_INTERVAL)
+                except queue.Empty:
+                    if cancel_token is not None and cancel_token.cancelled:
+                        return None
+                    if not any(process.is_alive() for process in processes):
+                        break
+
+            # Worker có thể đã gửi kết quả ngay trước khi thoát
+            try:
+                return results.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                exit_codes = [process.exitcode for process in processes]
+                raise MinerError(f"tất cả worker đào đã dừng (mã thoát: {exit_codes})") from None
+        finally:
+            # Báo cho tất cả worker dừng lại
+            stop_event.set()
+            for process in processes:
+                process.join(timeout=1)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            results.close()
@@ -2,20 +2,60 @@ import socket
 import threading
 import json
 import time
-from typing import List, Dict, Any, Set, Optional, Tuple
+from typing import List, Dict, Any, Set, Optional, Tuple, Union
 import logging
 
-from tucoin_blockchain import Blockchain, Block
+from tucoin_blockchain import Blockchain, Block, ChainView
+from tucoin_codec import (CODEC_BINARY, CODEC_JSON, SUPPORTED_CODECS, choose_codec,
+                          decode_payload, encode_binary, is_binary)
+from tucoin_connection import DELIVERED, QUARANTINED, Broadcaster, ConnectionPool, PeerConnection
+from tucoin_framing import FramingError, MessageReader, write_frame
+from tucoin_inventory import INV_BLOCK, INV_TRANSACTION, INV_TYPES, SeenCache
+from tucoin_miner import CancelToken
+from tucoin_transaction import is_well_formed, sign_transaction, transaction_id
 
 # Thiết lập logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('TuCoin-Node')
 
+# Các mảng khối trong thông điệp được giải mã thành khối ngay từng phần tử
+_BLOCK_HOOKS = {
+    "blocks": Block.from_dict,
+    "headers": Block.from_header
+}
+
 class Node:
     """Quản lý kết nối P2P và đồng bộ hóa blockchain giữa các node."""
     
+    # Số header tối đa trong một thông điệp HEADERS
+    MAX_HEADERS = 2000
+    
+    # Số khối tối đa trong một thông điệp BLOCKS
+    MAX_BLOCKS = 100
+    
+    # Số header tối đa được tải và giữ trong một lượt đồng bộ
+    MAX_SYNC_HEADERS = 10 * MAX_HEADERS
+    
+    # Thời gian chờ thông điệp tiếp theo trên một kết nối đến (giây)
+    CONNECTION_TIMEOUT = 60
+    
+    # Kích thước tối đa của một thông điệp (bytes)
+    MAX_MESSAGE_SIZE = 32 * 1024 * 1024
+    
+    # Tổng số bytes tối đa nhận từ một kết nối trong mỗi phút
+    MAX_PEER_BYTES = 256 * 1024 * 1024
+    
+    # Số mục tối đa trong một thông điệp INV hoặc GETDATA
+    MAX_INV_ITEMS = 1000
+    
+    # Các dịch vụ node hỗ trợ, gửi trong CONNECT / CONNECT_ACK ("inv": nhận
+    # thông báo INV và trả lời GETDATA)
+    SERVICES = ("inv",)
+    
     def __init__(self, host: str = '127.0.0.1', port: int = 5000, 
-                 blockchain: Optional[Blockchain] = None):
+                 blockchain: Optional[Blockchain] = None,
+                 connect_timeout: float = 3.0, send_timeout: float = 10.0,
+                 broadcast_workers: int = 8):
         """
         Khởi tạo một node mới.
         
@@ -23,15 +63,30 @@ class Node:
             host: Địa chỉ IP của node
             port: Cổng lắng nghe
             blockchain: Blockchain hiện có (nếu không có, tạo mới)
+            connect_timeout: Thời gian chờ kết nối đến peer (giây)
+            send_timeout: Thời gian chờ gửi (hoặc nhận phản hồi) một thông
+                điệp đến peer (giây)
+            broadcast_workers: Số thread gửi song song khi phát sóng
         """
         self.host = host
         self.port = port
         self.address = f"{host}:{port}"
         self.blockchain = blockchain if blockchain else Blockchain()
+        self.connect_timeout = connect_timeout
+        self.send_timeout = send_timeout
         
         # Danh sách các node đã biết trong mạng
         self.peers: Set[str] = set()
         
+        # Codec đã thỏa thuận với từng peer (mặc định JSON)
+        self._peer_codecs: Dict[str, str] = {}
+        
+        # Peer nhận thông báo INV; peer cũ vẫn được gửi nguyên giao dịch, khối
+        self._inv_peers: Set[str] = set()
+        
+        # Các giao dịch, khối đã thấy gần đây (không tải lại, không phát lại)
+        self._seen = SeenCache()
+        
         # Socket để lắng nghe kết nối
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -41,6 +96,34 @@ class Node:
         
         # Callback để cập nhật UI
         self.update_callback = None
+        
+        # Token để người dùng dừng việc đào
+        self._mining_stop_token: Optional[CancelToken] = None
+        
+        # Kết nối đến các peer
+        self._open_transport(broadcast_workers)
+    
+    def _open_transport(self, broadcast_workers: int) -> None:
+        """
+        Tạo các kết nối lâu dài đến peer và bộ phát sóng theo thread.
+        
+        Args:
+            broadcast_workers: Số thread gửi song song đến các peer
+        """
+        # Kết nối lâu dài đến các peer, dùng chung cho phát sóng và đồng bộ
+        self._pool = ConnectionPool(max_message_size=self.MAX_MESSAGE_SIZE,
+                                    max_peer_bytes=self.MAX_PEER_BYTES,
+                                    hooks=_BLOCK_HOOKS,
+                                    connect_timeout=self.connect_timeout,
+                                    timeout=self.send_timeout)
+        
+        # Gửi song song đến các peer, cách ly peer thất bại liên tiếp
+        self._broadcaster = Broadcaster(self._pool, broadcast_workers)
+    
+    def _close_transport(self) -> None:
+        """Đóng bộ phát sóng và các kết nối đến peer."""
+        self._broadcaster.close()
+        self._pool.close()
     
     def start(self) -> None:
         """Khởi động node và bắt đầu lắng nghe kết nối."""
@@ -63,6 +146,7 @@ class Node:
         """Dừng node."""
         self.running = False
         self.server_socket.close()
+        self._close_transport()
         logger.info("Node đã dừng")
     
     def connect_to_peer(self, host: str, port: int) -> bool:
@@ -83,28 +167,19 @@ class Node:
             return False
         
         if peer_address in self.peers:
-            logger.info(f"Đã kết nối đến {peer_address} trước đó")
-            return True
+            # Peer đã biết: chỉ đồng bộ lại phần chuỗi còn thiếu
+            logger.info(f"Đã kết nối đến {peer_address} trước đó, đồng bộ lại chuỗi")
+            return self.sync_with_peer(host, port)
         
         try:
-            # Kết nối đến peer
-            client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            client_socket.connect((host, port))
-            
-            # Gửi thông điệp kết nối
-            self._send_message(client_socket, {
-                "type": "CONNECT",
-                "data": {
-                    "address": self.address
-                }
-            })
-            
-            # Nhận phản hồi
-            response = self._receive_message(client_socket)
-            
-            if response and response.get("type") == "CONNECT_ACK":
-                # Thêm peer vào danh sách
-                self.peers.add(peer_address)
+            # Gửi thông điệp kết nối qua kết nối lâu dài đến peer
+            connection = self._pool.get(peer_address)
+            response = connection.request(self._encode_message(self._connect_message()))
+            
+            if response.get("type") == "CONNECT_ACK":
+                # Thêm peer vào danh sách (bỏ cách ly nếu peer từng bị lỗi)
+                self._register_peer(peer_address, response.get("data", {}))
+                self._broadcaster.forget(peer_address)
                 
                 # Lấy danh sách peers từ node đã kết nối
                 if "peers" in response.get("data", {}):
@@ -117,18 +192,9 @@ class Node:
                                 daemon=True
                             ).start()
                 
-                # Yêu cầu blockchain
-                self._send_message(client_socket, {
-                    "type": "GET_BLOCKCHAIN"
-                })
+                # Đồng bộ phần chuỗi còn thiếu trên cùng kết nối
+                self._sync_chain(connection)
                 
-                blockchain_response = self._receive_message(client_socket)
-                
-                if blockchain_response and blockchain_response.get("type") == "BLOCKCHAIN":
-                    # Kiểm tra và cập nhật blockchain nếu cần
-                    self._handle_blockchain_message(blockchain_response)
-                
-                client_socket.close()
                 logger.info(f"Đã kết nối thành công đến {peer_address}")
                 
                 # Cập nhật UI nếu có callback
@@ -137,54 +203,299 @@ class Node:
                 
                 return True
             
-            client_socket.close()
             return False
             
         except Exception as e:
             logger.error(f"Không thể kết nối đến {peer_address}: {e}")
             return False
     
-    def broadcast_transaction(self, transaction: Dict[str, Any]) -> None:
+    def _connect_message(self) -> Dict[str, Any]:
+        """Thông điệp CONNECT: địa chỉ, các codec và dịch vụ node hỗ trợ."""
+        return {
+            "type": "CONNECT",
+            "data": {
+                "address": self.address,
+                "codecs": list(SUPPORTED_CODECS),
+                "services": list(self.SERVICES)
+            }
+        }
+    
+    def _register_peer(self, peer_address: str, data: Dict[str, Any]) -> None:
+        """
+        Thêm peer vào danh sách và ghi nhận codec, dịch vụ của nó.
+        
+        Args:
+            peer_address: Địa chỉ peer
+            data: Dữ liệu CONNECT_ACK của peer ("codec" đã chọn, "services").
+                Peer cũ không gửi các trường này: dùng JSON và gửi nguyên
+                giao dịch, khối thay vì INV.
+        """
+        self.peers.add(peer_address)
+        self._peer_codecs[peer_address] = choose_codec([data.get("codec")])
+        
+        services = data.get("services")
+        if isinstance(services, list) and "inv" in services:
+            self._inv_peers.add(peer_address)
+        else:
+            self._inv_peers.discard(peer_address)
+    
+    def sync_with_peer(self, host: str, port: int) -> bool:
+        """
+        Đồng bộ chuỗi với một peer (tải header trước, rồi các khối còn thiếu).
+        
+        Args:
+            host: Địa chỉ IP của peer
+            port: Cổng của peer
+            
+        Returns:
+            True nếu đồng bộ thành công (kể cả khi không có gì mới)
+        """
+        try:
+            return self._sync_chain(self._pool.get(f"{host}:{port}"))
+        except Exception as e:
+            logger.error(f"Không thể đồng bộ với {host}:{port}: {e}")
+            return False
+    
+    def _sync_chain(self, connection: PeerConnection) -> bool:
+        """
+        Đồng bộ chuỗi qua kết nối đến một peer.
+        
+        Tải các header sau khối chung cuối cùng (tìm bằng bộ định vị khối),
+        kiểm tra từng lô header ngay khi nhận, rồi chỉ tải giao dịch của các
+        khối còn thiếu theo từng lô khi nhánh của peer có tổng công việc lớn
+        hơn. Mỗi lượt giữ tối đa `MAX_SYNC_HEADERS` header; chuỗi dài hơn
+        được đồng bộ qua nhiều lượt.
+        
+        Args:
+            connection: Kết nối đến peer
+            
+        Returns:
+            True nếu đồng bộ thành công (kể cả khi không có gì mới)
+            
+        Raises:
+            OSError: Nếu kết nối đến peer bị lỗi
+        """
+        # Yêu cầu được mã hóa theo codec của peer; peer phản hồi cùng codec
+        codec = self._codec_for(connection.address)
+        synced = 0
+        
+        while True:
+            headers = self._fetch_headers(connection, codec)
+            if headers is None:
+                return False
+            
+            # Chỉ tải giao dịch khi nhánh của peer có tổng công việc lớn hơn
+            # phần tương ứng của chuỗi hiện tại
+            if not headers or not self.blockchain.branch_has_more_work(headers[0].index, headers):
+                break
+            
+            blocks = self._fetch_blocks(connection, codec, headers)
+            if blocks is None:
+                return False
+            if not self.blockchain.replace_chain(ChainView(self.blockchain.chain, headers[0].index, blocks)):
+                return False
+            synced += len(blocks)
+            
+            # Peer không còn header nào sau lượt này
+            if len(headers) < self.MAX_SYNC_HEADERS:
+                break
+        
+        if synced:
+            logger.info(f"Đã đồng bộ {synced} khối từ peer")
+            
+            # Cập nhật UI nếu có callback
+            if self.update_callback:
+                self.update_callback()
+        return True
+    
+    def _fetch_headers(self, connection: PeerConnection, codec: str) -> Optional[List[Block]]:
+        """
+        Tải tối đa `MAX_SYNC_HEADERS` header sau khối chung cuối cùng.
+        
+        Mỗi lô được kiểm tra (liên kết, proof of work, target, thời gian)
+        ngay khi nhận, trước khi yêu cầu lô tiếp theo.
+        
+        Args:
+            connection: Kết nối đến peer
+            codec: Codec của peer
+            
+        Returns:
+            Các header đã kiểm tra (rỗng nếu không có gì mới), hoặc None nếu
+            peer phản hồi sai hoặc gửi header không hợp lệ
+            
+        Raises:
+            OSError: Nếu kết nối đến peer bị lỗi
+        """
+        headers: List[Block] = []
+        locator = self.blockchain.block_locator()
+        
+        while len(headers) < self.MAX_SYNC_HEADERS:
+            limit = min(self.MAX_HEADERS, self.MAX_SYNC_HEADERS - len(headers))
+            response = connection.request(self._encode_message({
+                "type": "GET_HEADERS",
+                "data": {"locator": locator, "limit": limit}
+            }, codec))
+            if response.get("type") != "HEADERS":
+                return None
+            
+            # Lô rỗng: peer không còn header nào thêm công việc
+            batch = response["data"]["headers"]
+            if not batch:
+                break
+            
+            checked = len(headers)
+            headers.extend(batch)
+            if self.blockchain.check_headers(headers, checked) is None:
+                logger.warning("Peer gửi header không hợp lệ")
+                return None
+            
+            if len(batch) < limit:
+                break
+            locator = [[batch[-1].index, batch[-1].hash]]
+        
+        return headers
+    
+    def _fetch_blocks(self, connection: PeerConnection, codec: str,
+                      headers: List[Block]) -> Optional[List[Block]]:
+        """
+        Tải các khối đầy đủ ứng với các header đã kiểm tra, theo từng lô.
+        
+        Args:
+            connection: Kết nối đến peer
+            codec: Codec của peer
+            headers: Các header đã kiểm tra, liên tiếp nhau
+            
+        Returns:
+            Các khối, hoặc None nếu peer phản hồi sai hoặc khối không khớp header
+            
+        Raises:
+            OSError: Nếu kết nối đến peer bị lỗi
+        """
+        blocks: List[Block] = []
+        for batch_start in range(0, len(headers), self.MAX_BLOCKS):
+            expected = headers[batch_start:batch_start + self.MAX_BLOCKS]
+            response = connection.request(self._encode_message({
+                "type": "GET_BLOCKS",
+                "data": {"start": expected[0].index, "stop": expected[-1].index + 1}
+            }, codec))
+            if response.get("type") != "BLOCKS":
+                return None
+            
+            # Khối nhận được phải khớp với header đã kiểm tra
+            batch = response["data"]["blocks"]
+            if ([block.hash for block in batch] != [header.hash for header in expected] or
+                    any(block.is_pruned for block in batch)):
+                logger.warning("Peer gửi khối không khớp với header")
+                return None
+            blocks.extend(batch)
+        return blocks
+    
+    def broadcast_transaction(self, transaction: Dict[str, Any],
+                              exclude: Optional[str] = None) -> Dict[str, str]:
         """
         Phát sóng một giao dịch mới đến tất cả các peers.
         
+        Peer hỗ trợ INV chỉ nhận id giao dịch và tự tải giao dịch nếu chưa có.
+        
         Args:
             transaction: Giao dịch cần phát sóng
+            exclude: Peer không cần gửi (peer đã gửi giao dịch này đến)
+            
+        Returns:
+            Kết quả gửi đến từng peer (xem `_broadcast_message`)
         """
         message = {
             "type": "NEW_TRANSACTION",
             "data": transaction
         }
         
-        self._broadcast_message(message)
+        return self._announce(INV_TRANSACTION, transaction_id(transaction), message,
+                              exclude=exclude)
     
-    def broadcast_block(self, block: Block) -> None:
+    def broadcast_block(self, block: Block, exclude: Optional[str] = None) -> Dict[str, str]:
         """
         Phát sóng một khối mới đến tất cả các peers.
         
+        Peer hỗ trợ INV chỉ nhận hash khối và tự tải khối nếu chưa có.
+        
         Args:
             block: Khối cần phát sóng
+            exclude: Peer không cần gửi (peer đã gửi khối này đến)
+            
+        Returns:
+            Kết quả gửi đến từng peer (xem `_broadcast_message`)
         """
-        message = {
-            "type": "NEW_BLOCK",
-            "data": block.to_dict()
+        # Dùng lại bản mã hóa JSON đã lưu của khối thay vì dựng lại dictionary
+        message = b'{"type": "NEW_BLOCK", "data": ' + block.serialize() + b'}'
+        
+        return self._announce(INV_BLOCK, block.hash, message,
+                              {"type": "NEW_BLOCK", "data": block.to_dict()}, exclude)
+    
+    def _announce(self, kind: str, item_hash: str, message: Union[Dict[str, Any], bytes],
+                  binary_message: Optional[Dict[str, Any]] = None,
+                  exclude: Optional[str] = None) -> Dict[str, str]:
+        """
+        Thông báo một giao dịch hoặc khối đến các peer.
+        
+        Peer hỗ trợ INV nhận thông điệp INV (chỉ có hash) và tải mục bằng
+        GETDATA nếu chưa có, nên mỗi node chỉ nhận nội dung đầy đủ một lần
+        dù có bao nhiêu peer. Peer cũ nhận nguyên thông điệp.
+        
+        Args:
+            kind: Loại mục (INV_TRANSACTION hoặc INV_BLOCK)
+            item_hash: Id giao dịch hoặc hash khối
+            message: Thông điệp đầy đủ cho peer cũ
+            binary_message: Dạng dictionary của `message` cho codec nhị phân
+            exclude: Peer không cần gửi
+            
+        Returns:
+            Kết quả gửi đến từng peer (xem `_broadcast_message`)
+        """
+        self._seen.add((kind, item_hash))
+        
+        inv = {
+            "type": "INV",
+            "data": {
+                "from": self.address,
+                "items": [[kind, item_hash]]
+            }
         }
         
-        self._broadcast_message(message)
+        peers = [peer for peer in self.peers if peer != exclude]
+        payloads = self._encode_for_peers([peer for peer in peers if peer in self._inv_peers], inv)
+        payloads.update(self._encode_for_peers([peer for peer in peers if peer not in self._inv_peers],
+                                               message, binary_message))
+        return self._send_to_peers(payloads)
     
     def mine_block(self, miner_address: str) -> Optional[Block]:
         """
         Đào một khối mới và phát sóng nó đến mạng.
         
+        Khi mạng gửi đến khối mới trong lúc đào, lượt đào cũ bị hủy và việc
+        đào được bắt đầu lại trên khối cuối mới, cho đến khi thành công hoặc
+        người dùng gọi `stop_mining()`.
+        
         Args:
             miner_address: Địa chỉ của người đào để nhận phần thưởng
             
         Returns:
-            Khối mới nếu đào thành công, None nếu không
+            Khối mới nếu đào thành công, None nếu không hoặc đã bị dừng
         """
+        stop_token = CancelToken()
+        self._mining_stop_token = stop_token
+        
         try:
-            # Đào khối mới
-            new_block = self.blockchain.mine_block(miner_address)
+            # Đào khối mới, bắt đầu lại nếu khối cuối thay đổi
+            new_block = None
+            while new_block is None:
+                if stop_token.cancelled:
+                    logger.info("Đã dừng đào")
+                    return None
+                
+                new_block = self.blockchain.mine_block(miner_address, stop_token)
+                
+                if new_block is None and not stop_token.cancelled:
+                    logger.info("Khối cuối đã thay đổi, đào lại trên khối mới")
             
             # Phát sóng khối mới
             self.broadcast_block(new_block)
@@ -199,8 +510,24 @@ class Node:
         except Exception as e:
             logger.error(f"Lỗi khi đào khối: {e}")
             return None
+        finally:
+            if self._mining_stop_token is stop_token:
+                self._mining_stop_token = None
+    
+    def stop_mining(self) -> None:
+        """Dừng việc đào đang chạy (nếu có)."""
+        token = self._mining_stop_token
+        if token is not None:
+            token.cancel()
+        self.blockchain.cancel_mining()
     
-    def add_transaction(self, sender: str, receiver: str, amount: float) -> bool:
+    @property
+    def is_mining(self) -> bool:
+        """True nếu node đang đào."""
+        return self._mining_stop_token is not None
+    
+    def add_transaction(self, sender: str, receiver: str, amount: float,
+                        private_key: Optional[str] = None) -> bool:
         """
         Thêm một giao dịch mới và phát sóng nó đến mạng.
         
@@ -208,6 +535,7 @@ class Node:
             sender: Địa chỉ người gửi
             receiver: Địa chỉ người nhận
             amount: Số lượng TuCoin
+            private_key: Khóa riêng tư của người gửi để ký giao dịch (nếu có)
             
         Returns:
             True nếu thêm thành công, False nếu không
@@ -219,16 +547,21 @@ class Node:
                 logger.warning(f"Số dư không đủ: {balance} < {amount}")
                 return False
             
-            # Thêm giao dịch vào pending
-            self.blockchain.add_transaction(sender, receiver, amount)
-            
-            # Tạo đối tượng giao dịch để phát sóng
+            # Tạo giao dịch; cùng một đối tượng được thêm vào pending và phát
+            # sóng để mọi node tính ra cùng một id giao dịch
             transaction = {
                 "sender": sender,
                 "receiver": receiver,
                 "amount": amount,
                 "timestamp": time.time()
             }
+            if private_key:
+                transaction = sign_transaction(transaction, private_key)
+            
+            # Thêm giao dịch vào pending
+            if not self.blockchain.submit_transaction(transaction):
+                logger.warning("Giao dịch không được thêm vào danh sách chờ")
+                return False
             
             # Phát sóng giao dịch
             self.broadcast_transaction(transaction)
@@ -279,95 +612,180 @@ class Node:
             address: Địa chỉ của client (host, port)
         """
         try:
-            # Nhận thông điệp
-            message = self._receive_message(client_socket)
+            client_socket.settimeout(self.CONNECTION_TIMEOUT)
             
-            if not message:
-                client_socket.close()
-                return
+            # Gửi phản hồi ngay, không chờ ACK của phần độ dài đã gửi trước
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            reader = self._new_reader()
             
-            # Xử lý thông điệp dựa trên loại
-            message_type = message.get("type")
-            
-            if message_type == "CONNECT":
-                self._handle_connect_message(client_socket, message)
-            elif message_type == "GET_BLOCKCHAIN":
-                self._handle_get_blockchain_message(client_socket)
-            elif message_type == "NEW_TRANSACTION":
-                self._handle_new_transaction_message(message)
-            elif message_type == "NEW_BLOCK":
-                self._handle_new_block_message(message)
-            
-            client_socket.close()
+            # Xử lý lần lượt các thông điệp cho đến khi peer đóng kết nối
+            while self.running:
+                payload = self._receive_payload(client_socket, reader)
+                
+                if payload is None:
+                    break
+                
+                reply = self._process_payload(payload)
+                if reply is not None:
+                    self._send_message(client_socket, reply)
             
         except Exception as e:
             logger.error(f"Lỗi khi xử lý kết nối: {e}")
+        finally:
             client_socket.close()
     
-    def _handle_connect_message(self, client_socket: socket.socket, message: Dict[str, Any]) -> None:
+    def _process_payload(self, payload) -> Optional[bytes]:
         """
-        Xử lý thông điệp kết nối.
+        Giải mã và xử lý một thông điệp nhận được.
+        
+        Phản hồi được mã hóa cùng codec với yêu cầu (JSON hoặc nhị phân).
         
         Args:
-            client_socket: Socket của client
-            message: Thông điệp nhận được
+            payload: Nội dung thông điệp
+            
+        Returns:
+            Phản hồi đã mã hóa, hoặc None nếu không cần phản hồi
+            
+        Raises:
+            ValueError: Nếu thông điệp không hợp lệ
         """
-        peer_address = message.get("data", {}).get("address")
+        binary = is_binary(payload)
+        message = decode_payload(payload, _BLOCK_HOOKS, self.MAX_MESSAGE_SIZE)
         
-        if peer_address and peer_address != self.address:
-            # Thêm peer vào danh sách
-            self.peers.add(peer_address)
-            
-            # Gửi phản hồi
-            self._send_message(client_socket, {
-                "type": "CONNECT_ACK",
-                "data": {
-                    "address": self.address,
-                    "peers": list(self.peers)
-                }
-            })
+        reply = self._dispatch_message(message, binary)
+        if reply is None:
+            return None
+        return self._encode_message(reply, CODEC_BINARY if binary else CODEC_JSON)
+    
+    def _dispatch_message(self, message: Dict[str, Any],
+                          binary: bool = False) -> Optional[Union[Dict[str, Any], bytes]]:
+        """
+        Xử lý một thông điệp nhận được dựa trên loại của nó.
+        
+        Các hàm xử lý không ghi trực tiếp vào kết nối mà trả về phản hồi,
+        nên có thể dùng chung cho mọi cách quản lý kết nối.
+        
+        Args:
+            message: Thông điệp nhận được
+            binary: Phản hồi sẽ được mã hóa nhị phân (không dùng bản mã
+                hóa JSON đã lưu)
             
-            logger.info(f"Đã kết nối với peer mới: {peer_address}")
+        Returns:
+            Phản hồi cần gửi lại (dictionary hoặc JSON đã mã hóa), hoặc None
+        """
+        message_type = message.get("type")
+        
+        if message_type == "CONNECT":
+            return self._handle_connect_message(message)
+        elif message_type == "GET_BLOCKCHAIN":
+            return self._handle_get_blockchain_message(binary)
+        elif message_type == "GET_HEADERS":
+            return self._handle_get_headers_message(message)
+        elif message_type == "GET_BLOCKS":
+            return self._handle_get_blocks_message(message, binary)
+        elif message_type == "GETDATA":
+            return self._handle_getdata_message(message, binary)
+        elif message_type == "INV":
+            self._handle_inv_message(message)
+        elif message_type == "NEW_TRANSACTION":
+            self._handle_new_transaction_message(message)
+        elif message_type == "NEW_BLOCK":
+            self._handle_new_block_message(message)
+        return None
+    
+    def _handle_connect_message(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Xử lý thông điệp kết nối.
+        
+        Args:
+            message: Thông điệp nhận được
             
-            # Cập nhật UI nếu có callback
-            if self.update_callback:
-                self.update_callback()
+        Returns:
+            Phản hồi CONNECT_ACK, hoặc None nếu địa chỉ không hợp lệ
+        """
+        data = message.get("data", {})
+        peer_address = data.get("address")
+        
+        if not peer_address or peer_address == self.address:
+            return None
+        
+        # Thêm peer vào danh sách, chọn codec chung và ghi nhận dịch vụ của
+        # peer (peer cũ không gửi "codecs", "services": dùng JSON, không INV)
+        codec = choose_codec(data.get("codecs"))
+        self._register_peer(peer_address, {"codec": codec, "services": data.get("services")})
+        
+        logger.info(f"Đã kết nối với peer mới: {peer_address}")
+        
+        # Cập nhật UI nếu có callback
+        if self.update_callback:
+            self.update_callback()
+        
+        return {
+            "type": "CONNECT_ACK",
+            "data": {
+                "address": self.address,
+                "peers": list(self.peers),
+                "codec": codec,
+                "services": list(self.SERVICES)
+            }
+        }
     
-    def _handle_get_blockchain_message(self, client_socket: socket.socket) -> None:
+    def _handle_get_blockchain_message(self, binary: bool = False) -> Union[Dict[str, Any], bytes]:
         """
         Xử lý yêu cầu lấy blockchain.
         
         Args:
-            client_socket: Socket của client
+            binary: Trả về dictionary để mã hóa nhị phân
+            
+        Returns:
+            Thông điệp BLOCKCHAIN (dạng JSON dùng lại bản mã hóa đã lưu của chuỗi)
         """
-        # Gửi blockchain
-        self._send_message(client_socket, {
-            "type": "BLOCKCHAIN",
-            "data": self.blockchain.to_dict()
-        })
+        if binary:
+            return {"type": "BLOCKCHAIN", "data": self.blockchain.to_dict()}
+        return b'{"type": "BLOCKCHAIN", "data": ' + self.blockchain.serialize() + b'}'
     
-    def _handle_blockchain_message(self, message: Dict[str, Any]) -> None:
+    def _handle_get_headers_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Xử lý thông điệp blockchain.
+        Xử lý yêu cầu lấy header sau khối chung cuối cùng.
         
         Args:
-            message: Thông điệp nhận được
+            message: Thông điệp chứa bộ định vị khối và số header tối đa
+            
+        Returns:
+            Thông điệp HEADERS
+        """
+        data = message.get("data", {})
+        limit = min(data.get("limit", self.MAX_HEADERS), self.MAX_HEADERS)
+        blocks = self.blockchain.get_headers(data.get("locator", []), limit)
+        
+        return {
+            "type": "HEADERS",
+            "data": {
+                "headers": [dict(block.header(), hash=block.hash) for block in blocks]
+            }
+        }
+    
+    def _handle_get_blocks_message(self, message: Dict[str, Any],
+                                   binary: bool = False) -> Union[Dict[str, Any], bytes]:
         """
-        blockchain_data = message.get("data")
+        Xử lý yêu cầu lấy các khối trong một khoảng độ cao.
         
-        if blockchain_data:
-            # Tạo blockchain từ dữ liệu
-            received_blockchain = Blockchain.from_dict(blockchain_data)
+        Args:
+            message: Thông điệp chứa độ cao đầu (start) và cuối (stop, không gồm)
+            binary: Trả về dictionary để mã hóa nhị phân
             
-            # Kiểm tra và thay thế blockchain nếu cần
-            if len(received_blockchain.chain) > len(self.blockchain.chain):
-                if received_blockchain.is_chain_valid():
-                    self.blockchain = received_blockchain
-                    logger.info("Đã cập nhật blockchain từ peer")
-                    
-                    # Cập nhật UI nếu có callback
-                    if self.update_callback:
-                        self.update_callback()
+        Returns:
+            Thông điệp BLOCKS (dạng JSON dùng lại bản mã hóa đã lưu của từng khối)
+        """
+        data = message.get("data", {})
+        start = max(data.get("start", 0), 0)
+        stop = min(data.get("stop", start), start + self.MAX_BLOCKS)
+        blocks = self.blockchain.chain[start:stop]
+        
+        if binary:
+            return {"type": "BLOCKS", "data": {"blocks": [block.to_dict() for block in blocks]}}
+        return (b'{"type": "BLOCKS", "data": {"blocks": [' +
+                b", ".join(block.serialize() for block in blocks) + b']}}')
     
     def _handle_new_transaction_message(self, message: Dict[str, Any]) -> None:
         """
@@ -379,18 +797,32 @@ class Node:
         transaction = message.get("data")
         
         if transaction:
-            # Thêm giao dịch vào pending
-            self.blockchain.add_transaction(
-                transaction["sender"],
-                transaction["receiver"],
-                transaction["amount"]
-            )
-            
-            logger.info(f"Đã nhận giao dịch mới: {transaction['sender']} -> {transaction['receiver']}: {transaction['amount']}")
+            self._accept_transaction(transaction)
+    
+    def _accept_transaction(self, transaction: Dict[str, Any], source: Optional[str] = None) -> bool:
+        """
+        Thêm giao dịch nhận từ mạng vào pending và phát tiếp nếu hợp lệ.
+        
+        Args:
+            transaction: Giao dịch nhận được
+            source: Peer đã gửi giao dịch (không phát lại cho peer này)
             
-            # Cập nhật UI nếu có callback
-            if self.update_callback:
-                self.update_callback()
+        Returns:
+            True nếu giao dịch hợp lệ và mới
+        """
+        # Thêm giao dịch vào pending (bỏ qua giao dịch đã có)
+        if not self.blockchain.submit_transaction(transaction):
+            return False
+        
+        logger.info(f"Đã nhận giao dịch mới: {transaction['sender']} -> {transaction['receiver']}: {transaction['amount']}")
+        
+        # Chỉ phát tiếp giao dịch đã được kiểm tra
+        self.broadcast_transaction(transaction, exclude=source)
+        
+        # Cập nhật UI nếu có callback
+        if self.update_callback:
+            self.update_callback()
+        return True
     
     def _handle_new_block_message(self, message: Dict[str, Any]) -> None:
         """
@@ -403,113 +835,291 @@ class Node:
         
         if block_data:
             # Tạo khối từ dữ liệu
-            new_block = Block.from_dict(block_data)
+            self._accept_block(Block.from_dict(block_data))
+    
+    def _accept_block(self, block: Block, source: Optional[str] = None) -> bool:
+        """
+        Thêm khối nhận từ mạng vào cuối chuỗi và phát tiếp nếu hợp lệ.
+        
+        Nếu khối không nối tiếp chuỗi hiện tại nhưng cao hơn, chuỗi được
+        đồng bộ lại với peer đã gửi (nếu biết).
+        
+        Args:
+            block: Khối nhận được
+            source: Peer đã gửi khối (không phát lại cho peer này)
             
-            # Kiểm tra tính hợp lệ của khối
-            if (new_block.index == len(self.blockchain.chain) and
-                new_block.previous_hash == self.blockchain.last_block.hash and
-                self.blockchain.valid_proof(self.blockchain.last_block.proof, new_block.proof)):
-                
-                # Thêm khối vào blockchain
-                self.blockchain.chain.append(new_block)
-                
-                # Xóa các giao dịch đã được thêm vào khối
-                for transaction in new_block.transactions:
-                    if transaction in self.blockchain.pending_transactions:
-                        self.blockchain.pending_transactions.remove(transaction)
+        Returns:
+            True nếu khối đã được thêm
+        """
+        # Kiểm tra tính hợp lệ và thêm khối vào blockchain
+        if not self.blockchain.add_block(block):
+            if source is not None and block.index > self.blockchain.last_block.index:
+                self._request_sync(source)
+            return False
+        
+        logger.info(f"Đã nhận và thêm khối mới: {block.hash}")
+        
+        # Chỉ phát tiếp khối đã được kiểm tra
+        self.broadcast_block(block, exclude=source)
+        
+        # Cập nhật UI nếu có callback
+        if self.update_callback:
+            self.update_callback()
+        return True
+    
+    def _request_sync(self, source: str) -> None:
+        """Đồng bộ chuỗi với peer đã gửi một khối cao hơn chuỗi hiện tại."""
+        host, port = source.rsplit(":", 1)
+        self.sync_with_peer(host, int(port))
+    
+    @staticmethod
+    def _inventory_items(items: Any, limit: int) -> List[Tuple[str, str]]:
+        """Các mục (loại, hash) hợp lệ trong INV hoặc GETDATA, tối đa `limit` mục."""
+        if not isinstance(items, list):
+            return []
+        return [(item[0], item[1]) for item in items[:limit]
+                if isinstance(item, list) and len(item) == 2 and
+                item[0] in INV_TYPES and isinstance(item[1], str)]
+    
+    def _handle_inv_message(self, message: Dict[str, Any]) -> None:
+        """
+        Xử lý thông báo INV: tải các giao dịch, khối chưa thấy từ peer đã thông báo.
+        
+        Mục được đánh dấu đã thấy ngay, nên khi nhiều peer cùng thông báo,
+        mục chỉ được tải từ peer đầu tiên.
+        
+        Args:
+            message: Thông điệp chứa địa chỉ peer ("from") và các mục
+        """
+        data = message.get("data", {})
+        source = data.get("from")
+        
+        # Chỉ tải từ peer đã biết (không kết nối đến địa chỉ tùy ý)
+        if source not in self.peers:
+            return
+        
+        wanted = [item for item in self._inventory_items(data.get("items"), self.MAX_INV_ITEMS)
+                  if not self._has_item(*item) and self._seen.add(item)]
+        if wanted:
+            self._fetch_inventory(source, wanted)
+    
+    def _has_item(self, kind: str, item_hash: str) -> bool:
+        """True nếu giao dịch đang chờ hoặc là khối cuối (các mục khác dựa vào `_seen`)."""
+        if kind == INV_TRANSACTION:
+            return item_hash in self.blockchain.mempool
+        return self.blockchain.last_block.hash == item_hash
+    
+    def _fetch_inventory(self, source: str, items: List[Tuple[str, str]]) -> None:
+        """Tải các mục từ peer trong một thread riêng (không chặn kết nối đến)."""
+        threading.Thread(
+            target=self._request_inventory,
+            args=(self._pool.get(source), items),
+            daemon=True
+        ).start()
+    
+    def _request_inventory(self, connection: PeerConnection, items: List[Tuple[str, str]]) -> None:
+        """
+        Tải các mục bằng GETDATA và xử lý chúng.
+        
+        Mục không tải được được bỏ đánh dấu đã thấy để có thể tải từ peer
+        khác thông báo sau.
+        
+        Args:
+            connection: Kết nối đến peer đã thông báo
+            items: Các mục (loại, hash) cần tải
+        """
+        source = connection.address
+        received = set()
+        try:
+            response = connection.request(self._encode_message({
+                "type": "GETDATA",
+                "data": {"items": [list(item) for item in items]}
+            }, self._codec_for(source)))
+            
+            if response.get("type") == "DATA":
+                data = response["data"]
+                requested = set(items)
                 
-                logger.info(f"Đã nhận và thêm khối mới: {new_block.hash}")
+                for transaction in data.get("transactions", []):
+                    if not is_well_formed(transaction):
+                        continue
+                    item = (INV_TRANSACTION, transaction_id(transaction))
+                    if item in requested:
+                        received.add(item)
+                        self._accept_transaction(transaction, source)
                 
-                # Cập nhật UI nếu có callback
-                if self.update_callback:
-                    self.update_callback()
+                # Các khối đã được tạo khi giải mã; hash được kiểm tra khi thêm
+                for block in data.get("blocks", []):
+                    item = (INV_BLOCK, block.hash)
+                    if item in requested:
+                        received.add(item)
+                        self._accept_block(block, source)
+        except Exception as e:
+            logger.warning(f"Không thể tải dữ liệu từ {source}: {e}")
+        finally:
+            for item in items:
+                if item not in received:
+                    self._seen.discard(item)
     
-    def _broadcast_message(self, message: Dict[str, Any]) -> None:
+    def _handle_getdata_message(self, message: Dict[str, Any],
+                                binary: bool = False) -> Union[Dict[str, Any], bytes]:
+        """
+        Xử lý yêu cầu GETDATA: trả về các giao dịch đang chờ và khối được yêu cầu.
+        
+        Args:
+            message: Thông điệp chứa các mục (loại, hash)
+            binary: Trả về dictionary để mã hóa nhị phân
+            
+        Returns:
+            Thông điệp DATA (mục không có bị bỏ qua)
+        """
+        transactions = []
+        blocks = []
+        for kind, item_hash in self._inventory_items(message.get("data", {}).get("items"),
+                                                     self.MAX_INV_ITEMS):
+            if kind == INV_TRANSACTION:
+                transaction = self.blockchain.mempool.get(item_hash)
+                if transaction is not None:
+                    transactions.append(transaction)
+            else:
+                block = self.blockchain.get_block_by_hash(item_hash)
+                if block is not None and not block.is_pruned:
+                    blocks.append(block)
+        
+        if binary:
+            return {"type": "DATA", "data": {"transactions": transactions,
+                                             "blocks": [block.to_dict() for block in blocks]}}
+        return (b'{"type": "DATA", "data": {"transactions": ' + json.dumps(transactions).encode() +
+                b', "blocks": [' + b", ".join(block.serialize() for block in blocks) + b']}}')
+    
+    def _broadcast_message(self, message: Union[Dict[str, Any], bytes],
+                           binary_message: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
         """
         Phát sóng một thông điệp đến tất cả các peers.
         
+        Thông điệp được gửi đồng thời đến mọi peer qua kết nối lâu dài, nên
+        peer chậm không làm chậm các peer khác. Peer thất bại nhiều lần liên
+        tiếp bị cách ly một thời gian thay vì bị xóa khỏi danh sách.
+        
         Args:
-            message: Thông điệp cần phát sóng
+            message: Thông điệp cần phát sóng (dictionary hoặc JSON đã mã hóa)
+            binary_message: Dạng dictionary của thông điệp cho peer dùng codec
+                nhị phân, khi `message` là JSON đã mã hóa
+            
+        Returns:
+            Kết quả của từng peer: "delivered", "failed", "timed_out" (chưa
+            gửi xong sau send_timeout giây) hoặc "quarantined" (bị bỏ qua)
         """
-        for peer in self.peers:
-            try:
-                host, port = peer.split(":")
-                port = int(port)
-                
-                # Kết nối đến peer
-                client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                client_socket.connect((host, port))
-                
-                # Gửi thông điệp
-                self._send_message(client_socket, message)
-                
-                client_socket.close()
-                
-            except Exception as e:
-                logger.error(f"Không thể phát sóng đến {peer}: {e}")
-                # Xóa peer không kết nối được
-                self.peers.remove(peer)
+        return self._send_to_peers(self._encode_for_peers(list(self.peers), message, binary_message))
+    
+    def _send_to_peers(self, payloads: Dict[str, bytes]) -> Dict[str, str]:
+        """
+        Gửi đồng thời thông điệp đã mã hóa riêng cho từng peer.
+        
+        Args:
+            payloads: Địa chỉ peer -> thông điệp đã mã hóa
+            
+        Returns:
+            Kết quả của từng peer (xem `_broadcast_message`)
+        """
+        results = self._broadcaster.broadcast(list(payloads), payloads, self.send_timeout)
+        
+        for peer, result in results.items():
+            if result not in (DELIVERED, QUARANTINED):
+                logger.warning(f"Không thể phát sóng đến {peer}: {result}")
+        return results
+    
+    def _codec_for(self, peer: str) -> str:
+        """Codec đã thỏa thuận với một peer."""
+        return self._peer_codecs.get(peer, CODEC_JSON)
     
-    def _send_message(self, client_socket: socket.socket, message: Dict[str, Any]) -> None:
+    def _encode_for_peers(self, peers: List[str], message: Union[Dict[str, Any], bytes],
+                          binary_message: Optional[Dict[str, Any]] = None) -> Dict[str, bytes]:
+        """
+        Mã hóa một thông điệp theo codec của từng peer (mỗi codec một lần).
+        
+        Args:
+            peers: Địa chỉ các peer
+            message: Thông điệp (dictionary hoặc JSON đã mã hóa)
+            binary_message: Dạng dictionary của thông điệp (nếu `message` là JSON)
+            
+        Returns:
+            Địa chỉ peer -> thông điệp đã mã hóa
+        """
+        encoded: Dict[str, bytes] = {}
+        payloads = {}
+        for peer in peers:
+            codec = self._codec_for(peer)
+            if codec not in encoded:
+                source = binary_message if codec == CODEC_BINARY and binary_message else message
+                encoded[codec] = self._encode_message(source, codec)
+            payloads[peer] = encoded[codec]
+        return payloads
+    
+    @staticmethod
+    def _encode_message(message: Union[Dict[str, Any], bytes], codec: str = CODEC_JSON) -> bytes:
+        """
+        Mã hóa thông điệp theo codec nếu chưa được mã hóa sẵn.
+        
+        Thông điệp JSON đã mã hóa được gửi nguyên vẹn cho mọi peer, vì peer
+        dùng codec nhị phân vẫn nhận được JSON.
+        """
+        if isinstance(message, bytes):
+            return message
+        if codec == CODEC_BINARY:
+            return encode_binary(message)
+        return json.dumps(message).encode()
+    
+    def _send_message(self, client_socket: socket.socket,
+                      message: Union[Dict[str, Any], bytes]) -> None:
         """
         Gửi một thông điệp đến một socket.
         
         Args:
             client_socket: Socket đích
-            message: Thông điệp cần gửi
+            message: Thông điệp cần gửi (dictionary hoặc JSON đã mã hóa)
         """
         try:
-            # Chuyển đổi thông điệp thành JSON
-            message_json = json.dumps(message).encode()
-            
-            # Gửi độ dài thông điệp trước (4 bytes)
-            message_length = len(message_json)
-            client_socket.sendall(message_length.to_bytes(4, byteorder='big'))
-            
-            # Gửi thông điệp
-            client_socket.sendall(message_json)
+            # Gửi độ dài thông điệp (4 bytes) rồi nội dung
+            write_frame(client_socket, self._encode_message(message))
             
         except Exception as e:
             logger.error(f"Lỗi khi gửi thông điệp: {e}")
     
-    def _receive_message(self, client_socket: socket.socket) -> Optional[Dict[str, Any]]:
+    def _new_reader(self) -> MessageReader:
+        """Tạo bộ đọc thông điệp cho một kết nối mới."""
+        return MessageReader(self.MAX_MESSAGE_SIZE, self.MAX_PEER_BYTES)
+    
+    def _receive_payload(self, client_socket: socket.socket,
+                         reader: Optional[MessageReader] = None) -> Optional[memoryview]:
         """
-        Nhận một thông điệp từ một socket.
+        Nhận nội dung một thông điệp (chưa giải mã) từ một socket.
         
         Args:
             client_socket: Socket nguồn
+            reader: Bộ đọc thông điệp của kết nối (giữ giới hạn của peer
+                giữa các thông điệp; tạo mới nếu không có)
             
         Returns:
-            Thông điệp nhận được hoặc None nếu có lỗi
+            Nội dung thông điệp (chỉ hợp lệ đến lần đọc tiếp theo) hoặc None
+            nếu có lỗi
         """
         try:
-            # Nhận độ dài thông điệp (4 bytes)
-            message_length_bytes = client_socket.recv(4)
-            if not message_length_bytes:
-                return None
+            if reader is None:
+                reader = self._new_reader()
             
-            message_length = int.from_bytes(message_length_bytes, byteorder='big')
-            
-            # Nhận thông điệp
-            message_json = b''
-            bytes_received = 0
-            
-            while bytes_received < message_length:
-                chunk = client_socket.recv(min(message_length - bytes_received, 4096))
-                if not chunk:
-                    return None
-                
-                message_json += chunk
-                bytes_received += len(chunk)
-            
-            # Chuyển đổi JSON thành dictionary
-            return json.loads(message_json.decode())
+            return reader.read(client_socket)
             
+        except FramingError as e:
+            logger.warning(f"Bỏ kết nối do thông điệp quá lớn: {e}")
+            return None
+        except socket.timeout:
+            # Peer không gửi gì trong thời gian chờ: đóng kết nối
+            return None
         except Exception as e:
             logger.error(f"Lỗi khi nhận thông điệp: {e}")
             return None
 
-
 if __name__ == "__main__":
     # Kiểm tra nhanh
     node = Node(host='127.0.0.1', port=5000)
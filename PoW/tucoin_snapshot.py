@@ -0,0 +1,125 @@
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class StateSnapshot:
+    """
+    Ảnh chụp sổ cái số dư tại một độ cao của chuỗi.
+
+    Ảnh chụp ở độ cao `height` chứa số dư sau khi áp dụng các khối
+    0..height-1, id của các giao dịch đã được xác nhận trong các khối đó
+    và hash của khối height-1, để biết nó thuộc về chuỗi nào. Từ ảnh chụp
+    có thể tính lại sổ cái mà không cần giao dịch của các khối trước đó.
+    """
+
+    def __init__(self, height: int, block_hash: str, balances: Dict[str, float],
+                 txids: Iterable[str] = ()):
+        """
+        Args:
+            height: Số khối đã được áp dụng vào sổ cái
+            block_hash: Hash của khối cuối cùng đã áp dụng (khối height-1)
+            balances: Số dư của các địa chỉ tại độ cao này
+            txids: Id của các giao dịch đã xác nhận (trừ phần thưởng)
+        """
+        self.height = height
+        self.block_hash = block_hash
+        self.balances = balances
+        self.txids = set(txids)
+
+    def matches(self, chain) -> bool:
+        """True nếu ảnh chụp thuộc về chuỗi (khối height-1 có cùng hash)."""
+        return (0 < self.height <= len(chain) and
+                chain[self.height - 1].hash == self.block_hash)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Chuyển đổi ảnh chụp thành dictionary để serialize."""
+        return {
+            "height": self.height,
+            "block_hash": self.block_hash,
+            "balances": self.balances,
+            "txids": sorted(self.txids)
+        }
+
+    @classmethod
+    def from_dict(cls, snapshot_dict: Dict[str, Any]) -> 'StateSnapshot':
+        """Tạo ảnh chụp từ dictionary."""
+        return cls(snapshot_dict["height"], snapshot_dict["block_hash"],
+                   dict(snapshot_dict["balances"]), snapshot_dict.get("txids", ()))
+
+    def save(self, path: str) -> None:
+        """
+        Ghi ảnh chụp ra file.
+
+        Ghi vào file tạm rồi đổi tên, để file cũ vẫn còn nguyên nếu chương
+        trình dừng giữa chừng.
+
+        Args:
+            path: Đường dẫn file
+        """
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.to_dict(), file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['StateSnapshot']:
+        """
+        Đọc ảnh chụp từ file.
+
+        Args:
+            path: Đường dẫn file
+
+        Returns:
+            Ảnh chụp hoặc None nếu file không tồn tại hoặc bị hỏng
+        """
+        try:
+            with open(path, "r") as file:
+                return cls.from_dict(json.load(file))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+
+class LedgerCheckpoint(StateSnapshot):
+    """
+    Trạng thái sổ cái tại khối cuối, lưu khi đóng blockchain.
+
+    Khác ảnh chụp dùng khi cắt tỉa, checkpoint không giới hạn việc đổi
+    nhánh: nó còn chứa dữ liệu hoàn tác của các khối gần nhất và chỉ mục
+    lịch sử giao dịch, nên khi khởi động chỉ cần áp dụng các khối mới hơn
+    nó thay vì toàn bộ chuỗi.
+    """
+
+    def __init__(self, height: int, block_hash: str, balances: Dict[str, float],
+                 undo: List[Dict[str, Optional[float]]], history: Dict[str, str],
+                 txids: Iterable[str] = ()):
+        """
+        Args:
+            height: Số khối đã được áp dụng vào sổ cái
+            block_hash: Hash của khối cuối cùng đã áp dụng (khối height-1)
+            balances: Số dư của các địa chỉ tại độ cao này
+            undo: Dữ liệu hoàn tác sổ cái của các khối gần nhất
+            history: Chỉ mục lịch sử giao dịch (xem `AddressHistory.to_dict`)
+            txids: Id của các giao dịch đã xác nhận (trừ phần thưởng)
+        """
+        super().__init__(height, block_hash, balances, txids)
+        self.undo = undo
+        self.history = history
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Chuyển đổi checkpoint thành dictionary để serialize."""
+        checkpoint_dict = super().to_dict()
+        checkpoint_dict["undo"] = self.undo
+        checkpoint_dict["history"] = self.history
+        return checkpoint_dict
+
+    @classmethod
+    def from_dict(cls, checkpoint_dict: Dict[str, Any]) -> 'LedgerCheckpoint':
+        """Tạo checkpoint từ dictionary."""
+        # Checkpoint của phiên bản cũ không có "txids" bị coi như hỏng, để
+        # sổ cái được tính lại cùng chỉ mục giao dịch đã xác nhận
+        return cls(checkpoint_dict["height"], checkpoint_dict["block_hash"],
+                   dict(checkpoint_dict["balances"]), list(checkpoint_dict["undo"]),
+                   dict(checkpoint_dict["history"]), checkpoint_dict["txids"])
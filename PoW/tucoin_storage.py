@@ -0,0 +1,333 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from heapq import merge
+from typing import Dict, Iterator, List, Optional, Union
+
+from tucoin_blockchain import Block
+
+# Mỗi bản ghi dữ liệu: độ dài (4 bytes) + JSON của khối
+_LENGTH = struct.Struct(">I")
+
+# Mỗi bản ghi chỉ mục: vị trí bản ghi dữ liệu (8 bytes) + hash khối (32 bytes)
+_INDEX_RECORD = struct.Struct(">Q32s")
+
+
+class BlockStore:
+    """
+    Lưu trữ khối trên đĩa dạng nhật ký chỉ ghi thêm.
+
+    Gồm hai file: `blocks.dat` chứa các khối đã mã hóa nối tiếp nhau và
+    `blocks.idx` chứa vị trí cùng hash của khối ở mỗi độ cao. Khối được đọc
+    qua mmap và giữ trong bộ nhớ đệm LRU có giới hạn, nên bộ nhớ dùng không
+    phụ thuộc độ dài chuỗi.
+
+    Đối tượng hoạt động như một danh sách khối (len, chỉ số, lát cắt,
+    append, del store[h:]) nên có thể dùng làm `Blockchain.chain`.
+    """
+
+    DATA_FILE = "blocks.dat"
+    INDEX_FILE = "blocks.idx"
+
+    # Số hash mới tối thiểu được giữ riêng trước khi gộp vào chỉ mục đã sắp xếp
+    HASH_MERGE_SIZE = 1024
+
+    def __init__(self, directory: str, cache_size: int = 1024):
+        """
+        Mở (hoặc tạo mới) kho khối trong một thư mục.
+
+        Args:
+            directory: Thư mục chứa dữ liệu
+            cache_size: Số khối tối đa giữ trong bộ nhớ đệm
+        """
+        self.directory = directory
+        self.cache_size = cache_size
+        os.makedirs(directory, exist_ok=True)
+
+        self._data_path = os.path.join(directory, self.DATA_FILE)
+        self._index_path = os.path.join(directory, self.INDEX_FILE)
+
+        self._lock = threading.RLock()
+        self._cache: "OrderedDict[int, Block]" = OrderedDict()
+        self._map: Optional[mmap.mmap] = None
+
+        # Vị trí bản ghi theo độ cao
+        self._offsets = array('Q')
+        self._data_size = 0
+
+        # Chỉ mục hash -> độ cao: 8 bytes đầu của hash (đã sắp xếp) và độ cao tương ứng
+        self._hash_keys = array('Q')
+        self._hash_heights = array('Q')
+
+        # Hash của các khối mới nối, chưa gộp vào chỉ mục đã sắp xếp: khóa -> các độ cao
+        self._recent_hashes: Dict[int, List[int]] = {}
+        self._recent_count = 0
+
+        self._load_index()
+
+        self._data_file = open(self._data_path, "ab")
+        self._index_file = open(self._index_path, "ab")
+        self._read_file = open(self._data_path, "rb")
+
+    def _load_index(self) -> None:
+        """Đọc chỉ mục và bỏ phần ghi dở (nếu chương trình dừng giữa chừng)."""
+        index_bytes = b""
+        if os.path.exists(self._index_path):
+            with open(self._index_path, "rb") as index_file:
+                index_bytes = index_file.read()
+        index_bytes = index_bytes[:len(index_bytes) - len(index_bytes) % _INDEX_RECORD.size]
+        records = list(_INDEX_RECORD.iter_unpack(index_bytes))
+
+        data_size = os.path.getsize(self._data_path) if os.path.exists(self._data_path) else 0
+
+        # Bỏ các bản ghi chỉ mục cuối trỏ tới dữ liệu chưa được ghi đầy đủ
+        valid_size = 0
+        if records:
+            with open(self._data_path, "rb") as data_file:
+                while records:
+                    offset = records[-1][0]
+                    if offset + _LENGTH.size <= data_size:
+                        data_file.seek(offset)
+                        (length,) = _LENGTH.unpack(data_file.read(_LENGTH.size))
+                        valid_size = offset + _LENGTH.size + length
+                        if valid_size <= data_size:
+                            break
+                    records.pop()
+            if not records:
+                valid_size = 0
+
+        # Cắt bỏ dữ liệu không có trong chỉ mục
+        if data_size != valid_size:
+            with open(self._data_path, "ab") as data_file:
+                data_file.truncate(valid_size)
+        index_size = len(records) * _INDEX_RECORD.size
+        if os.path.exists(self._index_path) and os.path.getsize(self._index_path) != index_size:
+            with open(self._index_path, "ab") as index_file:
+                index_file.truncate(index_size)
+
+        self._data_size = valid_size
+        self._offsets = array('Q', (offset for offset, _ in records))
+
+        # Sắp xếp chỉ mục hash một lần thay vì chèn từng phần tử
+        keys = [self._hash_key(hash_bytes) for _, hash_bytes in records]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._hash_keys = array('Q', (keys[height] for height in order))
+        self._hash_heights = array('Q', order)
+
+    @staticmethod
+    def _hash_key(hash_bytes: bytes) -> int:
+        """Khóa sắp xếp của một hash (8 bytes đầu)."""
+        return int.from_bytes(hash_bytes[:8], "big")
+
+    def _add_hash(self, hash_bytes: bytes, height: int) -> None:
+        """
+        Thêm một hash vào chỉ mục hash -> độ cao.
+
+        Hash mới được giữ trong một dictionary riêng và chỉ được gộp vào các
+        mảng đã sắp xếp khi số hash mới vượt quá một phần độ dài chuỗi, nên
+        mỗi lần nối khối có chi phí trung bình không đổi thay vì phải chèn
+        vào giữa mảng.
+        """
+        self._recent_hashes.setdefault(self._hash_key(hash_bytes), []).append(height)
+        self._recent_count += 1
+        if self._recent_count >= max(self.HASH_MERGE_SIZE, len(self._hash_keys) // 8):
+            self._merge_hashes()
+
+    def _merge_hashes(self) -> None:
+        """Gộp các hash mới vào chỉ mục đã sắp xếp (một lượt trộn tuyến tính)."""
+        if not self._recent_hashes:
+            return
+
+        recent = sorted((key, height) for key, heights in self._recent_hashes.items()
+                        for height in heights)
+        keys = array('Q')
+        heights = array('Q')
+        for key, height in merge(zip(self._hash_keys, self._hash_heights), recent):
+            keys.append(key)
+            heights.append(height)
+
+        self._hash_keys = keys
+        self._hash_heights = heights
+        self._recent_hashes.clear()
+        self._recent_count = 0
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def append(self, block: Block) -> None:
+        """
+        Ghi thêm một khối vào cuối kho.
+
+        Args:
+            block: Khối cần ghi (phải có index bằng số khối hiện có)
+        """
+        with self._lock:
+            height = len(self._offsets)
+            payload = block.serialize()
+            hash_bytes = bytes.fromhex(block.hash)
+
+            # Ghi dữ liệu trước, chỉ mục sau: nếu dừng giữa chừng, bản ghi dữ
+            # liệu thừa sẽ bị cắt bỏ ở lần mở tiếp theo
+            offset = self._data_size
+            self._data_file.write(_LENGTH.pack(len(payload)))
+            self._data_file.write(payload)
+            self._data_file.flush()
+            self._index_file.write(_INDEX_RECORD.pack(offset, hash_bytes))
+            self._index_file.flush()
+
+            self._data_size = offset + _LENGTH.size + len(payload)
+            self._offsets.append(offset)
+            self._add_hash(hash_bytes, height)
+            self._cache_put(height, block)
+
+    def _read_block(self, height: int) -> Block:
+        """Đọc và giải mã khối ở một độ cao từ file dữ liệu."""
+        offset = self._offsets[height]
+
+        if self._map is None or len(self._map) < self._data_size:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._read_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (length,) = _LENGTH.unpack_from(self._map, offset)
+        start = offset + _LENGTH.size
+        return Block.from_dict(json.loads(self._map[start:start + length]))
+
+    def _cache_put(self, height: int, block: Block) -> None:
+        """Đưa khối vào bộ nhớ đệm LRU."""
+        self._cache[height] = block
+        self._cache.move_to_end(height)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get_block(self, height: int) -> Optional[Block]:
+        """
+        Lấy khối theo độ cao.
+
+        Args:
+            height: Độ cao (index) của khối
+
+        Returns:
+            Khối hoặc None nếu không tồn tại
+        """
+        with self._lock:
+            if not 0 <= height < len(self._offsets):
+                return None
+
+            block = self._cache.get(height)
+            if block is None:
+                block = self._read_block(height)
+            self._cache_put(height, block)
+            return block
+
+    def get_height(self, block_hash: str) -> Optional[int]:
+        """
+        Tìm độ cao của khối theo hash.
+
+        Args:
+            block_hash: Hash của khối
+
+        Returns:
+            Độ cao của khối hoặc None nếu không có
+        """
+        try:
+            hash_bytes = bytes.fromhex(block_hash)
+        except (TypeError, ValueError):
+            return None
+
+        with self._lock:
+            key = self._hash_key(hash_bytes)
+            position = bisect_left(self._hash_keys, key)
+            candidates = []
+            while position < len(self._hash_keys) and self._hash_keys[position] == key:
+                candidates.append(self._hash_heights[position])
+                position += 1
+            candidates.extend(self._recent_hashes.get(key, ()))
+
+            # Nhiều hash có thể trùng 8 bytes đầu: so sánh hash đầy đủ
+            for height in candidates:
+                if self.get_block(height).hash == block_hash:
+                    return height
+
+        return None
+
+    def get_block_by_hash(self, block_hash: str) -> Optional[Block]:
+        """
+        Lấy khối theo hash.
+
+        Args:
+            block_hash: Hash của khối
+
+        Returns:
+            Khối hoặc None nếu không có
+        """
+        height = self.get_height(block_hash)
+        return None if height is None else self.get_block(height)
+
+    def truncate(self, height: int) -> None:
+        """
+        Xóa các khối từ độ cao `height` trở lên.
+
+        Args:
+            height: Số khối được giữ lại
+        """
+        with self._lock:
+            if height >= len(self._offsets):
+                return
+
+            new_size = self._offsets[height]
+
+            # Đóng mmap trước khi cắt file
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+            self._data_file.truncate(new_size)
+            self._index_file.truncate(height * _INDEX_RECORD.size)
+            self._data_size = new_size
+            del self._offsets[height:]
+
+            # Lập lại chỉ mục hash cho các khối còn lại
+            self._merge_hashes()
+            keep = [(key, h) for key, h in zip(self._hash_keys, self._hash_heights) if h < height]
+            self._hash_keys = array('Q', (key for key, _ in keep))
+            self._hash_heights = array('Q', (h for _, h in keep))
+
+            for cached_height in [h for h in self._cache if h >= height]:
+                del self._cache[cached_height]
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[Block, List[Block]]:
+        if isinstance(item, slice):
+            return [self.get_block(height) for height in range(*item.indices(len(self)))]
+
+        height = item + len(self) if item < 0 else item
+        block = self.get_block(height)
+        if block is None:
+            raise IndexError("block index out of range")
+        return block
+
+    def __delitem__(self, item: slice) -> None:
+        # Kho chỉ ghi thêm: chỉ hỗ trợ xóa phần cuối (del store[h:])
+        start, stop, step = item.indices(len(self))
+        if stop != len(self) or step != 1:
+            raise ValueError("BlockStore chỉ hỗ trợ xóa các khối ở cuối")
+        self.truncate(start)
+
+    def __iter__(self) -> Iterator[Block]:
+        for height in range(len(self)):
+            yield self.get_block(height)
+
+    def close(self) -> None:
+        """Đóng các file của kho."""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._data_file.close()
+            self._index_file.close()
+            self._read_file.close()
@@ -0,0 +1,78 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from tucoin_ledger import LedgerOverlay
+
+
+class BlockTemplateBuilder:
+    """
+    Chọn giao dịch cho khối mới với giới hạn số lượng và kích thước.
+
+    Giao dịch được xét theo thứ tự ưu tiên và kiểm tra trong một lượt duy
+    nhất trên một lớp trạng thái tạm (xem `LedgerOverlay`), không thay đổi
+    sổ cái. Giao dịch không được chọn vẫn ở lại mempool.
+    """
+
+    def __init__(self, max_transactions: Optional[int] = 1000,
+                 max_bytes: Optional[int] = 1_000_000):
+        """
+        Khởi tạo bộ chọn giao dịch.
+
+        Args:
+            max_transactions: Số giao dịch tối đa trong một khối (kể cả
+                giao dịch phần thưởng), None = không giới hạn
+            max_bytes: Tổng kích thước JSON tối đa của các giao dịch trong
+                một khối, None = không giới hạn
+        """
+        self.max_transactions = max_transactions
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def transaction_size(transaction: Dict[str, Any]) -> int:
+        """Kích thước (bytes) của giao dịch trong mã hóa JSON của khối."""
+        # Cộng thêm dấu phân cách ", " giữa các phần tử của danh sách
+        return len(json.dumps(transaction, sort_keys=True)) + 2
+
+    def select(self, candidates: Iterable[Dict[str, Any]], ledger: LedgerOverlay,
+               reserved: Iterable[Dict[str, Any]] = ()) -> List[Dict[str, Any]]:
+        """
+        Chọn các giao dịch đưa vào khối.
+
+        Args:
+            candidates: Giao dịch ứng viên, theo độ ưu tiên giảm dần
+            ledger: Lớp trạng thái tạm trên sổ cái đã xác nhận; các giao
+                dịch được chọn được áp dụng lên nó
+            reserved: Giao dịch luôn có trong khối (ví dụ phần thưởng),
+                được tính vào giới hạn nhưng không kiểm tra số dư
+
+        Returns:
+            Các giao dịch được chọn, theo thứ tự được xét
+        """
+        reserved = list(reserved)
+        remaining_count = (None if self.max_transactions is None
+                           else self.max_transactions - len(reserved))
+        remaining_bytes = (None if self.max_bytes is None
+                           else self.max_bytes - sum(map(self.transaction_size, reserved)))
+
+        selected: List[Dict[str, Any]] = []
+
+        for transaction in candidates:
+            if remaining_count is not None and remaining_count <= 0:
+                break
+
+            if remaining_bytes is not None:
+                size = self.transaction_size(transaction)
+                if size > remaining_bytes:
+                    continue
+
+            # Giao dịch phải hợp lệ trên số dư sau các giao dịch đã chọn
+            if not ledger.add(transaction):
+                continue
+
+            if remaining_bytes is not None:
+                remaining_bytes -= size
+            selected.append(transaction)
+            if remaining_count is not None:
+                remaining_count -= 1
+
+        return selected
@@ -0,0 +1,167 @@
+import hashlib
+import json
+from typing import Any, Dict, List
+
+from tucoin_crypto import public_key as derive_public_key, sign
+
+# Các trường bắt buộc của một giao dịch
+REQUIRED_FIELDS = ("sender", "receiver", "amount", "timestamp")
+
+# Các trường chữ ký (có trong giao dịch đã ký)
+SIGNATURE_FIELDS = ("public_key", "signature")
+
+# Người gửi của giao dịch phần thưởng đào (không có chữ ký)
+REWARD_SENDER = "0"
+
+# Phần thưởng cho mỗi khối được đào (TuCoin)
+BLOCK_REWARD = 100.0
+
+
+def transaction_id(transaction: Dict[str, Any]) -> str:
+    """
+    Tính id xác định của một giao dịch.
+
+    Id là hash SHA-256 của mã hóa JSON chuẩn (sắp xếp khóa) của giao dịch,
+    nên cùng một giao dịch nhận từ nhiều nguồn luôn có cùng id.
+
+    Args:
+        transaction: Giao dịch dạng dictionary
+
+    Returns:
+        Id của giao dịch (chuỗi hex)
+    """
+    return hashlib.sha256(json.dumps(transaction, sort_keys=True).encode()).hexdigest()
+
+
+def is_well_formed(transaction: Any) -> bool:
+    """
+    Kiểm tra cấu trúc của một giao dịch nhận từ bên ngoài.
+
+    Args:
+        transaction: Dữ liệu cần kiểm tra
+
+    Returns:
+        True nếu giao dịch có đủ các trường với kiểu hợp lệ
+    """
+    if not isinstance(transaction, dict):
+        return False
+    if any(field not in transaction for field in REQUIRED_FIELDS):
+        return False
+
+    if any(not isinstance(transaction.get(field, ""), str) for field in SIGNATURE_FIELDS):
+        return False
+
+    amount = transaction["amount"]
+    timestamp = transaction["timestamp"]
+    return (isinstance(transaction["sender"], str) and
+            isinstance(transaction["receiver"], str) and
+            isinstance(amount, (int, float)) and not isinstance(amount, bool) and
+            isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool))
+
+
+def has_valid_reward(transactions: List[Dict[str, Any]]) -> bool:
+    """
+    Kiểm tra giao dịch phần thưởng của một khối.
+
+    Khối có tối đa một giao dịch phần thưởng; nếu có, nó phải là giao dịch
+    cuối cùng và có số tiền đúng bằng `BLOCK_REWARD`.
+
+    Args:
+        transactions: Các giao dịch đúng cấu trúc của khối (xem `is_well_formed`)
+
+    Returns:
+        True nếu giao dịch phần thưởng (nếu có) hợp lệ
+    """
+    rewards = [index for index, transaction in enumerate(transactions)
+               if transaction["sender"] == REWARD_SENDER]
+    if not rewards:
+        return True
+    return rewards == [len(transactions) - 1] and transactions[-1]["amount"] == BLOCK_REWARD
+
+
+def is_well_formed_block(transactions: Any) -> bool:
+    """
+    Kiểm tra cấu trúc các giao dịch của một khối nhận từ bên ngoài.
+
+    Args:
+        transactions: Dữ liệu cần kiểm tra
+
+    Returns:
+        True nếu đó là danh sách giao dịch đúng cấu trúc và giao dịch phần
+        thưởng (nếu có) hợp lệ
+    """
+    return (isinstance(transactions, list) and
+            all(is_well_formed(transaction) for transaction in transactions) and
+            has_valid_reward(transactions))
+
+
+def without_reward(transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Các giao dịch của khối trừ giao dịch phần thưởng ở cuối (nếu có).
+
+    Args:
+        transactions: Các giao dịch của khối
+
+    Returns:
+        Các giao dịch cần kiểm tra chữ ký
+    """
+    transactions = list(transactions)
+    if transactions and transactions[-1]["sender"] == REWARD_SENDER:
+        return transactions[:-1]
+    return transactions
+
+
+def address_from_public_key(public_key: str) -> str:
+    """
+    Tạo địa chỉ từ khóa công khai.
+
+    Args:
+        public_key: Khóa công khai dạng hex
+
+    Returns:
+        Địa chỉ ví
+    """
+    # Tạo hash SHA-256 từ khóa công khai
+    hash_hex = hashlib.sha256(public_key.encode()).hexdigest()
+
+    # Tạo địa chỉ bằng cách lấy 40 ký tự đầu tiên của hash
+    # và thêm tiền tố "TU" để dễ nhận biết
+    return "TU" + hash_hex[:40]
+
+
+def is_signed(transaction: Dict[str, Any]) -> bool:
+    """True nếu giao dịch có khóa công khai và chữ ký."""
+    return all(field in transaction for field in SIGNATURE_FIELDS)
+
+
+def signing_message(transaction: Dict[str, Any]) -> bytes:
+    """
+    Thông điệp được ký của một giao dịch.
+
+    Là hash SHA-256 của mã hóa JSON chuẩn của giao dịch, không gồm chữ ký.
+
+    Args:
+        transaction: Giao dịch dạng dictionary
+
+    Returns:
+        Thông điệp 32 bytes
+    """
+    unsigned = {key: value for key, value in transaction.items() if key != "signature"}
+    return hashlib.sha256(json.dumps(unsigned, sort_keys=True).encode()).digest()
+
+
+def sign_transaction(transaction: Dict[str, Any], private_key: str) -> Dict[str, Any]:
+    """
+    Ký một giao dịch.
+
+    Args:
+        transaction: Giao dịch chưa ký
+        private_key: Khóa riêng tư của người gửi
+
+    Returns:
+        Giao dịch mới có thêm khóa công khai và chữ ký
+    """
+    signed = {key: value for key, value in transaction.items() if key not in SIGNATURE_FIELDS}
+    signed["public_key"] = derive_public_key(private_key)
+    signed["signature"] = sign(private_key, signing_message(signed))
+    return signed
@@ -0,0 +1,203 @@
+import multiprocessing
+import os
+import sys
+import threading
+from typing import Any, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from tucoin_miner import ProofChecker
+
+if TYPE_CHECKING:
+    from tucoin_difficulty import Retargeter
+    from tucoin_ledger import LedgerOverlay
+
+# Index nhỏ nhất của khối không hợp lệ đã tìm thấy (chia sẻ giữa các worker)
+_failed_index = None
+
+_NO_FAILURE = sys.maxsize
+
+# Các trường của một khối gửi sang tiến trình con, theo thứ tự tham số của
+# Block: index, timestamp, giao dịch (None nếu đã cắt tỉa), proof, hash khối
+# trước, gốc Merkle, target; cuối cùng là hash nhận được của khối
+BlockRow = Tuple[Any, ...]
+
+
+def check_block(block, previous_block) -> bool:
+    """
+    Kiểm tra một khối so với khối đứng trước nó.
+
+    Proof of work được so với target ghi trong khối; việc target đó có đúng
+    với quy tắc điều chỉnh hay không được kiểm tra riêng (xem `Retargeter`),
+    giao dịch cũng vậy (xem `LedgerOverlay`).
+
+    Args:
+        block: Khối cần kiểm tra
+        previous_block: Khối đứng trước
+
+    Returns:
+        True nếu gốc Merkle, hash, liên kết và proof of work của khối đều
+        hợp lệ (khối đã bị cắt tỉa chỉ được kiểm tra header)
+    """
+    # Kiểm tra gốc Merkle của khối. Khối đã bị cắt tỉa chỉ còn header: giao
+    # dịch đã được kiểm tra trước khi cắt tỉa và vẫn được hash của khối cam kết
+    if not block.is_pruned and block.merkle_root != block.calculate_merkle_root():
+        return False
+
+    # Kiểm tra hash của header khối
+    if block.hash != block.calculate_hash():
+        return False
+
+    # Kiểm tra liên kết giữa các khối
+    if block.previous_hash != previous_block.hash:
+        return False
+
+    # Kiểm tra proof of work
+    return ProofChecker(previous_block.proof, block.target).check(block.proof)
+
+
+def _init_worker(failed_index) -> None:
+    """Khởi tạo tiến trình con với giá trị chia sẻ."""
+    global _failed_index
+    _failed_index = failed_index
+
+
+def _block_row(block) -> BlockRow:
+    """Các trường của khối dạng tuple (giao dịch dạng cột được chuyển về danh sách)."""
+    transactions = None if block.is_pruned else block.transactions
+    return (block.index, block.timestamp, transactions, block.proof,
+            block.previous_hash, block.merkle_root, block.target, block.hash)
+
+
+def _check_range(args) -> None:
+    """
+    Tiến trình con: kiểm tra các khối có index trong [start, stop).
+
+    Dừng sớm khi một worker khác đã tìm thấy khối lỗi có index nhỏ hơn,
+    vì kết quả của đoạn này không còn ảnh hưởng đến kết quả cuối cùng.
+    """
+    start, stop, block_type, rows = args
+
+    previous_block = None
+    for index, row in enumerate(rows, start - 1):
+        block = block_type(*row[:-1])
+        block.hash = row[-1]
+        if previous_block is None:
+            previous_block = block
+            continue
+
+        if index > _failed_index.value:
+            return
+
+        if not check_block(block, previous_block):
+            with _failed_index.get_lock():
+                if index < _failed_index.value:
+                    _failed_index.value = index
+            return
+        previous_block = block
+
+
+class ChainValidator:
+    """Kiểm tra tính hợp lệ của chuỗi khối, song song trên nhiều tiến trình."""
+
+    def __init__(self, workers: Optional[int] = 1, chunk_size: int = 256):
+        """
+        Khởi tạo bộ kiểm tra chuỗi.
+
+        Args:
+            workers: Số tiến trình kiểm tra (1 = tuần tự, None = số lõi CPU)
+            chunk_size: Số khối trong mỗi phần việc giao cho một worker
+        """
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+
+        # Tiến trình con không được tạo bằng fork: tiến trình hiện tại có
+        # nhiều thread (node, đào, BlockStore) có thể đang giữ khóa khi fork.
+        # Tiến trình con chỉ nhận các trường của khối, không nhận chuỗi.
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+        # Nhóm tiến trình được tạo khi cần lần đầu và dùng lại đến khi đóng;
+        # mỗi lần chỉ một lượt kiểm tra song song dùng nhóm
+        self._pool = None
+        self._failed_index = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        """Nhóm tiến trình kiểm tra (gọi khi đang giữ `_lock`)."""
+        if self._pool is None:
+            self._failed_index = self._context.Value('q', _NO_FAILURE)
+            self._pool = self._context.Pool(self.workers, initializer=_init_worker,
+                                            initargs=(self._failed_index,))
+        return self._pool
+
+    def close(self) -> None:
+        """Đóng nhóm tiến trình (nếu có) và chờ các tiến trình con kết thúc."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    def find_invalid_block(self, chain: Sequence, retargeter: 'Retargeter', start: int = 1,
+                           ledger: Optional['LedgerOverlay'] = None) -> Optional[int]:
+        """
+        Tìm khối không hợp lệ đầu tiên trong chuỗi.
+
+        Args:
+            chain: Danh sách khối (từ genesis)
+            retargeter: Quy tắc tính target mà mỗi khối phải dùng
+            start: Index khối đầu tiên cần kiểm tra (các khối trước đó được tin cậy)
+            ledger: Lớp trạng thái tạm với số dư trước khối `ledger.height`;
+                nếu có, giao dịch của các khối từ đó được áp dụng lên nó
+                (None = chỉ kiểm tra header, ví dụ khi đồng bộ header)
+
+        Returns:
+            Index của khối không hợp lệ đầu tiên, hoặc None nếu chuỗi hợp lệ
+        """
+        start = max(start, 1)
+
+        # Thời gian và target chỉ cần đọc trường của khối nên được kiểm tra
+        # tuần tự trước; các khối sau khối sai đầu tiên không cần kiểm tra hash
+        invalid_target = retargeter.find_invalid_header(chain, start)
+        stop = len(chain) if invalid_target is None else invalid_target
+
+        # Giao dịch phụ thuộc số dư sau các khối trước nên cũng được áp dụng tuần tự
+        if ledger is not None:
+            invalid_transactions = ledger.find_invalid_block(chain, start, stop)
+            if invalid_transactions is not None:
+                invalid_target = stop = invalid_transactions
+
+        # Chuỗi ngắn: kiểm tra tuần tự, tránh chi phí tạo tiến trình
+        if self.workers == 1 or stop - start < 2 * self.chunk_size:
+            for index in range(start, stop):
+                if not check_block(chain[index], chain[index - 1]):
+                    return index
+            return invalid_target
+
+        invalid_block = self._find_invalid_block_parallel(chain, start, stop)
+        return invalid_target if invalid_block is None else invalid_block
+
+    def _find_invalid_block_parallel(self, chain: Sequence, start: int, stop: int) -> Optional[int]:
+        """Chia chuỗi thành các đoạn và kiểm tra trên nhóm tiến trình."""
+        block_type = type(chain[start])
+
+        # Các khối được đọc trong thread hiện tại (chuỗi có thể là BlockStore);
+        # mỗi đoạn kèm khối đứng trước nó
+        tasks = []
+        for chunk_start in range(start, stop, self.chunk_size):
+            chunk_stop = min(chunk_start + self.chunk_size, stop)
+            rows: List[BlockRow] = [_block_row(block) for block in chain[chunk_start - 1:chunk_stop]]
+            tasks.append((chunk_start, chunk_stop, block_type, rows))
+
+        with self._lock:
+            pool = self._get_pool()
+            self._failed_index.value = _NO_FAILURE
+            for _ in pool.imap_unordered(_check_range, tasks):
+                pass
+            failed = self._failed_index.value
+
+        return None if failed == _NO_FAILURE else failed
+
+    def is_valid(self, chain: Sequence, retargeter: 'Retargeter',
+                 ledger: Optional['LedgerOverlay'] = None) -> bool:
+        """True nếu toàn bộ chuỗi hợp lệ (xem `find_invalid_block`)."""
+        return self.find_invalid_block(chain, retargeter, ledger=ledger) is None
@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from tucoin_crypto import verify, verify_batch
+from tucoin_transaction import (address_from_public_key, is_signed,
+                                signing_message, transaction_id)
+
+# Một mục cần kiểm tra: (khóa công khai, thông điệp, chữ ký)
+SignatureItem = Tuple[str, bytes, str]
+
+
+def _verify_chunk(items: Sequence[SignatureItem]) -> List[bool]:
+    """
+    Kiểm tra một lô chữ ký (chạy được trong tiến trình con).
+
+    Thử kiểm tra cả lô một lần; nếu lô không hợp lệ, kiểm tra từng chữ ký
+    để biết chữ ký nào sai.
+    """
+    if verify_batch(items):
+        return [True] * len(items)
+    return [verify(*item) for item in items]
+
+
+class SignatureVerifier:
+    """
+    Kiểm tra chữ ký giao dịch theo lô, có bộ nhớ đệm các id đã kiểm tra.
+
+    Giao dịch đã được kiểm tra (ví dụ khi vào mempool) không bị kiểm tra lại
+    khi xuất hiện trong một khối. Nhóm tiến trình chỉ được tạo một lần, khi
+    có lượt kiểm tra đủ lớn đầu tiên, và được giải phóng bằng `close()`.
+    """
+
+    def __init__(self, workers: Optional[int] = 1, batch_size: int = 64,
+                 cache_size: int = 100000, parallel_threshold: int = 256):
+        """
+        Khởi tạo bộ kiểm tra chữ ký.
+
+        Args:
+            workers: Số tiến trình kiểm tra (1 = tuần tự, None = số lõi CPU)
+            batch_size: Số chữ ký trong mỗi lô
+            cache_size: Số id giao dịch hợp lệ tối đa được ghi nhớ
+            parallel_threshold: Số chữ ký tối thiểu của một lượt để kiểm tra
+                trên nhóm tiến trình; lượt nhỏ hơn được kiểm tra ngay trong
+                tiến trình hiện tại
+        """
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.parallel_threshold = parallel_threshold
+
+        # Tiến trình con không được tạo bằng fork: tiến trình hiện tại có
+        # nhiều thread (node, đào) có thể đang giữ khóa khi fork
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+        # Id các giao dịch đã kiểm tra là hợp lệ (LRU)
+        self._verified: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_verified(self, txid: str) -> bool:
+        """True nếu giao dịch có id này đã được kiểm tra là hợp lệ."""
+        with self._lock:
+            if txid in self._verified:
+                self._verified.move_to_end(txid)
+                return True
+        return False
+
+    def _remember(self, txids: Sequence[str]) -> None:
+        """Ghi nhớ các id giao dịch hợp lệ."""
+        with self._lock:
+            for txid in txids:
+                self._verified[txid] = None
+                self._verified.move_to_end(txid)
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+
+    def _get_pool(self):
+        """Nhóm tiến trình kiểm tra, tạo khi cần lần đầu."""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = self._context.Pool(self.workers)
+            return self._pool
+
+    def close(self) -> None:
+        """Đóng nhóm tiến trình (nếu có) và chờ các tiến trình con kết thúc."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    def verify_transactions(self, transactions: Sequence[Dict[str, Any]]) -> List[bool]:
+        """
+        Kiểm tra chữ ký của nhiều giao dịch.
+
+        Giao dịch hợp lệ khi có chữ ký đúng và địa chỉ người gửi được tạo
+        từ khóa công khai đi kèm. Giao dịch chưa ký được coi là không hợp lệ.
+
+        Args:
+            transactions: Các giao dịch cần kiểm tra
+
+        Returns:
+            Kết quả cho từng giao dịch, theo thứ tự
+        """
+        results = [False] * len(transactions)
+        pending: List[int] = []
+        pending_ids: List[str] = []
+        items: List[SignatureItem] = []
+
+        for position, transaction in enumerate(transactions):
+            txid = transaction_id(transaction)
+            if self.is_verified(txid):
+                results[position] = True
+                continue
+
+            if not is_signed(transaction):
+                continue
+            public_key = transaction["public_key"]
+            if address_from_public_key(public_key) != transaction["sender"]:
+                continue
+
+            pending.append(position)
+            pending_ids.append(txid)
+            items.append((public_key, signing_message(transaction), transaction["signature"]))
+
+        if not items:
+            return results
+
+        chunks = [items[start:start + self.batch_size]
+                  for start in range(0, len(items), self.batch_size)]
+
+        # Chỉ dùng nhóm tiến trình khi có đủ việc cho nhiều worker
+        if self.workers > 1 and len(chunks) > 1 and len(items) >= self.parallel_threshold:
+            chunk_results = self._get_pool().map(_verify_chunk, chunks)
+        else:
+            chunk_results = [_verify_chunk(chunk) for chunk in chunks]
+
+        valid_ids = []
+        flat_results = [valid for chunk in chunk_results for valid in chunk]
+        for position, txid, valid in zip(pending, pending_ids, flat_results):
+            if valid:
+                results[position] = True
+                valid_ids.append(txid)
+        self._remember(valid_ids)
+
+        return results
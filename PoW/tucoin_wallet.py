@@ -1,19 +1,24 @@
-import hashlib
 import json
 import os
-import base64
 import secrets
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Optional
+
+from tucoin_crypto import public_key as derive_public_key
+from tucoin_transaction import address_from_public_key, sign_transaction
 
 class Wallet:
     """Quản lý ví TuCoin với khóa và địa chỉ."""
     
-    def __init__(self, private_key: Optional[str] = None):
+    def __init__(self, private_key: Optional[str] = None,
+                 legacy_address: Optional[str] = None):
         """
         Khởi tạo một ví mới hoặc từ khóa riêng tư hiện có.
         
         Args:
             private_key: Khóa riêng tư (nếu không có, tạo mới)
+            legacy_address: Địa chỉ cũ của ví (tạo từ khóa riêng tư trong
+                các phiên bản trước), nếu có. Địa chỉ cũ không tạo từ khóa
+                công khai nên không thể gửi giao dịch có chữ ký từ đó
         """
         if private_key:
             self.private_key = private_key
@@ -21,23 +26,40 @@ class Wallet:
             # Tạo khóa riêng tư mới (32 bytes ngẫu nhiên)
             self.private_key = secrets.token_hex(32)
         
-        # Tạo địa chỉ từ khóa riêng tư
+        # Khóa công khai dùng để kiểm tra chữ ký của ví
+        self.public_key = derive_public_key(self.private_key)
+        
+        # Tạo địa chỉ từ khóa công khai
         self.address = self._generate_address()
+        
+        # Địa chỉ cũ được giữ lại để người dùng vẫn tìm được số dư ở đó (số
+        # dư này chỉ chuyển được trên mạng không bắt buộc chữ ký)
+        self.legacy_address = legacy_address if legacy_address != self.address else None
     
     def _generate_address(self) -> str:
         """
-        Tạo địa chỉ từ khóa riêng tư.
+        Tạo địa chỉ từ khóa công khai.
+        
+        Địa chỉ được tạo từ khóa công khai (không phải khóa riêng tư) để bất
+        kỳ node nào cũng có thể kiểm tra chữ ký của giao dịch với địa chỉ
+        người gửi.
         
         Returns:
             Địa chỉ ví
         """
-        # Tạo hash SHA-256 từ khóa riêng tư
-        hash_object = hashlib.sha256(self.private_key.encode())
-        hash_hex = hash_object.hexdigest()
+        return address_from_public_key(self.public_key)
+    
+    def sign_transaction(self, transaction: Dict) -> Dict:
+        """
+        Ký một giao dịch gửi từ ví này.
         
-        # Tạo địa chỉ bằng cách lấy 40 ký tự đầu tiên của hash
-        # và thêm tiền tố "TU" để dễ nhận biết
-        return "TU" + hash_hex[:40]
+        Args:
+            transaction: Giao dịch chưa ký
+            
+        Returns:
+            Giao dịch mới có thêm khóa công khai và chữ ký
+        """
+        return sign_transaction(transaction, self.private_key)
     
     def to_dict(self) -> Dict[str, str]:
         """
@@ -46,23 +68,30 @@ class Wallet:
         Returns:
             Dictionary chứa thông tin ví
         """
-        return {
+        wallet_dict = {
             "private_key": self.private_key,
             "address": self.address
         }
+        if self.legacy_address:
+            wallet_dict["legacy_address"] = self.legacy_address
+        return wallet_dict
     
     @classmethod
     def from_dict(cls, wallet_dict: Dict[str, str]) -> 'Wallet':
         """
         Tạo ví từ dictionary.
         
+        File ví của phiên bản trước lưu địa chỉ tạo từ khóa riêng tư; địa chỉ
+        đó được giữ lại trong `legacy_address`.
+        
         Args:
             wallet_dict: Dictionary chứa thông tin ví
             
         Returns:
             Đối tượng Wallet
         """
-        return cls(private_key=wallet_dict["private_key"])
+        return cls(private_key=wallet_dict["private_key"],
+                   legacy_address=wallet_dict.get("legacy_address") or wallet_dict.get("address"))
     
     def save_to_file(self, filename: str) -> bool:
         """
@@ -122,6 +151,46 @@ class WalletManager:
         # Tạo thư mục nếu chưa tồn tại
         os.makedirs(wallet_dir, exist_ok=True)
     
+    def migrate_wallet_files(self) -> List[str]:
+        """
+        Lưu các file ví được đặt theo địa chỉ cũ sang tên theo địa chỉ mới.
+        
+        Chỉ chạy khi được gọi (ví dụ với `--migrate-wallets`). Địa chỉ ví
+        trước đây được tạo từ khóa riêng tư; ví được ghi ra file theo địa chỉ
+        mới (tạo từ khóa công khai), giữ địa chỉ cũ trong `legacy_address`,
+        rồi file cũ được đổi tên thành bản sao lưu `<địa chỉ cũ>.json.bak`.
+        Không file nào bị xóa và bản sao lưu đã có không bị ghi đè.
+        
+        Returns:
+            Địa chỉ mới của các ví đã được chuyển
+        """
+        migrated = []
+        
+        for filename in sorted(os.listdir(self.wallet_dir)):
+            if not filename.endswith(".json"):
+                continue
+            
+            path = os.path.join(self.wallet_dir, filename)
+            wallet = Wallet.load_from_file(path)
+            if wallet is None or filename[:-5] == wallet.address:
+                continue
+            
+            backup_path = path + ".bak"
+            if os.path.exists(backup_path):
+                print(f"Bỏ qua ví {filename[:-5]}: đã có bản sao lưu {backup_path}")
+                continue
+            
+            # Chỉ đổi tên file cũ sau khi file mới đã được ghi
+            new_path = os.path.join(self.wallet_dir, f"{wallet.address}.json")
+            if not os.path.exists(new_path) and not wallet.save_to_file(new_path):
+                continue
+            os.rename(path, backup_path)
+            migrated.append(wallet.address)
+            print(f"Đã chuyển ví {filename[:-5]} sang địa chỉ mới {wallet.address} "
+                  f"(bản sao lưu: {backup_path})")
+        
+        return migrated
+    
     def create_wallet(self) -> Wallet:
         """
         Tạo ví mới.
@@ -146,6 +215,14 @@ class WalletManager:
         filename = os.path.join(self.wallet_dir, f"{address}.json")
         wallet = Wallet.load_from_file(filename)
         
+        # Ví có thể được tìm bằng địa chỉ cũ (trước khi đổi tên file)
+        if wallet is None:
+            for other in self.list_wallets():
+                candidate = Wallet.load_from_file(os.path.join(self.wallet_dir, f"{other}.json"))
+                if candidate and candidate.legacy_address == address:
+                    wallet = candidate
+                    break
+        
         if wallet:
             self.current_wallet = wallet
         